@@ -18,14 +18,7 @@ export async function getCalibrationStatus(): Promise<CalibrationStatus> {
         const FORTY_EIGHT_HOURS = 48 * 60 * 60 * 1000;
 
         for (const compartment of [1, 2, 3]) {
-            const row = await db.get<{ calibrated_at: string }>(
-                `SELECT calibrated_at FROM calibrations
-                 WHERE compartment = ?
-                   AND point1_ph IS NOT NULL AND point1_raw IS NOT NULL
-                   AND point2_ph IS NOT NULL AND point2_raw IS NOT NULL
-                 ORDER BY calibrated_at DESC LIMIT 1`,
-                [compartment]
-            );
+            const row = await db.query<{ calibrated_at: string } | null>("latest_calibration", { compartment });
 
             if (!row) {
                 requiresCalibration = true;
@@ -73,12 +66,10 @@ export async function saveCalibration(
 ): Promise<boolean> {
     try {
         const db = await getDb();
-        await db.run(
-            `INSERT INTO calibrations
-                (compartment, point1_ph, point1_raw, point2_ph, point2_raw, point3_ph, point3_raw, researcher)
-             VALUES (?, ?, ?, ?, ?, ?, ?, ?)`,
-            [compartment, point1_ph, point1_raw, point2_ph, point2_raw, point3_ph ?? null, point3_raw ?? null, researcher]
-        );
+        await db.query("save_calibration", {
+            compartment, point1_ph, point1_raw, point2_ph, point2_raw,
+            point3_ph: point3_ph ?? null, point3_raw: point3_raw ?? null, researcher
+        });
         // The client (calibration/page.tsx) is responsible for publishing
         // the reload_calibration command via the MQTT context after this returns.
         return true;
@@ -104,14 +95,7 @@ export type CalibrationRecord = {
 export async function getCalibrationHistory(): Promise<CalibrationRecord[]> {
     try {
         const db = await getDb();
-        const records = await db.all<CalibrationRecord[]>(
-            `SELECT id, compartment, point1_ph, point1_raw, point2_ph, point2_raw,
-                    point3_ph, point3_raw, researcher, calibrated_at
-             FROM calibrations
-             WHERE point1_ph IS NOT NULL AND point1_raw IS NOT NULL
-               AND point2_ph IS NOT NULL AND point2_raw IS NOT NULL
-             ORDER BY calibrated_at DESC LIMIT 50`
-        );
+        const records = await db.query<CalibrationRecord[]>("calibrations_history", { limit: 50 });
         return records;
     } catch (error) {
         console.error("Failed to fetch calibration history:", error);
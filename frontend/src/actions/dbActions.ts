@@ -2,13 +2,11 @@
 
 import { getDb } from "@/lib/db";
 
-import { Project, Experiment, Telemetry, ExperimentLog } from "@/types";
+import { Project, Experiment, Telemetry, TelemetrySeries, ExperimentLog } from "@/types";
 export async function getProjects(): Promise<Project[]> {
     try {
         const db = await getDb();
-        const projects = await db.all<Project[]>(
-            "SELECT * FROM projects ORDER BY created_at DESC"
-        );
+        const projects = await db.query<Project[]>("list_projects");
         return projects;
     } catch (error) {
         console.error("Failed to fetch projects:", error);
@@ -19,9 +17,7 @@ export async function getProjects(): Promise<Project[]> {
 export async function getActiveExperiment(): Promise<Experiment | null> {
     try {
         const db = await getDb();
-        const experiment = await db.get<Experiment>(
-            "SELECT * FROM experiments WHERE status = 'active' ORDER BY id DESC LIMIT 1"
-        );
+        const experiment = await db.query<Experiment | null>("active_experiment");
         return experiment || null;
     } catch (error) {
         console.error("Failed to fetch active experiment:", error);
@@ -32,10 +28,7 @@ export async function getActiveExperiment(): Promise<Experiment | null> {
 export async function getProjectById(id: string): Promise<Project | null> {
     try {
         const db = await getDb();
-        const project = await db.get<Project>(
-            "SELECT * FROM projects WHERE id = ?",
-            [id]
-        );
+        const project = await db.query<Project | null>("project_detail", { id });
         return project || null;
     } catch (error) {
         console.error("Failed to fetch project:", error);
@@ -46,10 +39,7 @@ export async function getProjectById(id: string): Promise<Project | null> {
 export async function getExperimentById(id: string): Promise<Experiment | null> {
     try {
         const db = await getDb();
-        const experiment = await db.get<Experiment>(
-            "SELECT * FROM experiments WHERE id = ?",
-            [id]
-        );
+        const experiment = await db.query<Experiment | null>("experiment_detail", { id });
         return experiment || null;
     } catch (error) {
         console.error("Failed to fetch experiment:", error);
@@ -61,10 +51,7 @@ export async function createProject(name: string, researcher_name: string): Prom
     try {
         const db = await getDb();
         const id = crypto.randomUUID();
-        await db.run(
-            "INSERT INTO projects (id, name, researcher_name) VALUES (?, ?, ?)",
-            [id, name, researcher_name]
-        );
+        await db.query("create_project", { id, name, researcher_name });
 
         return await getProjectById(id);
     } catch (error) {
@@ -76,10 +63,7 @@ export async function createProject(name: string, researcher_name: string): Prom
 export async function getExperimentsByProject(projectId: string): Promise<Experiment[]> {
     try {
         const db = await getDb();
-        const experiments = await db.all<Experiment[]>(
-            "SELECT * FROM experiments WHERE project_id = ? ORDER BY created_at DESC",
-            [projectId]
-        );
+        const experiments = await db.query<Experiment[]>("experiments_by_project", { project_id: projectId });
         return experiments;
     } catch (error) {
         console.error("Failed to fetch experiments:", error);
@@ -87,14 +71,11 @@ export async function getExperimentsByProject(projectId: string): Promise<Experi
     }
 }
 
-export async function getTelemetry(experimentId: string): Promise<Telemetry[]> {
+export async function getTelemetry(experimentId: string, maxPoints = 500): Promise<Telemetry[]> {
     try {
         const db = await getDb();
-        const telemetry = await db.all<Telemetry[]>(
-            "SELECT * FROM telemetry WHERE experiment_id = ? ORDER BY timestamp ASC",
-            [experimentId]
-        );
-        return telemetry;
+        const series = await db.series<TelemetrySeries>(experimentId, { maxPoints });
+        return series.points;
     } catch (error) {
         console.error("Failed to fetch telemetry:", error);
         return [];
@@ -104,10 +85,7 @@ export async function getTelemetry(experimentId: string): Promise<Telemetry[]> {
 export async function getExperimentLogs(experimentId: string): Promise<ExperimentLog[]> {
     try {
         const db = await getDb();
-        const logs = await db.all<ExperimentLog[]>(
-            "SELECT * FROM experiment_logs WHERE experiment_id = ? ORDER BY timestamp ASC",
-            [experimentId]
-        );
+        const logs = await db.query<ExperimentLog[]>("logs_page", { experiment_id: experimentId });
         return logs;
     } catch (error) {
         console.error("Failed to fetch experiment logs:", error);
@@ -118,10 +96,7 @@ export async function getExperimentLogs(experimentId: string): Promise<Experimen
 export async function stopExperiment(experimentId: string): Promise<boolean> {
     try {
         const db = await getDb();
-        await db.run(
-            "UPDATE experiments SET status = 'completed' WHERE id = ?",
-            [experimentId]
-        );
+        await db.query("stop_experiment", { id: experimentId });
         return true;
     } catch (error) {
         console.error("Failed to stop experiment:", error);
@@ -132,14 +107,10 @@ export async function stopExperiment(experimentId: string): Promise<boolean> {
 export async function updateProject(id: string, data: Partial<Project>): Promise<boolean> {
     try {
         const db = await getDb();
-        // Construct SET clause dynamically
-        const entries = Object.entries(data);
-        if (entries.length === 0) return false;
+        // Only name and researcher_name are editable; omitted fields keep their value
+        if (data.name === undefined && data.researcher_name === undefined) return false;
 
-        const setClause = entries.map(([key]) => `${key} = ?`).join(', ');
-        const values = entries.map(([, val]) => val);
-
-        await db.run(`UPDATE projects SET ${setClause} WHERE id = ?`, [...values, id]);
+        await db.query("update_project", { id, name: data.name ?? null, researcher_name: data.researcher_name ?? null });
         return true;
     } catch (error) {
         console.error("Failed to update project:", error);
@@ -151,10 +122,8 @@ export async function deleteExperiment(id: string): Promise<boolean> {
     try {
         const db = await getDb();
 
-        // Manual Cascade (Since FK constraints might not have ON DELETE CASCADE set historically)
-        await db.run("DELETE FROM telemetry WHERE experiment_id = ?", [id]);
-        await db.run("DELETE FROM experiment_logs WHERE experiment_id = ?", [id]);
-        await db.run("DELETE FROM experiments WHERE id = ?", [id]);
+        // Manual cascade (telemetry, logs, experiment) runs server-side in one transaction
+        await db.query("delete_experiment", { id });
 
         return true;
     } catch (error) {
@@ -167,14 +136,8 @@ export async function deleteProject(id: string): Promise<boolean> {
     try {
         const db = await getDb();
 
-        // Manual Cascade
-        const experiments = await db.all<{ id: string }[]>("SELECT id FROM experiments WHERE project_id = ?", [id]);
-
-        for (const exp of experiments) {
-            await deleteExperiment(exp.id);
-        }
-
-        await db.run("DELETE FROM projects WHERE id = ?", [id]);
+        // Manual cascade over the project's experiments runs server-side in one transaction
+        await db.query("delete_project", { id });
 
         return true;
     } catch (error) {
@@ -6,7 +6,7 @@ export async function POST(req: Request) {
         const {
             projectId, projectName, researcherName, experimentName,
             measurementIntervalMins, c1MinPh, c1MaxPh, c2MinPh, c2MaxPh, c3MinPh, c3MaxPh,
-            maxPumpTimeSec, mixingCooldownSec, phMovingAvgWindow
+            maxPumpTimeSec, mixingCooldownSec, phMovingAvgWindow, filterConfig
         } = await req.json();
 
         if (
@@ -20,6 +20,20 @@ export async function POST(req: Request) {
             return NextResponse.json({ error: 'Missing required experiment fields' }, { status: 400 });
         }
 
+        // Optional filter chain (server/core/filters.py), as JSON text or an object
+        let filterConfigJson: string | null = null;
+        if (filterConfig) {
+            try {
+                const parsed = typeof filterConfig === 'string' ? JSON.parse(filterConfig) : filterConfig;
+                if (!parsed || typeof parsed !== 'object' || !Array.isArray(parsed.stages) || parsed.stages.length === 0) {
+                    throw new Error('no stages');
+                }
+                filterConfigJson = JSON.stringify(parsed);
+            } catch {
+                return NextResponse.json({ error: 'filterConfig must be a JSON object with a non-empty "stages" list' }, { status: 400 });
+            }
+        }
+
         if (!projectId && !projectName) {
             return NextResponse.json({ error: 'Must provide either an existing projectId or a new projectName' }, { status: 400 });
         }
@@ -31,25 +45,20 @@ export async function POST(req: Request) {
         // 1. Create Project if no ID was provided (assuming user selected 'Create New')
         if (!activeProjectId) {
             activeProjectId = crypto.randomUUID();
-            await db.run('INSERT INTO projects (id, name, researcher_name) VALUES (?, ?, ?)', [activeProjectId, projectName, researcherName]);
+            await db.query('create_project', { id: activeProjectId, name: projectName, researcher_name: researcherName });
         }
 
-        // 2. Set existing active experiments to completed
-        await db.run('UPDATE experiments SET status = ? WHERE status = ?', ['completed', 'active']);
-
-        // 3. Create new Experiment
+        // 2. Complete any active experiment and create the new one (single transaction)
         const experimentId = crypto.randomUUID();
-        await db.run(
-            `INSERT INTO experiments (
-                id, project_id, name, measurement_interval_mins, c1_min_ph, c1_max_ph, c2_min_ph, c2_max_ph, c3_min_ph, c3_max_ph, 
-                max_pump_time_sec, mixing_cooldown_sec, ph_moving_avg_window, manual_dose_steps, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)`,
-            [
-                experimentId, activeProjectId, experimentName, measurementIntervalMins || 1,
-                c1MinPh, c1MaxPh, c2MinPh, c2MaxPh, c3MinPh, c3MaxPh,
-                maxPumpTimeSec, mixingCooldownSec, phMovingAvgWindow, 0, 'active'
-            ]
-        );
+        await db.query('start_experiment', {
+            id: experimentId, project_id: activeProjectId, name: experimentName,
+            measurement_interval_mins: measurementIntervalMins || 1,
+            c1_min_ph: c1MinPh, c1_max_ph: c1MaxPh, c2_min_ph: c2MinPh, c2_max_ph: c2MaxPh,
+            c3_min_ph: c3MinPh, c3_max_ph: c3MaxPh,
+            max_pump_time_sec: maxPumpTimeSec, mixing_cooldown_sec: mixingCooldownSec,
+            ph_moving_avg_window: phMovingAvgWindow,
+            filter_config: filterConfigJson
+        });
 
         await db.close();
 
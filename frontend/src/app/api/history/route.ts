@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { getDb } from '@/lib/db';
+import { TelemetrySeries } from '@/types';
 
 export async function GET(req: Request) {
     try {
@@ -12,16 +13,18 @@ export async function GET(req: Request) {
 
         const db = await getDb();
 
-        const telemetry = await db.all(
-            'SELECT * FROM telemetry WHERE experiment_id = ? ORDER BY timestamp ASC',
-            [experimentId]
-        );
+        const series = await db.series<TelemetrySeries>(experimentId, {
+            start: searchParams.get('start') ?? undefined,
+            end: searchParams.get('end') ?? undefined,
+            maxPoints: Number(searchParams.get('max_points')) || 500,
+        });
 
         await db.close();
 
         return NextResponse.json({
             success: true,
-            data: telemetry
+            data: series.points,
+            resolution_sec: series.resolution_sec
         });
 
     } catch (error) {
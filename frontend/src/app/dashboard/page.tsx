@@ -227,6 +227,7 @@ export default function Dashboard() {
             maxPumpTimeSec: parseInt(formData.get("maxPumpTimeSec") as string) || 2,
             mixingCooldownSec: parseInt(formData.get("mixingCooldownSec") as string) || 30,
             phMovingAvgWindow: parseInt(formData.get("phMovingAvgWindow") as string) || 10,
+            filterConfig: (formData.get("filterConfig") as string | null)?.trim() || null,
         };
 
         try {
@@ -236,6 +237,12 @@ export default function Dashboard() {
                 body: JSON.stringify(data),
             });
 
+            if (res.status === 400) {
+                const { error } = await res.json();
+                toast.error(error);
+                return;
+            }
+
             if (res.ok) {
                 const { experimentId } = await res.json();
                 setShowSetup(false);
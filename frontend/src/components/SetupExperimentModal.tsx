@@ -4,6 +4,9 @@ import { useUser } from "@/context/UserContext";
 import { Project } from "@/types";
 import { AlertCircle } from "lucide-react";
 
+// Hampel outlier rejection followed by a Kalman filter; see server/core/filters.py
+const FILTER_CONFIG_EXAMPLE = '{"stages": [{"type": "hampel", "window": 7, "n_sigmas": 3}, {"type": "kalman", "process_var": 4e-6, "measurement_var": 4e-4}]}';
+
 interface SetupExperimentModalProps {
     projects: Project[];
     isCreatingProject: boolean;
@@ -118,6 +121,12 @@ export function SetupExperimentModal({
                                         <input required name="manualDoseSteps" type="number" defaultValue="50" className="w-full bg-neutral-950 border border-neutral-800 rounded-lg px-2 py-1 text-neutral-200 text-xs focus:outline-none focus:border-indigo-500" />
                                     </div>
                                 </div>
+
+                                <div className="pt-2 border-t border-neutral-800/50">
+                                    <label className="block text-[10px] text-neutral-500 mb-1">pH Filter Chain (JSON, optional)</label>
+                                    <textarea name="filterConfig" rows={4} spellCheck={false} placeholder={FILTER_CONFIG_EXAMPLE} className="w-full bg-neutral-950 border border-neutral-800 rounded-lg px-2 py-1 text-neutral-200 text-xs font-mono focus:outline-none focus:border-indigo-500" />
+                                    <p className="text-[10px] text-neutral-600 mt-1">Leave empty for the default moving average.</p>
+                                </div>
                             </div>
                         </details>
                     </div>
@@ -4,6 +4,7 @@ const MQTT_URL = process.env.NEXT_PUBLIC_MQTT_URL || "ws://127.0.0.1:9001";
 
 let mqttClient: mqtt.MqttClient | null = null;
 const pendingRequests = new Map<string, (payload: any) => void>();
+const exportStreams = new Map<string, (payload: any) => void>();
 
 function getMqttClient(): Promise<mqtt.MqttClient> {
     return new Promise((resolve) => {
@@ -15,12 +16,14 @@ function getMqttClient(): Promise<mqtt.MqttClient> {
             mqttClient.on('message', (topic, message) => {
                 if (topic.startsWith('reactor/db/response/')) {
                     const reqId = topic.split('/').pop();
+                    // Resolvers remove themselves once the (possibly chunked) response is complete
                     if (reqId && pendingRequests.has(reqId)) {
                         const payload = JSON.parse(message.toString());
-                        const resolver = pendingRequests.get(reqId);
-                        resolver?.(payload);
-                        pendingRequests.delete(reqId);
+                        pendingRequests.get(reqId)?.(payload);
                     }
+                } else if (topic.startsWith('reactor/export/response/')) {
+                    const reqId = topic.split('/').pop();
+                    if (reqId) exportStreams.get(reqId)?.(JSON.parse(message.toString()));
                 }
             });
         }
@@ -31,18 +34,38 @@ function getMqttClient(): Promise<mqtt.MqttClient> {
 }
 
 class RemoteDb {
-    private async query(method: string, sql: string, params: any[] = []) {
+    private async request(method: string, sql: string, params: any[] | Record<string, any> = [], extra: Record<string, any> = {}) {
         const client = await getMqttClient();
         const reqId = crypto.randomUUID();
 
         return new Promise((resolve, reject) => {
-            const timer = setTimeout(() => {
+            const onTimeout = () => {
                 pendingRequests.delete(reqId);
                 reject(new Error(`MQTT DB request timeout on ${method}`));
-            }, 10000);
+            };
+            let timer = setTimeout(onTimeout, 10000);
+
+            // Large `all` results arrive as {seq, done, data} chunks; stitch them together
+            const rows: any[] = [];
+            let nextSeq = 0;
 
             pendingRequests.set(reqId, (payload) => {
                 clearTimeout(timer);
+                if (payload.success && payload.seq !== undefined) {
+                    if (payload.seq !== nextSeq++) {
+                        pendingRequests.delete(reqId);
+                        return reject(new Error(`MQTT DB response chunk out of order on ${method}`));
+                    }
+                    rows.push(...payload.data);
+                    if (!payload.done) {
+                        timer = setTimeout(onTimeout, 10000);
+                        return;
+                    }
+                    payload = { success: true, data: rows };
+                }
+
+                pendingRequests.delete(reqId);
+                client.unsubscribe(`reactor/db/response/${reqId}`);
                 if (!payload.success) {
                     reject(new Error(payload.error || "Unknown MQTT DB error"));
                 } else {
@@ -57,28 +80,65 @@ class RemoteDb {
                     return reject(err);
                 }
                 client.publish(`reactor/db/request`, JSON.stringify({
-                    id: reqId, method, sql, params
+                    id: reqId, method, sql, params, ...extra
                 }));
             });
         });
     }
 
+    /**
+     * Run a named query from the server's catalogue (server/database/query_catalogue.py).
+     * Reads resolve to the rows (`all`) or row (`get`); writes to `{ lastID, changes }`.
+     */
+    async query<T = any>(name: string, params: Record<string, any> = {}): Promise<T> {
+        const result: any = await this.request('query', '', params, { name });
+        return result.data as T;
+    }
+
+    /** One page of a named `all` query; see page(). */
+    async queryPage<T>(name: string, params: Record<string, any>, opts: { pageSize: number; cursor?: string | null }): Promise<{ data: T[]; nextCursor: string | null }> {
+        const result: any = await this.request('query', '', params, { name, page_size: opts.pageSize, cursor: opts.cursor ?? null });
+        return { data: result.data as T[], nextCursor: result.next_cursor ?? null };
+    }
+
     async all<T>(sql: string, params: any[] = []): Promise<T> {
-        const result: any = await this.query('all', sql, params);
+        const result: any = await this.request('all', sql, params);
         return result.data as T;
     }
 
+    /**
+     * One page of an `all` query, paged by keyset on `pageKey`: result columns
+     * that uniquely order the rows (e.g. ['timestamp', 'id']). Pass the
+     * returned `nextCursor` back in to fetch the following page; it is null
+     * after the last page.
+     */
+    async page<T>(sql: string, params: any[] = [], opts: { pageSize: number; pageKey: string[]; cursor?: string | null }): Promise<{ data: T[]; nextCursor: string | null }> {
+        const result: any = await this.request('all', sql, params, { page_size: opts.pageSize, page_key: opts.pageKey, cursor: opts.cursor ?? null });
+        return { data: result.data as T[], nextCursor: result.next_cursor ?? null };
+    }
+
     async get<T>(sql: string, params: any[] = []): Promise<T | undefined> {
-        const result: any = await this.query('get', sql, params);
+        const result: any = await this.request('get', sql, params);
         return result.data as T | undefined;
     }
 
     async run(sql: string, params: any[] = []): Promise<any> {
-        return this.query('run', sql, params);
+        return this.request('run', sql, params);
+    }
+
+    /**
+     * Chart-ready telemetry for an experiment, downsampled server-side to the
+     * finest rollup resolution (1 min / 10 min / 1 h) that fits `maxPoints`.
+     */
+    async series<T>(experimentId: string, opts: { start?: string; end?: string; maxPoints?: number } = {}): Promise<T> {
+        const result: any = await this.request('series', '', {
+            experiment_id: experimentId, start: opts.start, end: opts.end, max_points: opts.maxPoints
+        });
+        return result.data as T;
     }
 
     async exec(sql: string): Promise<void> {
-        await this.query('exec', sql, []);
+        await this.request('exec', sql, []);
     }
 
     async close(): Promise<void> { }
@@ -92,3 +152,71 @@ export async function getDb() {
     }
     return dbInstance;
 }
+
+export type ExportFormat = "xlsx" | "csv" | "parquet";
+
+export type ExportStream = {
+    filename: string;
+    contentType: string;
+    size: number;
+    stream: ReadableStream<Uint8Array>;
+};
+
+// Maximum silence between two export chunks before the download is abandoned
+const EXPORT_CHUNK_TIMEOUT_MS = 30000;
+
+/**
+ * Ask the reactor server to build an experiment export and stream it back in
+ * chunks over `reactor/export/response/{id}`. Resolves with the file metadata
+ * as soon as the first chunk arrives; the file body flows through `stream`.
+ */
+export async function requestExport(experimentId: string, format: ExportFormat): Promise<ExportStream> {
+    const client = await getMqttClient();
+    const reqId = crypto.randomUUID();
+    const topic = `reactor/export/response/${reqId}`;
+
+    return new Promise((resolve, reject) => {
+        let controller: ReadableStreamDefaultController<Uint8Array> | null = null;
+        let timer: ReturnType<typeof setTimeout>;
+
+        const finish = (error?: Error) => {
+            clearTimeout(timer);
+            exportStreams.delete(reqId);
+            client.unsubscribe(topic);
+            if (!error) controller?.close();
+            else if (controller) controller.error(error);
+            else reject(error);
+        };
+        const armTimer = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => finish(new Error("MQTT export stream timeout")), EXPORT_CHUNK_TIMEOUT_MS);
+        };
+
+        exportStreams.set(reqId, (payload) => {
+            if (!payload.success) return finish(new Error(payload.error || "Export failed"));
+            armTimer();
+
+            if (!controller) {
+                resolve({
+                    filename: payload.filename,
+                    contentType: payload.content_type,
+                    size: payload.size,
+                    stream: new ReadableStream<Uint8Array>({
+                        start(c) { controller = c; },
+                        cancel() { controller = null; finish(); },
+                    }),
+                });
+            }
+            controller!.enqueue(new Uint8Array(Buffer.from(payload.data, "base64")));
+            if (payload.done) finish();
+        });
+
+        armTimer();
+        client.subscribe(topic, { qos: 1 }, (err) => {
+            if (err) return finish(err);
+            client.publish(`reactor/export/request`, JSON.stringify({
+                id: reqId, experiment_id: experimentId, format
+            }));
+        });
+    });
+}
@@ -19,6 +19,7 @@ export type Experiment = {
     max_pump_time_sec: number;
     mixing_cooldown_sec: number;
     ph_moving_avg_window: number;
+    filter_config?: string | null;
     status: string;
     created_at: string;
 };
@@ -32,6 +33,13 @@ export type Telemetry = {
     compartment_3_ph: number | null;
 };
 
+// Chart-ready telemetry from the `series` RPC: raw rows when they fit the
+// point budget (resolution_sec = 0), otherwise rollup bucket means.
+export type TelemetrySeries = {
+    resolution_sec: number;
+    points: Telemetry[];
+};
+
 export type ExperimentLog = {
     id: string;
     experiment_id: string;
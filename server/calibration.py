@@ -0,0 +1,158 @@
+import bisect
+import logging
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class CalibrationModel:
+    """
+    Immutable raw-ADC → pH conversion for one compartment, compiled once from
+    a calibration record so the per-sample path is a bisect and a multiply-add.
+
+    Two fits are supported:
+
+        piecewise  — linear segments between the calibration points, sorted by
+                     raw value; readings outside the calibrated range extrapolate
+                     along the first/last segment.  With two points this is the
+                     classic two-point line, with three points the historical
+                     p1–p2 / p2–p3 split at point2_raw.
+        polynomial — least-squares polynomial of `degree` through all points
+                     (degree 1 is a regression line over an N-point calibration).
+
+    Segment boundaries are stored as `breakpoints` (the interior raw values)
+    with matching `slopes` and `intercepts`; segment i covers
+    breakpoints[i-1] < raw <= breakpoints[i].
+    """
+
+    FITS = ("piecewise", "polynomial")
+
+    __slots__ = ("fit", "points", "breakpoints", "slopes", "intercepts",
+                 "coefficients", "_center", "_scale", "_np_breakpoints", "_np_slopes", "_np_intercepts")
+
+    def __init__(self, points: Sequence[Tuple[float, float]], fit: str = "piecewise", degree: int = 2):
+        """
+        Args:
+            points: (raw, ph) pairs, in any order.  Duplicate raw values keep
+                    the first pair.  At least two distinct raw values are needed.
+            fit:    "piecewise" or "polynomial".
+            degree: polynomial degree, capped at len(points) - 1.
+        """
+        if fit not in self.FITS:
+            raise ValueError(f"Unknown calibration fit: {fit!r}")
+        unique = {}
+        for raw, ph in points:
+            unique.setdefault(float(raw), float(ph))
+        if len(unique) < 2:
+            raise ValueError("Calibration needs at least two points with distinct raw values")
+
+        self.fit = fit
+        self.points = tuple(sorted(unique.items()))
+        self.breakpoints: Tuple[float, ...] = ()
+        self.slopes: Tuple[float, ...] = ()
+        self.intercepts: Tuple[float, ...] = ()
+        self.coefficients: Tuple[float, ...] = ()
+        self._center = 0.0
+        self._scale = 1.0
+
+        if fit == "piecewise":
+            slopes, intercepts = [], []
+            for (r1, p1), (r2, p2) in zip(self.points, self.points[1:]):
+                m = (p2 - p1) / (r2 - r1)
+                slopes.append(m)
+                intercepts.append(p1 - m * r1)
+            self.breakpoints = tuple(r for r, _ in self.points[1:-1])
+            self.slopes = tuple(slopes)
+            self.intercepts = tuple(intercepts)
+        else:
+            self._fit_polynomial(min(max(1, int(degree)), len(self.points) - 1))
+
+        self._np_breakpoints = self._np_slopes = self._np_intercepts = None
+        if np is not None and fit == "piecewise":
+            self._np_breakpoints = np.asarray(self.breakpoints, dtype=float)
+            self._np_slopes = np.asarray(self.slopes, dtype=float)
+            self._np_intercepts = np.asarray(self.intercepts, dtype=float)
+
+    @classmethod
+    def from_record(cls, calib: dict) -> Optional["CalibrationModel"]:
+        """
+        Compile a calibrations row (point1..point3 columns, as returned by
+        SQLiteClient.get_latest_calibrations()) or a dict carrying an explicit
+        "points": [(raw, ph), ...] list plus optional "fit" / "degree" keys.
+
+        Returns None when the record has fewer than two usable points.
+        """
+        points = calib.get("points")
+        if points is None:
+            points = []
+            for i in range(1, 4):
+                raw, ph = calib.get(f"point{i}_raw"), calib.get(f"point{i}_ph")
+                if raw is None or ph is None:
+                    if i <= 2:
+                        return None  # point1 and point2 are mandatory
+                    continue
+                points.append((raw, ph))
+        try:
+            return cls(points, fit=calib.get("fit") or "piecewise", degree=calib.get("degree") or 2)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Unusable calibration record: {e}")
+            return None
+
+    # ── Polynomial fit ────────────────────────────────────────────────────
+
+    def _fit_polynomial(self, degree: int):
+        """Least-squares fit on raw values centred and scaled to about ±1 (keeps the normal equations well conditioned)."""
+        raws = [r for r, _ in self.points]
+        self._center = (raws[0] + raws[-1]) / 2
+        self._scale = (raws[-1] - raws[0]) / 2 or 1.0
+        xs = [(r - self._center) / self._scale for r in raws]
+        ys = [p for _, p in self.points]
+
+        n = degree + 1
+        # Normal equations A c = b with A[i][j] = Σ x^(i+j), b[i] = Σ y·x^i
+        power_sums = [sum(x ** k for x in xs) for k in range(2 * n - 1)]
+        a = [[power_sums[i + j] for j in range(n)] + [sum(y * x ** i for x, y in zip(xs, ys))] for i in range(n)]
+        for col in range(n):
+            pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+            if abs(a[pivot][col]) < 1e-12:
+                raise ValueError("Calibration points do not determine the polynomial")
+            a[col], a[pivot] = a[pivot], a[col]
+            for r in range(n):
+                if r != col:
+                    f = a[r][col] / a[col][col]
+                    a[r] = [vr - f * vc for vr, vc in zip(a[r], a[col])]
+        # Highest power first, for Horner evaluation
+        self.coefficients = tuple(a[i][n] / a[i][i] for i in reversed(range(n)))
+
+    # ── Conversion ────────────────────────────────────────────────────────
+
+    def __call__(self, raw: float) -> float:
+        """pH for one raw reading (unrounded)."""
+        if self.fit == "piecewise":
+            i = bisect.bisect_left(self.breakpoints, raw)
+            return self.slopes[i] * raw + self.intercepts[i]
+        x = (raw - self._center) / self._scale
+        ph = 0.0
+        for c in self.coefficients:
+            ph = ph * x + c
+        return ph
+
+    def convert_batch(self, raws: Iterable[float]) -> List[float]:
+        """pH for many raw readings, rounded to 2 decimals.  Vectorised with numpy when available."""
+        if np is None:
+            return [round(self(raw), 2) for raw in raws]
+        if isinstance(raws, np.ndarray):
+            values = raws.astype(float, copy=False)
+        else:
+            values = np.fromiter(raws, dtype=float)
+        if self.fit == "piecewise":
+            idx = np.searchsorted(self._np_breakpoints, values, side="left")
+            ph = self._np_slopes[idx] * values + self._np_intercepts[idx]
+        else:
+            ph = np.polyval(self.coefficients, (values - self._center) / self._scale)
+        return np.round(ph, 2).tolist()
@@ -0,0 +1,241 @@
+import collections
+import json
+import logging
+import math
+from typing import Any, List, NamedTuple, Optional
+
+from core.rolling_window import RollingWindow
+
+logger = logging.getLogger(__name__)
+
+# Scale factor turning a median absolute deviation into a Gaussian sigma
+_MAD_TO_SIGMA = 1.4826
+
+
+class FilterOutput(NamedTuple):
+    value: float
+    uncertainty: float   # One-sigma uncertainty of `value`, in pH
+    rejected: bool       # The input sample was treated as an outlier
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+# Stage parameters come from user-edited JSON: coerce and range-check them up
+# front, so a bad config is rejected at load time instead of failing every cycle
+
+def _positive(name: str, value: Any) -> float:
+    value = float(value)
+    if not 0 < value < math.inf:
+        raise ValueError(f"{name} must be a positive number")
+    return value
+
+
+def _window(value: Any) -> int:
+    if float(value) != int(value) or int(value) < 1:
+        raise ValueError("window must be an integer >= 1")
+    return int(value)
+
+
+# ── Outlier rejection stages ──────────────────────────────────────────────
+
+class HampelFilter:
+    """
+    Replaces a sample with the window median when it lies more than
+    n_sigmas robust standard deviations (1.4826 × MAD) from that median.
+    min_sigma keeps a perfectly flat window from flagging every tiny change.
+    """
+
+    def __init__(self, window: int = 7, n_sigmas: float = 3.0, min_sigma: float = 0.01):
+        self._window = collections.deque(maxlen=max(3, _window(window)))
+        self.n_sigmas = _positive("n_sigmas", n_sigmas)
+        self.min_sigma = float(min_sigma)
+        if not 0 <= self.min_sigma < math.inf:
+            raise ValueError("min_sigma must be a non-negative number")
+
+    def reset(self):
+        self._window.clear()
+
+    def update(self, value: float, uncertainty: Optional[float], rejected: bool):
+        self._window.append(value)
+        if len(self._window) < 3:
+            return value, uncertainty, rejected
+        samples = list(self._window)
+        median = _median(samples)
+        sigma = max(_MAD_TO_SIGMA * _median([abs(x - median) for x in samples]), self.min_sigma)
+        if abs(value - median) > self.n_sigmas * sigma:
+            return median, uncertainty, True
+        return value, uncertainty, rejected
+
+
+class MedianFilter:
+    """Running median of the last `window` samples."""
+
+    def __init__(self, window: int = 5):
+        self._window = collections.deque(maxlen=_window(window))
+
+    def reset(self):
+        self._window.clear()
+
+    def update(self, value: float, uncertainty: Optional[float], rejected: bool):
+        self._window.append(value)
+        return _median(list(self._window)), uncertainty, rejected
+
+
+# ── Smoothing stages ──────────────────────────────────────────────────────
+
+class KalmanFilter:
+    """
+    Scalar Kalman filter with a random-walk process model.
+
+    process_var is how much the true pH may wander per sample, and
+    measurement_var the sensor noise (both pH²).  A sample flagged as an
+    outlier upstream only advances the prediction, so its uncertainty grows
+    instead of the estimate being pulled towards the glitch.
+    """
+
+    def __init__(self, process_var: float = 4e-6, measurement_var: float = 4e-4):
+        self.process_var = _positive("process_var", process_var)
+        self.measurement_var = _positive("measurement_var", measurement_var)
+        self.reset()
+
+    def reset(self):
+        self._estimate: Optional[float] = None
+        self._variance = 0.0
+
+    def update(self, value: float, uncertainty: Optional[float], rejected: bool):
+        if self._estimate is None:
+            self._estimate, self._variance = value, self.measurement_var
+        else:
+            self._variance += self.process_var
+            if not rejected:
+                gain = self._variance / (self._variance + self.measurement_var)
+                self._estimate += gain * (value - self._estimate)
+                self._variance *= 1 - gain
+        return self._estimate, math.sqrt(self._variance), rejected
+
+
+class ExponentialFilter:
+    """
+    Exponential moving average.  The uncertainty is the EMA's own standard
+    error, from an exponentially weighted variance of the residuals.
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        alpha = float(alpha)
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._estimate: Optional[float] = None
+        self._residual_var = 0.0
+
+    def update(self, value: float, uncertainty: Optional[float], rejected: bool):
+        a = self.alpha
+        if self._estimate is None:
+            self._estimate = value
+        elif not rejected:
+            delta = value - self._estimate
+            self._estimate += a * delta
+            self._residual_var = (1 - a) * (self._residual_var + a * delta * delta)
+        return self._estimate, math.sqrt(self._residual_var * a / (2 - a)), rejected
+
+
+class MovingAverageFilter:
+    """Boxcar mean of the last `window` samples; uncertainty is its standard error."""
+
+    def __init__(self, window: int = 10):
+        self._window = RollingWindow(_window(window))
+
+    def reset(self):
+        self._window.clear()
+
+    def update(self, value: float, uncertainty: Optional[float], rejected: bool):
+        self._window.append(value)
+        n = len(self._window)
+        return self._window.mean, self._window.stdev / math.sqrt(n), rejected
+
+
+STAGES = {
+    "hampel": HampelFilter,
+    "median": MedianFilter,
+    "kalman": KalmanFilter,
+    "ema": ExponentialFilter,
+    "moving_average": MovingAverageFilter,
+}
+
+
+class FilterChain:
+    """
+    Per-compartment pH filter pipeline, configured per experiment through the
+    experiments.filter_config JSON column:
+
+        {
+          "stages": [
+            {"type": "hampel", "window": 7, "n_sigmas": 3},
+            {"type": "kalman", "process_var": 4e-6, "measurement_var": 4e-4}
+          ],
+          "dose_sigmas": 2.0,
+          "max_uncertainty": 0.1
+        }
+
+    Stages run in order; each sees the previous stage's value and outlier
+    flag.  update() returns a FilterOutput whose uncertainty comes from the
+    last stage that estimates one.  dose_sigmas / max_uncertainty are read
+    by DosingManager to avoid dosing on noise.
+    """
+
+    DOSE_SIGMAS = 2.0
+
+    def __init__(self, stages: List[Any], dose_sigmas: float = DOSE_SIGMAS, max_uncertainty: Optional[float] = None):
+        self.stages = stages
+        self.dose_sigmas = dose_sigmas
+        self.max_uncertainty = max_uncertainty
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FilterChain":
+        if not isinstance(config, dict) or not isinstance(config.get("stages", []), list):
+            raise ValueError("Filter config must be an object with a list of stages")
+        stages = []
+        for spec in config.get("stages", []):
+            spec = dict(spec)
+            kind = spec.pop("type", None)
+            if kind not in STAGES:
+                raise ValueError(f"Unknown filter stage: {kind!r}")
+            stages.append(STAGES[kind](**spec))
+        if not stages:
+            raise ValueError("Filter chain has no stages")
+        max_uncertainty = config.get("max_uncertainty")
+        return cls(
+            stages,
+            dose_sigmas=_positive("dose_sigmas", config.get("dose_sigmas", cls.DOSE_SIGMAS)),
+            max_uncertainty=None if max_uncertainty is None else _positive("max_uncertainty", max_uncertainty),
+        )
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def update(self, value: float) -> FilterOutput:
+        uncertainty, rejected = None, False
+        for stage in self.stages:
+            value, uncertainty, rejected = stage.update(value, uncertainty, rejected)
+        return FilterOutput(value, uncertainty or 0.0, rejected)
+
+
+def parse_filter_config(raw: Any) -> Optional[dict]:
+    """experiments.filter_config (JSON text or dict) → dict, or None when unset or invalid."""
+    if not raw:
+        return None
+    try:
+        config = json.loads(raw) if isinstance(raw, str) else dict(raw)
+        FilterChain.from_config(config)  # Validate once up front
+        return config
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid filter_config {raw!r}: {e}")
+        return None
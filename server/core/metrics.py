@@ -0,0 +1,236 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear latency histogram.
+
+    Values are recorded in whole microseconds.  Below 2^SUB_BUCKET_BITS µs
+    every value has its own bucket; above that each power of two is split
+    into 2^(SUB_BUCKET_BITS − 1) equal sub-buckets, so any recorded value is
+    reported within 1 / 2^(SUB_BUCKET_BITS − 1) (≈1.6 %) of the truth while
+    the whole range from 1 µs to hours fits in a few hundred buckets.
+    record() is O(1); percentiles walk the (sparse) buckets.
+    """
+
+    SUB_BUCKET_BITS = 7
+    _SUB = 1 << SUB_BUCKET_BITS
+    _HALF = _SUB >> 1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, us: int) -> int:
+        if us < cls._SUB:
+            return us
+        shift = us.bit_length() - cls.SUB_BUCKET_BITS
+        return cls._SUB + (shift - 1) * cls._HALF + (us >> shift) - cls._HALF
+
+    @classmethod
+    def _upper_bound(cls, index: int) -> int:
+        """Highest value (µs) that lands in bucket `index`."""
+        if index < cls._SUB:
+            return index
+        shift, offset = divmod(index - cls._SUB, cls._HALF)
+        shift += 1
+        return ((offset + cls._HALF + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        us = max(0, int(seconds * 1_000_000))
+        index = self._index(us)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total_us += us
+            if us > self.max_us:
+                self.max_us = us
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Value (seconds) at or below which q % of the recorded values fall."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, int(round(q / 100 * self.count)))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= rank:
+                    return min(self._upper_bound(index), self.max_us) / 1_000_000
+            return self.max_us / 1_000_000
+
+    def snapshot(self) -> dict:
+        """count, mean and p50/p95/p99/max in milliseconds."""
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": round(self.max_us / 1000, 3) if self.count else None,
+        }
+
+
+class Metrics:
+    """
+    Registry of named latency histograms and labelled counters.
+
+    timed() wraps a pipeline stage (sync or async body).  to_thread() and
+    run_in_executor() replace their asyncio namesakes and record two
+    histograms per hop: "<name>.queue", the time the call waited for a
+    worker thread, and "<name>.run", the time the worker spent in fn.  A
+    slow control cycle can then be pinned on I2C, SQLite or the broker.
+
+    inc() bumps a monotonically increasing counter such as
+    inc("dose_steps_total", 500, pump=1); it is safe from any thread.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, LatencyHistogram())
+        return hist
+
+    def record(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def counters(self) -> Dict[str, Dict[Tuple[Tuple[str, str], ...], float]]:
+        """{name: {((label, value), ...): total}}"""
+        with self._lock:
+            return {name: dict(series) for name, series in self._counters.items()}
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        return dict(self._histograms)
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - start)
+
+    async def run_in_executor(self, name: str, executor: Optional[Executor], fn: Callable[..., T], *args) -> T:
+        submitted = time.perf_counter()
+        started = None
+
+        def call():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, call)
+        finally:
+            if started is not None:
+                self.record(f"{name}.queue", started - submitted)
+                self.record(f"{name}.run", time.perf_counter() - started)
+
+    async def to_thread(self, name: str, fn: Callable[..., T], *args) -> T:
+        """asyncio.to_thread with queue-wait and run-time histograms (default executor)."""
+        return await self.run_in_executor(name, None, fn, *args)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: hist.snapshot() for name, hist in sorted(self._histograms.items())}
+
+    def reset(self):
+        for hist in list(self._histograms.values()):
+            with hist._lock:
+                hist.reset()
+
+
+# Process-wide registry, shared like the logging module's loggers
+metrics = Metrics()
+
+
+# ── CLI dump ──────────────────────────────────────────────────────────────
+
+def format_table(latency: Dict[str, dict]) -> str:
+    header = f"{'stage':<32} {'count':>8} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    lines = [header, "-" * len(header)]
+    for name, h in latency.items():
+        cells = [h.get(k) for k in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        lines.append(f"{name:<32} {h['count']:>8} " + " ".join(
+            f"{'-' if v is None else f'{v:.2f}':>9}" for v in cells
+        ))
+    return "\n".join(lines) + "\n(all times in ms)"
+
+
+def main():
+    """
+    Print the metrics the reactor last published (retained) on reactor/metrics:
+
+        python -m core.metrics [--broker HOST] [--port PORT] [--json]
+    """
+    import argparse
+    import os
+    import paho.mqtt.client as mqtt
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Dump the reactor's latency metrics.")
+    parser.add_argument("--broker", default=os.getenv("MQTT_BROKER_URL", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MQTT_PORT", "1883")))
+    parser.add_argument("--json", action="store_true", help="print the raw JSON payload")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    received = threading.Event()
+    payload = {}
+
+    def on_message(client, userdata, msg):
+        payload.update(json.loads(msg.payload.decode()))
+        received.set()
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = lambda c, userdata, flags, reason_code, properties: c.subscribe("reactor/metrics")
+    client.on_message = on_message
+    client.connect(args.broker, args.port)
+    client.loop_start()
+    try:
+        if not received.wait(args.timeout):
+            raise SystemExit("No metrics received: is the reactor running?")
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+    if args.json:
+        print(json.dumps(payload, indent=2))
+        return
+    print(format_table(payload.get("latency", {})))
+    for name, stats in payload.get("scheduler", {}).items():
+        print(f"\n{name}: {json.dumps(stats)}")
+
+
+if __name__ == "__main__":
+    main()
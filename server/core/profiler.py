@@ -0,0 +1,202 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from core.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for the live controller.
+
+    A daemon thread snapshots every thread's Python stack (sys._current_frames)
+    every interval_sec and counts them as flamegraph-compatible collapsed
+    stacks ("thread;outer;...;inner count", for flamegraph.pl or speedscope).
+    A sample whose innermost frame is a known wait point (the event loop's
+    selector, an idle executor worker, an Event/Condition wait) counts as
+    idle, which gives per-thread and per-executor utilisation.
+
+    Once per TASK_SAMPLE_SEC it also schedules a callback on the event loop
+    that records the live asyncio tasks by coroutine and how long the loop
+    took to run the callback (loop lag).
+
+    dump() writes <output_dir>/profile-<timestamp>.collapsed and a
+    .summary.json next to it, and returns the summary.
+    """
+
+    INTERVAL_SEC = 0.01
+    TASK_SAMPLE_SEC = 1.0
+    MAX_DEPTH = 64
+    TOP_FRAMES = 25
+
+    # (file name, function) of innermost frames where a thread is waiting, not working
+    IDLE_FRAMES = {
+        ("selectors.py", "select"),   # Event loop waiting for I/O or timers
+        ("thread.py", "_worker"),      # ThreadPoolExecutor worker blocked on its queue
+        ("threading.py", "wait"),      # Event.wait / Condition.wait
+        ("queue.py", "get"),
+    }
+
+    def __init__(self, output_dir: str = "profiles", interval_sec: float = INTERVAL_SEC):
+        self.output_dir = output_dir
+        self.interval_sec = interval_sec
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.reset()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def reset(self):
+        with self._lock:
+            self._stacks: collections.Counter = collections.Counter()
+            self._self_time: collections.Counter = collections.Counter()
+            self._thread_samples: collections.Counter = collections.Counter()
+            self._thread_busy: collections.Counter = collections.Counter()
+            self._task_counts: collections.Counter = collections.Counter()
+            self._task_samples = 0
+            self._task_max = 0
+            self._loop_lag = LatencyHistogram()
+            self._samples = 0
+            self._sampling_sec = 0.0
+            self._started_at = time.time()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        if self.running:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self.reset()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started ({self.interval_sec * 1000:g} ms interval).")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+            logger.info("Sampling profiler stopped.")
+
+    # ── Sampling ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _label(code) -> str:
+        path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+        return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+    def _run(self):
+        own = threading.get_ident()
+        next_task_sample = time.perf_counter()
+        while not self._stop.wait(self.interval_sec):
+            started = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    self._sample(names.get(ident, f"thread-{ident}"), frame)
+                self._samples += 1
+                self._sampling_sec += time.perf_counter() - started
+
+            if self._loop is not None and started >= next_task_sample:
+                next_task_sample = started + self.TASK_SAMPLE_SEC
+                try:
+                    self._loop.call_soon_threadsafe(self._sample_tasks, time.perf_counter())
+                except RuntimeError:
+                    self._loop = None  # Loop closed
+
+    def _sample(self, thread_name: str, frame):
+        top = frame
+        labels = []
+        while frame is not None and len(labels) < self.MAX_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name)
+        self._stacks[";".join(reversed(labels))] += 1
+        self._thread_samples[thread_name] += 1
+
+        code = top.f_code
+        if (os.path.basename(code.co_filename), code.co_name) not in self.IDLE_FRAMES:
+            self._thread_busy[thread_name] += 1
+            self._self_time[labels[0]] += 1
+
+    def _sample_tasks(self, scheduled: float):
+        """Runs on the event loop."""
+        lag = time.perf_counter() - scheduled
+        tasks = asyncio.all_tasks()
+        with self._lock:
+            self._loop_lag.record(lag)
+            self._task_samples += 1
+            self._task_max = max(self._task_max, len(tasks))
+            for task in tasks:
+                coro = task.get_coro()
+                self._task_counts[getattr(coro, "__qualname__", repr(coro))] += 1
+
+    # ── Reporting ─────────────────────────────────────────────────────────
+
+    def summary(self) -> dict:
+        with self._lock:
+            elapsed = max(time.time() - self._started_at, 1e-9)
+            threads = {
+                name: {"samples": n, "busy_pct": round(100 * self._thread_busy[name] / n, 1)}
+                for name, n in self._thread_samples.most_common()
+            }
+            # Executor threads are named <prefix>_<n>: report each pool as a whole
+            pools = collections.defaultdict(lambda: [0, 0])
+            for name, n in self._thread_samples.items():
+                prefix, sep, index = name.rpartition("_")
+                if sep and index.isdigit():
+                    pools[prefix][0] += n
+                    pools[prefix][1] += self._thread_busy[name]
+            busy_total = sum(self._self_time.values()) or 1
+            return {
+                "duration_sec": round(elapsed, 1),
+                "interval_ms": self.interval_sec * 1000,
+                "samples": self._samples,
+                "overhead_pct": round(100 * self._sampling_sec / elapsed, 2),
+                "threads": threads,
+                "executors": {
+                    prefix: {"busy_pct": round(100 * busy / n, 1)} for prefix, (n, busy) in sorted(pools.items())
+                },
+                "asyncio_tasks": {
+                    "mean": round(sum(self._task_counts.values()) / self._task_samples, 1) if self._task_samples else None,
+                    "max": self._task_max,
+                    "by_coroutine": {
+                        name: round(n / self._task_samples, 2) for name, n in self._task_counts.most_common(self.TOP_FRAMES)
+                    },
+                    "loop_lag": self._loop_lag.snapshot(),
+                },
+                "top_self": [
+                    {"frame": label, "samples": n, "pct": round(100 * n / busy_total, 1)}
+                    for label, n in self._self_time.most_common(self.TOP_FRAMES)
+                ],
+            }
+
+    def dump(self, reason: str = "") -> dict:
+        """Write the collapsed stacks and summary so far; returns the summary with the file paths."""
+        summary = self.summary()
+        with self._lock:
+            stacks = list(self._stacks.items())
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+        summary.update(reason=reason, collapsed_path=base + ".collapsed", summary_path=base + ".summary.json")
+        with open(base + ".summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Profile written to {base}.collapsed ({len(stacks)} unique stacks, {reason or 'on request'}).")
+        return summary
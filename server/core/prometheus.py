@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricFamily(NamedTuple):
+    """One exposition block: samples are (labels, value) pairs."""
+    name: str
+    type: str       # "counter" or "gauge"
+    help: str
+    samples: List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _value(value: float) -> str:
+    return repr(float(value)) if value is not None else "NaN"
+
+
+class PrometheusExporter:
+    """
+    Minimal Prometheus text-format (0.0.4) endpoint on asyncio.start_server:
+    no web framework, no extra service.  GET /metrics renders
+
+      - every Metrics counter as a counter family (prefixed PREFIX),
+      - every latency histogram as the PREFIX latency_seconds summary
+        (p50/p95/p99 quantiles, _sum and _count, labelled op=<name>),
+      - whatever the registered collectors return (scheduler, write-behind
+        queue, result cache...), evaluated at scrape time.
+
+    Anything else gets a 404.  Scrapes are cheap enough to serve on the
+    event loop directly.  There is no authentication, so it listens on
+    loopback unless a host is given explicitly.
+    """
+
+    PREFIX = "reactor_"
+    QUANTILES = (0.5, 0.95, 0.99)
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    # Requests are a request line plus a few headers; anything longer is dropped
+    MAX_REQUEST_BYTES = 8192
+    READ_TIMEOUT_SEC = 5
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.scrapes = 0
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+
+    # ── Rendering ─────────────────────────────────────────────────────────
+
+    def _families(self) -> Iterable[MetricFamily]:
+        for name, series in sorted(self.metrics.counters().items()):
+            yield MetricFamily(name, "counter", "", [(dict(key), total) for key, total in series.items()])
+        for collector in self._collectors:
+            try:
+                yield from collector()
+            except Exception as e:
+                logger.error(f"Metrics collector {collector!r} failed: {e}")
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families():
+            name = self.PREFIX + family.name
+            if family.help:
+                lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.type}")
+            for labels, value in family.samples:
+                lines.append(f"{name}{_labels(labels)} {_value(value)}")
+
+        name = self.PREFIX + "latency_seconds"
+        lines.append(f"# HELP {name} Per-stage and per-thread-hop latency.")
+        lines.append(f"# TYPE {name} summary")
+        for op, hist in sorted(self.metrics.histograms().items()):
+            for q in self.QUANTILES:
+                lines.append(f"{name}{_labels({'op': op, 'quantile': str(q)})} {_value(hist.percentile(q * 100))}")
+            lines.append(f"{name}_sum{_labels({'op': op})} {_value(hist.total_us / 1_000_000)}")
+            lines.append(f"{name}_count{_labels({'op': op})} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    # ── HTTP ──────────────────────────────────────────────────────────────
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.READ_TIMEOUT_SEC)
+            method, path, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+            if method == "GET" and path.split("?", 1)[0] == "/metrics":
+                self.scrapes += 1
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {self.CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # Slow, truncated or malformed request: just hang up
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        try:
+            self._server = await asyncio.start_server(
+                self._handle, self.host, self.port, limit=self.MAX_REQUEST_BYTES
+            )
+            logger.info(f"Prometheus metrics on http://{self.host}:{self.port}/metrics")
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint on {self.host}:{self.port}: {e}")
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
@@ -0,0 +1,153 @@
+import collections
+import math
+from array import array
+from typing import Iterator, Optional
+
+
+class RollingWindow:
+    """
+    Fixed-capacity sliding window of numbers with O(1) statistics.
+
+    Samples live in a preallocated array('d') ring buffer.  The mean and
+    variance come from a running sum and sum of squares, and min/max from
+    monotonic deques of (sequence number, value), so append() and every
+    statistic are amortised O(1) regardless of the window size.
+
+    The running sums are recomputed exactly each time the ring wraps, which
+    keeps floating-point drift bounded at O(1) amortised cost.
+
+    resize() keeps the most recent samples, like collections.deque(window,
+    maxlen=n), but reuses this object so holders of a reference stay valid.
+    """
+
+    __slots__ = ("_buf", "_maxlen", "_head", "_count", "_seq", "_sum", "_sumsq", "_mins", "_maxs")
+
+    def __init__(self, maxlen: int):
+        if maxlen < 1:
+            raise ValueError("RollingWindow maxlen must be at least 1")
+        self._maxlen = int(maxlen)
+        self._buf = array("d", bytes(8 * self._maxlen))
+        self._head = 0        # Index the next sample is written to
+        self._count = 0
+        self._seq = 0         # Total samples ever appended; tags min/max candidates
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._mins = collections.deque()
+        self._maxs = collections.deque()
+
+    # ── Container protocol ────────────────────────────────────────────────
+
+    @property
+    def maxlen(self) -> int:
+        return self._maxlen
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self) -> Iterator[float]:
+        """Samples oldest first."""
+        start = (self._head - self._count) % self._maxlen
+        for i in range(self._count):
+            yield self._buf[(start + i) % self._maxlen]
+
+    def __repr__(self) -> str:
+        return f"RollingWindow({list(self)!r}, maxlen={self._maxlen})"
+
+    # ── Updates ───────────────────────────────────────────────────────────
+
+    def append(self, value: float):
+        value = float(value)
+        if self._count == self._maxlen:
+            old = self._buf[self._head]
+            self._sum -= old
+            self._sumsq -= old * old
+        else:
+            self._count += 1
+        self._buf[self._head] = value
+        self._sum += value
+        self._sumsq += value * value
+        self._head = (self._head + 1) % self._maxlen
+
+        seq = self._seq
+        self._seq += 1
+        oldest = seq - self._count + 1
+        mins, maxs = self._mins, self._maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((seq, value))
+        while mins[0][0] < oldest:
+            mins.popleft()
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((seq, value))
+        while maxs[0][0] < oldest:
+            maxs.popleft()
+
+        if self._head == 0:
+            self._resum()
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self._head = self._count = 0
+        self._sum = self._sumsq = 0.0
+        self._mins.clear()
+        self._maxs.clear()
+
+    def resize(self, maxlen: int):
+        """Change the capacity in place, keeping the newest min(len, maxlen) samples."""
+        maxlen = int(maxlen)
+        if maxlen == self._maxlen:
+            return
+        if maxlen < 1:
+            raise ValueError("RollingWindow maxlen must be at least 1")
+        kept = list(self)[-maxlen:]
+        self._maxlen = maxlen
+        self._buf = array("d", bytes(8 * maxlen))
+        self.clear()
+        self.extend(kept)
+
+    def _resum(self):
+        self._sum = math.fsum(self)
+        self._sumsq = math.fsum(v * v for v in self)
+
+    # ── Statistics ────────────────────────────────────────────────────────
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._sum / self._count if self._count else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._mins[0][1] if self._count else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._maxs[0][1] if self._count else None
+
+    @property
+    def spread(self) -> Optional[float]:
+        """max − min of the window."""
+        return self._maxs[0][1] - self._mins[0][1] if self._count else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Population variance of the window."""
+        if not self._count:
+            return None
+        mean = self._sum / self._count
+        return max(0.0, self._sumsq / self._count - mean * mean)
+
+    @property
+    def stdev(self) -> Optional[float]:
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
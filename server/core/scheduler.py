@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.rolling_window import RollingWindow
+
+logger = logging.getLogger(__name__)
+
+
+class OverrunPolicy:
+    """What a periodic task does when it falls one or more periods behind."""
+    SKIP = "skip"          # Drop the missed ticks and resume on the next slot of the grid
+    CATCH_UP = "catch_up"  # Run the missed ticks back to back (up to max_catch_up), then skip
+
+
+class PeriodicTask:
+    """
+    One callback run at a fixed rate on a monotonic deadline grid.
+
+    Deadlines are start + n × period, never "now + period", so the time the
+    callback takes does not stretch the period and the rate does not drift.
+    Per-cycle lateness (start time − deadline) and run time feed the jitter
+    statistics over the last STATS_WINDOW cycles.
+    """
+
+    STATS_WINDOW = 256
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable[None]], period_sec: float,
+                 policy: str = OverrunPolicy.SKIP, max_catch_up: int = 3, error_backoff_sec: float = 0.0):
+        if period_sec <= 0:
+            raise ValueError(f"Task {name!r} period must be positive")
+        if policy not in (OverrunPolicy.SKIP, OverrunPolicy.CATCH_UP):
+            raise ValueError(f"Unknown overrun policy: {policy!r}")
+        self.name = name
+        self.callback = callback
+        self.period_sec = period_sec
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.error_backoff_sec = error_backoff_sec
+
+        self.cycles = 0
+        self.overruns = 0    # Cycles that finished after the next deadline
+        self.skipped = 0     # Ticks dropped to resynchronise
+        self.errors = 0
+        self._lateness = RollingWindow(self.STATS_WINDOW)
+        self._durations = RollingWindow(self.STATS_WINDOW)
+
+    def _advance(self, deadline: float, now: float, behind: int) -> Tuple[float, int]:
+        """Next deadline after the one just run, and the updated count of consecutive late ticks."""
+        deadline += self.period_sec
+        if now <= deadline:
+            return deadline, 0
+        self.overruns += 1
+        if self.policy == OverrunPolicy.CATCH_UP and behind < self.max_catch_up:
+            return deadline, behind + 1
+        missed = math.ceil((now - deadline) / self.period_sec)
+        self.skipped += missed
+        return deadline + missed * self.period_sec, 0
+
+    async def run(self, is_running: Callable[[], bool]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        behind = 0
+        while is_running():
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started = loop.time()
+            self._lateness.append(started - deadline)
+            try:
+                await self.callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.errors += 1
+                logger.error(f"Unhandled error in {self.name} task: {exc}")
+                if self.error_backoff_sec:
+                    await asyncio.sleep(self.error_backoff_sec)
+            finished = loop.time()
+            self._durations.append(finished - started)
+            self.cycles += 1
+
+            deadline, behind = self._advance(deadline, finished, behind)
+
+    def stats(self) -> dict:
+        """Rate, overrun counters and jitter (lateness) / run time in milliseconds."""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "period_ms": ms(self.period_sec),
+            "policy": self.policy,
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "jitter_mean_ms": ms(self._lateness.mean),
+            "jitter_max_ms": ms(self._lateness.max),
+            "jitter_stdev_ms": ms(self._lateness.stdev),
+            "run_mean_ms": ms(self._durations.mean),
+            "run_max_ms": ms(self._durations.max),
+        }
+
+
+class Scheduler:
+    """
+    Runs registered periodic tasks, each at its own rate and in its own
+    asyncio task, so a slow control cycle does not delay telemetry
+    publishing or ADC acquisition (and vice versa).
+
+        scheduler.register("control", self.control_cycle, 1.0)
+        scheduler.register("publish", self.publish_cycle, 0.5)
+        await scheduler.run(lambda: state.running)
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, PeriodicTask] = {}
+        self._running: List[asyncio.Task] = []
+
+    def register(self, name: str, callback: Callable[[], Awaitable[None]], period_sec: float,
+                 policy: str = OverrunPolicy.SKIP, **kwargs) -> PeriodicTask:
+        if name in self.tasks:
+            raise ValueError(f"Task {name!r} is already registered")
+        task = PeriodicTask(name, callback, period_sec, policy, **kwargs)
+        self.tasks[name] = task
+        logger.info(f"Scheduled {name!r} every {period_sec * 1000:g} ms ({policy}).")
+        return task
+
+    async def run(self, is_running: Callable[[], bool]):
+        """Run every registered task until is_running() turns false or this is cancelled."""
+        self._running = [
+            asyncio.create_task(task.run(is_running), name=f"scheduler-{name}")
+            for name, task in self.tasks.items()
+        ]
+        try:
+            await asyncio.gather(*self._running)
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        for task in self._running:
+            task.cancel()
+        self._running = []
+
+    def stats(self) -> dict:
+        return {name: task.stats() for name, task in self.tasks.items()}
@@ -1,7 +1,9 @@
-import collections
 import asyncio
 from typing import Dict, Optional, Any
 
+from core.filters import FilterChain
+from core.rolling_window import RollingWindow
+
 class ReactorState:
     """
     Encapsulates all transient process state, datastore caches, and
@@ -34,14 +36,23 @@ class ReactorState:
         self.active_dosing_tasks: Dict[int, Optional[asyncio.Task]] = {c: None for c in self.COMPARTMENTS}
         self.active_manual_dose_tasks: Dict[int, Optional[asyncio.Task]] = {c: None for c in self.COMPARTMENTS}
         
-        # Sensor Sliding Windows
-        self.raw_windows: Dict[int, collections.deque] = {
-            c: collections.deque(maxlen=self.STABILITY_WINDOW_SIZE) for c in self.COMPARTMENTS
+        # Sensor Sliding Windows (O(1) running spread / mean, resized in place)
+        self.raw_windows: Dict[int, RollingWindow] = {
+            c: RollingWindow(self.STABILITY_WINDOW_SIZE) for c in self.COMPARTMENTS
         }
-        self.ph_avg_windows: Dict[int, collections.deque] = {
-            c: collections.deque(maxlen=self.PH_MOVING_AVG_WINDOW) for c in self.COMPARTMENTS
+        self.ph_avg_windows: Dict[int, RollingWindow] = {
+            c: RollingWindow(self.PH_MOVING_AVG_WINDOW) for c in self.COMPARTMENTS
         }
         
+        # Per-experiment pH filter chains (None: plain moving average), built
+        # from experiments.filter_config; filter_config_key is the text they came from
+        self.filter_chains: Dict[int, Optional[FilterChain]] = {c: None for c in self.COMPARTMENTS}
+        self.filter_config_key: Optional[str] = None
+        self.filtered_ph: Dict[int, Optional[float]] = {c: None for c in self.COMPARTMENTS}
+
+        # Latest control-cycle sensor snapshot, published at its own rate
+        self.latest_sensor_data: Dict[int, Dict[str, Any]] = {}
+
         # Telemetry Data Logging Buckets (1Hz accumulations)
         self.telemetry_buckets: Dict[int, list] = {c: [] for c in self.COMPARTMENTS}
 
@@ -49,17 +60,19 @@ class ReactorState:
         """Clear the sensor sliding windows and logging bucket for a given compartment."""
         self.raw_windows[compartment_id].clear()
         self.ph_avg_windows[compartment_id].clear()
+        if self.filter_chains[compartment_id] is not None:
+            self.filter_chains[compartment_id].reset()
+        self.filtered_ph[compartment_id] = None
         self.telemetry_buckets[compartment_id].clear()
 
     @property
     def latest_safe_ph(self) -> Dict[int, Optional[float]]:
-        """Compute the instantaneous moving average pH for stable compartments."""
+        """Latest filtered pH per compartment (the moving average without a filter chain)."""
         latest_ph = {}
         for c in self.COMPARTMENTS:
-            window = self.ph_avg_windows[c]
-            ph_list = list(window)
-            if ph_list:
-                latest_ph[c] = round(sum(ph_list) / len(ph_list), 2)
-            else:
-                latest_ph[c] = None
+            if self.filter_chains[c] is not None:
+                latest_ph[c] = self.filtered_ph[c]
+                continue
+            mean = self.ph_avg_windows[c].mean
+            latest_ph[c] = round(mean, 2) if mean is not None else None
         return latest_ph
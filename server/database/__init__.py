@@ -1,3 +1,6 @@
 from .sqlite_client import SQLiteClient
+from .write_behind import WriteBehindQueue
+from .exporter import ExperimentExporter
+from .reprocessor import TelemetryReprocessor
 
-__all__ = ["SQLiteClient"]
+__all__ = ["SQLiteClient", "WriteBehindQueue", "ExperimentExporter", "TelemetryReprocessor"]
@@ -0,0 +1,258 @@
+import calendar
+import csv
+import io
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional writers: CSV always works, Parquet and XLSX need their libraries
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+except ImportError:
+    Workbook = None
+
+
+class ExperimentExporter:
+    """
+    Streams an experiment's telemetry and event log out of SQLite into an
+    export file, in bounded memory.
+
+    Rows are pulled with cursor.fetchmany() and handed straight to the output
+    writer, so the size of an export is limited by disk space rather than RAM.
+    Every format produces a single file:
+        csv     → .zip holding info.csv, measurements.csv and logs.csv
+        xlsx    → workbook with Info / Measurements / Logs sheets (openpyxl write-only mode)
+        parquet → .zip holding measurements.parquet and logs.parquet (pyarrow)
+    """
+
+    FORMATS = {
+        "csv": (".zip", "application/zip"),
+        "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        "parquet": (".zip", "application/zip"),
+    }
+
+    # Rows fetched from SQLite per round trip (also the Parquet record batch size)
+    FETCH_CHUNK_ROWS = 2000
+
+    MEASUREMENT_HEADER = ("Timestamp (UTC)", "Elapsed", "Compartment 1 pH", "Compartment 2 pH", "Compartment 3 pH")
+    LOG_HEADER = ("Timestamp (UTC)", "Elapsed", "Level", "Compartment", "Message")
+
+    def __init__(self, db_path: str, export_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.export_dir = export_dir or os.getenv("EXPORT_DIR", "exports")
+
+    # ── Row sources ───────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _iter_rows(self, conn: sqlite3.Connection, sql: str, params: tuple) -> Iterator[list]:
+        """Yield lists of at most FETCH_CHUNK_ROWS rows from a query."""
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(self.FETCH_CHUNK_ROWS)
+            if not rows:
+                return
+            yield rows
+
+    @staticmethod
+    def _epoch(ts: str) -> int:
+        return calendar.timegm(time.strptime(ts[:19].replace("T", " "), '%Y-%m-%d %H:%M:%S'))
+
+    @classmethod
+    def _elapsed(cls, started_at: Optional[str], ts: str) -> str:
+        """Human-readable offset from the experiment start, e.g. '1h 5m 2s'."""
+        if not started_at or not ts:
+            return ""
+        total = cls._epoch(ts) - cls._epoch(started_at)
+        if total <= 0:
+            return "0s"
+        h, m, s = total // 3600, (total % 3600) // 60, total % 60
+        parts = [f"{h}h"] if h else []
+        if m:
+            parts.append(f"{m}m")
+        if s or not parts:
+            parts.append(f"{s}s")
+        return " ".join(parts)
+
+    def _measurement_chunks(self, conn, experiment):
+        started = experiment["created_at"]
+        for rows in self._iter_rows(conn, '''
+            SELECT timestamp, compartment_1_ph, compartment_2_ph, compartment_3_ph
+            FROM telemetry WHERE experiment_id = ? ORDER BY timestamp ASC
+        ''', (experiment["id"],)):
+            yield [(r[0], self._elapsed(started, r[0]), r[1], r[2], r[3]) for r in rows]
+
+    def _log_chunks(self, conn, experiment):
+        started = experiment["created_at"]
+        for rows in self._iter_rows(conn, '''
+            SELECT timestamp, level, compartment, message
+            FROM experiment_logs WHERE experiment_id = ? ORDER BY timestamp ASC
+        ''', (experiment["id"],)):
+            yield [(r[0], self._elapsed(started, r[0]), r[1], r[2], r[3]) for r in rows]
+
+    @staticmethod
+    def _info_rows(conn, experiment) -> list:
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE experiment_id = ?", (experiment["id"],)).fetchone()[0]
+            for table in ("telemetry", "experiment_logs")
+        }
+        return [
+            ("Project Name", experiment["project_name"]),
+            ("Researcher", experiment["researcher_name"]),
+            ("Project Created", experiment["project_created_at"]),
+            ("Experiment ID", experiment["id"]),
+            ("Experiment Name", experiment["name"]),
+            ("Status", experiment["status"]),
+            ("Started At", experiment["created_at"]),
+            ("Measurement Interval", f"{experiment['measurement_interval_mins']} min"),
+            ("Compartment 1 Min pH", experiment["c1_min_ph"]),
+            ("Compartment 1 Max pH", experiment["c1_max_ph"]),
+            ("Compartment 2 Min pH", experiment["c2_min_ph"]),
+            ("Compartment 2 Max pH", experiment["c2_max_ph"]),
+            ("Compartment 3 Min pH", experiment["c3_min_ph"]),
+            ("Compartment 3 Max pH", experiment["c3_max_ph"]),
+            ("Max Pump Time (sec)", experiment["max_pump_time_sec"]),
+            ("Mixing Cooldown (sec)", experiment["mixing_cooldown_sec"]),
+            ("Moving Average Window", experiment["ph_moving_avg_window"]),
+            ("Total Measurements", counts["telemetry"]),
+            ("Total Log Entries", counts["experiment_logs"]),
+            ("Exported At (UTC)", time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())),
+        ]
+
+    # ── Writers ───────────────────────────────────────────────────────────
+
+    def _write_csv(self, path, conn, experiment):
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            sections = (
+                ("info.csv", ("Field", "Value"), iter([self._info_rows(conn, experiment)])),
+                ("measurements.csv", self.MEASUREMENT_HEADER, self._measurement_chunks(conn, experiment)),
+                ("logs.csv", self.LOG_HEADER, self._log_chunks(conn, experiment)),
+            )
+            for name, header, chunks in sections:
+                with io.TextIOWrapper(zf.open(name, "w"), encoding="utf-8", newline="") as fh:
+                    writer = csv.writer(fh)
+                    writer.writerow(header)
+                    for rows in chunks:
+                        writer.writerows(rows)
+
+    def _write_xlsx(self, path, conn, experiment):
+        if Workbook is None:
+            raise RuntimeError("XLSX export requires openpyxl, which is not installed.")
+
+        wb = Workbook(write_only=True)
+        header_font = Font(bold=True, color="FFFFFFFF")
+        header_fill = PatternFill("solid", fgColor="FF1E3A5F")
+
+        def header_row(ws, titles):
+            cells = []
+            for title in titles:
+                cell = WriteOnlyCell(ws, value=title)
+                cell.font = header_font
+                cell.fill = header_fill
+                cells.append(cell)
+            return cells
+
+        sheets = (
+            ("Info", ("Field", "Value"), iter([self._info_rows(conn, experiment)])),
+            ("Measurements", self.MEASUREMENT_HEADER, self._measurement_chunks(conn, experiment)),
+            ("Logs", self.LOG_HEADER, self._log_chunks(conn, experiment)),
+        )
+        for title, header, chunks in sheets:
+            ws = wb.create_sheet(title)
+            ws.append(header_row(ws, header))
+            for rows in chunks:
+                for row in rows:
+                    ws.append(row)
+        wb.save(path)
+
+    def _write_parquet(self, path, conn, experiment):
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow, which is not installed.")
+
+        tables = (
+            ("measurements.parquet", pa.schema([
+                ("timestamp", pa.string()), ("elapsed", pa.string()),
+                ("compartment_1_ph", pa.float64()), ("compartment_2_ph", pa.float64()), ("compartment_3_ph", pa.float64()),
+            ]), self._measurement_chunks(conn, experiment)),
+            ("logs.parquet", pa.schema([
+                ("timestamp", pa.string()), ("elapsed", pa.string()),
+                ("level", pa.string()), ("compartment", pa.int64()), ("message", pa.string()),
+            ]), self._log_chunks(conn, experiment)),
+        )
+        with tempfile.TemporaryDirectory(dir=self.export_dir) as tmp, \
+                zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+            for name, schema, chunks in tables:
+                part = os.path.join(tmp, name)
+                with pq.ParquetWriter(part, schema, compression="zstd") as writer:
+                    for rows in chunks:
+                        columns = list(zip(*rows))
+                        writer.write_batch(pa.RecordBatch.from_arrays(
+                            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                            schema=schema,
+                        ))
+                zf.write(part, name)
+
+    # ── Entry point ───────────────────────────────────────────────────────
+
+    def export(self, experiment_id: str, fmt: str = "xlsx") -> Tuple[str, str, str]:
+        """
+        Write an export file for one experiment.
+
+        Returns:
+            (path, download filename, content type).  The caller owns the file.
+        Raises:
+            ValueError for an unknown format or experiment id.
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt!r}")
+        ext, content_type = self.FORMATS[fmt]
+
+        os.makedirs(self.export_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            experiment = conn.execute('''
+                SELECT e.*, p.name AS project_name, p.researcher_name, p.created_at AS project_created_at
+                FROM experiments e
+                LEFT JOIN projects p ON e.project_id = p.id
+                WHERE e.id = ?
+            ''', (experiment_id,)).fetchone()
+            if experiment is None:
+                raise ValueError(f"Experiment not found: {experiment_id}")
+
+            safe_name = re.sub(r"[^a-z0-9]", "_", experiment["name"], flags=re.IGNORECASE)
+            filename = f"ReactorExport_{safe_name}_{experiment_id[:8]}{ext}"
+            fd, path = tempfile.mkstemp(prefix="export_", suffix=ext, dir=self.export_dir)
+            os.close(fd)
+
+            started = time.monotonic()
+            try:
+                getattr(self, f"_write_{fmt}")(path, conn, experiment)
+            except Exception:
+                os.remove(path)
+                raise
+            logger.info(
+                f"Exported experiment {experiment_id} as {fmt} "
+                f"({os.path.getsize(path)} bytes in {time.monotonic() - started:.2f}s)."
+            )
+            return path, filename, content_type
+        finally:
+            conn.close()
@@ -0,0 +1,271 @@
+import logging
+import sqlite3
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_REQUIRED = object()
+
+
+class Param(NamedTuple):
+    """A typed, named statement parameter. `default` is used when the caller omits it."""
+    name: str
+    type: type
+    default: Any = _REQUIRED
+    nullable: bool = False
+
+
+class NamedQuery(NamedTuple):
+    """
+    A fixed statement served by the `query` DB RPC method.
+
+    mode:       "all" / "get" for reads, "run" for writes.
+    statements: SQL using :named placeholders.  Reads have exactly one;
+                a write may run several in a single transaction.
+    tables:     Tables read or written, used for cache invalidation.
+    page_key:   Columns of an `all` read that uniquely order its rows
+                (ascending), for keyset paging; empty means it is not pageable.
+    """
+    mode: str
+    statements: Tuple[str, ...]
+    params: Tuple[Param, ...] = ()
+    tables: Tuple[str, ...] = ()
+    page_key: Tuple[str, ...] = ()
+
+    @property
+    def is_write(self) -> bool:
+        return self.mode == "run"
+
+    def bind(self, raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate and coerce caller params against the declared types."""
+        raw = raw or {}
+        if not isinstance(raw, dict):
+            raise ValueError("Named query params must be an object")
+        unknown = set(raw) - {p.name for p in self.params}
+        if unknown:
+            raise ValueError(f"Unknown params: {sorted(unknown)}")
+
+        bound = {}
+        for p in self.params:
+            value = raw.get(p.name, p.default)
+            if value is _REQUIRED:
+                raise ValueError(f"Missing required param: {p.name}")
+            if value is None:
+                if not p.nullable and p.default is _REQUIRED:
+                    raise ValueError(f"Param {p.name} may not be null")
+                bound[p.name] = None
+                continue
+            try:
+                bound[p.name] = p.type(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Param {p.name} must be {p.type.__name__}, got {value!r}")
+        return bound
+
+
+# ── Catalogue ─────────────────────────────────────────────────────────────
+#
+# Every statement the frontend needs.  Keep the SQL text stable: sqlite3
+# caches prepared statements per connection keyed on the exact string.
+
+_EXPERIMENT_FIELDS = (
+    Param("id", str), Param("project_id", str), Param("name", str),
+    Param("measurement_interval_mins", int, 1),
+    Param("c1_min_ph", float), Param("c1_max_ph", float),
+    Param("c2_min_ph", float), Param("c2_max_ph", float),
+    Param("c3_min_ph", float), Param("c3_max_ph", float),
+    Param("max_pump_time_sec", int), Param("mixing_cooldown_sec", int),
+    Param("ph_moving_avg_window", int, 10),
+    Param("filter_config", str, None),
+)
+
+# Tables the AFTER DELETE ON experiments triggers clear; deleting an
+# experiment must invalidate their cached reads too
+_EXPERIMENT_TRIGGER_TABLES = (
+    "telemetry_rollups", "telemetry_revisions", "telemetry_revision_rows",
+    "raw_samples", "raw_sample_series",
+)
+
+_COMPLETE_CALIBRATION = '''
+    point1_ph IS NOT NULL AND point1_raw IS NOT NULL
+    AND point2_ph IS NOT NULL AND point2_raw IS NOT NULL
+'''
+
+QUERY_CATALOGUE: Dict[str, NamedQuery] = {
+    # ── Projects ──
+    "list_projects": NamedQuery(
+        "all", ("SELECT * FROM projects ORDER BY created_at DESC",),
+        tables=("projects",),
+    ),
+    "project_detail": NamedQuery(
+        "get", ("SELECT * FROM projects WHERE id = :id",),
+        (Param("id", str),), ("projects",),
+    ),
+    "create_project": NamedQuery(
+        "run", ("INSERT INTO projects (id, name, researcher_name) VALUES (:id, :name, :researcher_name)",),
+        (Param("id", str), Param("name", str), Param("researcher_name", str, None)), ("projects",),
+    ),
+    "update_project": NamedQuery(
+        "run", ('''
+            UPDATE projects
+            SET name = COALESCE(:name, name), researcher_name = COALESCE(:researcher_name, researcher_name)
+            WHERE id = :id
+        ''',),
+        (Param("id", str), Param("name", str, None), Param("researcher_name", str, None)), ("projects",),
+    ),
+    "delete_project": NamedQuery(
+        "run", (
+            "DELETE FROM telemetry WHERE experiment_id IN (SELECT id FROM experiments WHERE project_id = :id)",
+            "DELETE FROM experiment_logs WHERE experiment_id IN (SELECT id FROM experiments WHERE project_id = :id)",
+            "DELETE FROM experiments WHERE project_id = :id",
+            "DELETE FROM projects WHERE id = :id",
+        ),
+        (Param("id", str),),
+        ("projects", "experiments", "telemetry", "experiment_logs", *_EXPERIMENT_TRIGGER_TABLES),
+    ),
+
+    # ── Experiments ──
+    "active_experiment": NamedQuery(
+        "get", ("SELECT * FROM experiments WHERE status = 'active' ORDER BY id DESC LIMIT 1",),
+        tables=("experiments",),
+    ),
+    "experiment_detail": NamedQuery(
+        "get", ("SELECT * FROM experiments WHERE id = :id",),
+        (Param("id", str),), ("experiments",),
+    ),
+    "experiments_by_project": NamedQuery(
+        "all", ("SELECT * FROM experiments WHERE project_id = :project_id ORDER BY created_at DESC",),
+        (Param("project_id", str),), ("experiments",),
+    ),
+    "start_experiment": NamedQuery(
+        "run", (
+            "UPDATE experiments SET status = 'completed' WHERE status = 'active'",
+            '''
+            INSERT INTO experiments (
+                id, project_id, name, measurement_interval_mins, c1_min_ph, c1_max_ph, c2_min_ph, c2_max_ph,
+                c3_min_ph, c3_max_ph, max_pump_time_sec, mixing_cooldown_sec, ph_moving_avg_window,
+                filter_config, manual_dose_steps, status
+            ) VALUES (
+                :id, :project_id, :name, :measurement_interval_mins, :c1_min_ph, :c1_max_ph, :c2_min_ph, :c2_max_ph,
+                :c3_min_ph, :c3_max_ph, :max_pump_time_sec, :mixing_cooldown_sec, :ph_moving_avg_window,
+                :filter_config, 0, 'active'
+            )
+            ''',
+        ),
+        _EXPERIMENT_FIELDS, ("experiments",),
+    ),
+    "stop_experiment": NamedQuery(
+        "run", ("UPDATE experiments SET status = 'completed' WHERE id = :id",),
+        (Param("id", str),), ("experiments",),
+    ),
+    "delete_experiment": NamedQuery(
+        "run", (
+            "DELETE FROM telemetry WHERE experiment_id = :id",
+            "DELETE FROM experiment_logs WHERE experiment_id = :id",
+            "DELETE FROM experiments WHERE id = :id",
+        ),
+        (Param("id", str),),
+        ("experiments", "telemetry", "experiment_logs", *_EXPERIMENT_TRIGGER_TABLES),
+    ),
+
+    # ── Telemetry & logs ──
+    "telemetry_range": NamedQuery(
+        "all", ('''
+            SELECT * FROM telemetry
+            WHERE experiment_id = :experiment_id AND timestamp BETWEEN :start AND :end
+            ORDER BY timestamp ASC, id ASC
+        ''',),
+        (
+            Param("experiment_id", str),
+            Param("start", str, "0000-01-01 00:00:00"),
+            Param("end", str, "9999-12-31 23:59:59"),
+        ),
+        ("telemetry",), ("timestamp", "id"),
+    ),
+    "telemetry_revisions": NamedQuery(
+        "all", ('''
+            SELECT * FROM telemetry_revisions
+            WHERE experiment_id = :experiment_id
+            ORDER BY created_at DESC
+        ''',),
+        (Param("experiment_id", str),), ("telemetry_revisions",),
+    ),
+    "telemetry_revision_range": NamedQuery(
+        "all", ('''
+            SELECT timestamp, compartment_1_ph, compartment_2_ph, compartment_3_ph
+            FROM telemetry_revision_rows
+            WHERE revision_id = :revision_id AND timestamp BETWEEN :start AND :end
+            ORDER BY timestamp ASC
+        ''',),
+        (
+            Param("revision_id", int),
+            Param("start", str, "0000-01-01 00:00:00"),
+            Param("end", str, "9999-12-31 23:59:59"),
+        ),
+        ("telemetry_revision_rows",), ("timestamp",),
+    ),
+    "logs_page": NamedQuery(
+        "all", ("SELECT * FROM experiment_logs WHERE experiment_id = :experiment_id ORDER BY timestamp ASC, id ASC",),
+        (Param("experiment_id", str),), ("experiment_logs",), ("timestamp", "id"),
+    ),
+
+    # ── Calibrations ──
+    "latest_calibration": NamedQuery(
+        "get", (f'''
+            SELECT * FROM calibrations
+            WHERE compartment = :compartment AND {_COMPLETE_CALIBRATION}
+            ORDER BY calibrated_at DESC LIMIT 1
+        ''',),
+        (Param("compartment", int),), ("calibrations",),
+    ),
+    "calibrations_history": NamedQuery(
+        "all", (f'''
+            SELECT id, compartment, point1_ph, point1_raw, point2_ph, point2_raw,
+                   point3_ph, point3_raw, researcher, calibrated_at
+            FROM calibrations
+            WHERE {_COMPLETE_CALIBRATION}
+            ORDER BY calibrated_at DESC LIMIT :limit
+        ''',),
+        (Param("limit", int, 50),), ("calibrations",),
+    ),
+    "save_calibration": NamedQuery(
+        "run", ('''
+            INSERT INTO calibrations
+                (compartment, point1_ph, point1_raw, point2_ph, point2_raw, point3_ph, point3_raw, researcher)
+            VALUES (:compartment, :point1_ph, :point1_raw, :point2_ph, :point2_raw, :point3_ph, :point3_raw, :researcher)
+        ''',),
+        (
+            Param("compartment", int),
+            Param("point1_ph", float), Param("point1_raw", int),
+            Param("point2_ph", float), Param("point2_raw", int),
+            Param("point3_ph", float, None), Param("point3_raw", int, None),
+            Param("researcher", str, None),
+        ),
+        ("calibrations",),
+    ),
+}
+
+
+def get_named_query(name: str) -> NamedQuery:
+    query = QUERY_CATALOGUE.get(name)
+    if query is None:
+        raise ValueError(f"Unknown named query: {name!r}")
+    return query
+
+
+def check_query_plans(conn: sqlite3.Connection):
+    """
+    Log a warning for any catalogued read that SQLite would answer with a
+    full table scan, so a missing index shows up at startup, not as latency.
+    """
+    for name, query in QUERY_CATALOGUE.items():
+        if query.is_write:
+            continue
+        params = {p.name: None for p in query.params}
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query.statements[0]}", params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Named query {name!r} failed to plan: {e}")
+            continue
+        scans = [row[-1] for row in plan if row[-1].startswith("SCAN") and "USING" not in row[-1]]
+        if scans:
+            logger.warning(f"Named query {name!r} has no supporting index: {'; '.join(scans)}")
@@ -0,0 +1,171 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from calibration import CalibrationModel
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryReprocessor:
+    """
+    Recomputes an experiment's telemetry from its raw_samples with corrected
+    calibrations, writing the result into a new telemetry revision.
+
+    Raw samples are streamed in CHUNK_ROWS slices and converted per
+    compartment with CalibrationModel.convert_batch(); compartments without a
+    replacement calibration keep the pH that was stored with each sample.
+    Samples are then averaged into buckets of the experiment's measurement
+    interval — the same mean-of-bucket the live loop logs — and written in
+    short transactions, so the live write-behind flushes are never held up
+    for more than one slice.
+    """
+
+    CHUNK_ROWS = 20000
+
+    # Revision rows written per transaction
+    WRITE_BATCH_ROWS = 500
+
+    COMPARTMENTS = (1, 2, 3)
+
+    def __init__(self, sqlite_client):
+        self.sqlite = sqlite_client
+
+    def load_models(self, calibration_ids: List[int]) -> Dict[int, CalibrationModel]:
+        """compartment → compiled model for the chosen calibrations rows."""
+        models = {}
+        for calibration_id in calibration_ids:
+            calib = self.sqlite.get_calibration(calibration_id)
+            if calib is None:
+                raise ValueError(f"Calibration {calibration_id} not found")
+            model = CalibrationModel.from_record(calib)
+            if model is None:
+                raise ValueError(f"Calibration {calibration_id} is incomplete or degenerate")
+            if calib["compartment"] in models:
+                raise ValueError(f"Two calibrations given for compartment {calib['compartment']}")
+            models[calib["compartment"]] = model
+        return models
+
+    def run(
+        self,
+        experiment_id: str,
+        calibration_ids: List[int],
+        on_progress: Optional[Callable[[int, int, int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> dict:
+        """
+        Reprocess one experiment.  Blocking; call from a worker thread.
+
+        on_progress(revision_id, processed_samples, total_samples) is called
+        after every chunk.  Returns {"revision_id", "samples", "rows",
+        "elapsed_sec"}; raises ValueError for a bad request and RuntimeError
+        if a write fails (the revision is then marked 'failed').
+        """
+        experiment = self.sqlite.get_experiment(experiment_id)
+        if experiment is None:
+            raise ValueError(f"Experiment {experiment_id} not found")
+        models = self.load_models(calibration_ids)
+        if not models:
+            raise ValueError("No calibration selected")
+
+        total = self.sqlite.count_raw_samples(experiment_id)
+        if not total:
+            raise ValueError(f"Experiment {experiment_id} has no raw samples (RAW_SAMPLE_STORE was off)")
+
+        revision_id = self.sqlite.create_telemetry_revision(experiment_id, json.dumps(sorted(calibration_ids)))
+        if revision_id is None:
+            raise RuntimeError("Could not create telemetry revision")
+
+        started = time.perf_counter()
+        interval_ms = max(1, int(experiment.get("measurement_interval_mins") or 1)) * 60_000
+        processed = rows_written = 0
+        status = "failed"
+        try:
+            pending = []
+            bucket = _Bucket(self.COMPARTMENTS)
+            origin = None
+
+            for chunk in self.sqlite.iter_raw_samples(experiment_id, self.CHUNK_ROWS):
+                if cancel_event is not None and cancel_event.is_set():
+                    status = "cancelled"
+                    raise RuntimeError("Reprocessing cancelled")
+                if origin is None:
+                    origin = chunk[0][0]
+
+                for (ts_ms, compartment, _, _, _), ph in zip(chunk, self._convert(chunk, models)):
+                    index = (ts_ms - origin) // interval_ms
+                    if index != bucket.index and bucket.ts_ms is not None:
+                        pending.append(bucket.row())
+                        bucket.reset()
+                    bucket.index = index
+                    bucket.add(ts_ms, compartment, ph)
+
+                if len(pending) >= self.WRITE_BATCH_ROWS:
+                    rows_written += self._write(revision_id, pending)
+                    pending = []
+                processed += len(chunk)
+                if on_progress:
+                    on_progress(revision_id, processed, total)
+
+            if bucket.ts_ms is not None:
+                pending.append(bucket.row())
+            rows_written += self._write(revision_id, pending)
+            status = "completed"
+        finally:
+            self.sqlite.finish_telemetry_revision(revision_id, status, processed, rows_written)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Reprocessed experiment {experiment_id}: {processed} samples → {rows_written} rows "
+            f"in revision {revision_id} ({elapsed:.1f}s)."
+        )
+        return {"revision_id": revision_id, "samples": processed, "rows": rows_written, "elapsed_sec": round(elapsed, 2)}
+
+    def _write(self, revision_id: int, rows: list) -> int:
+        if rows and not self.sqlite.write_telemetry_revision_rows(revision_id, rows):
+            raise RuntimeError(f"Failed to write telemetry revision {revision_id}")
+        return len(rows)
+
+    @staticmethod
+    def _convert(chunk: list, models: Dict[int, CalibrationModel]) -> list:
+        """pH for every (ts_ms, compartment, raw, inst_ph, stable) row, batch-converted per compartment."""
+        phs = [row[3] for row in chunk]
+        for compartment, model in models.items():
+            indices = [i for i, row in enumerate(chunk) if row[1] == compartment]
+            if indices:
+                for i, ph in zip(indices, model.convert_batch([chunk[i][2] for i in indices])):
+                    phs[i] = ph
+        return phs
+
+
+class _Bucket:
+    """Running per-compartment pH sums for one measurement interval."""
+
+    __slots__ = ("index", "ts_ms", "sums", "counts")
+
+    def __init__(self, compartments):
+        self.index = None
+        self.sums = {c: 0.0 for c in compartments}
+        self.counts = dict.fromkeys(compartments, 0)
+        self.ts_ms = None
+
+    def reset(self):
+        for c in self.sums:
+            self.sums[c] = 0.0
+            self.counts[c] = 0
+        self.ts_ms = None
+
+    def add(self, ts_ms: int, compartment: int, ph: Optional[float]):
+        self.ts_ms = ts_ms
+        if ph is not None and compartment in self.sums:
+            self.sums[compartment] += ph
+            self.counts[compartment] += 1
+
+    def row(self) -> tuple:
+        """(timestamp, c1_ph, c2_ph, c3_ph), stamped at the bucket's last sample like a live log row."""
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.ts_ms // 1000))
+        return (timestamp, *(
+            round(self.sums[c] / self.counts[c], 2) if self.counts[c] else None for c in self.sums
+        ))
@@ -0,0 +1,113 @@
+import collections
+import json
+import re
+import threading
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+# Table names following the keywords that read from or write to a table
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of serialised DB RPC responses.
+
+    Keys are the normalised query (named query or whitespace-collapsed SQL)
+    plus its params and paging arguments, so identical dashboard polls from
+    several browser tabs cost one SQLite read.  Each entry records the tables
+    it read; invalidate(tables) drops them as soon as the server writes to one.
+
+    Every table carries a generation counter.  A result is only stored if none
+    of its tables changed while the query was running, so a read that races a
+    write can never repopulate the cache with pre-write rows.
+    """
+
+    MAX_ENTRIES = 256
+    TTL_SEC = 10.0
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_sec: Optional[float] = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.ttl_sec = ttl_sec if ttl_sec is not None else self.TTL_SEC
+
+        # key -> (expires_at, tables, value), oldest first
+        self._entries = collections.OrderedDict()
+        self._generations = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    # ── Keys ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def make_key(method: str, query: str, params: Any, *extra: Any) -> str:
+        normalised = " ".join((query or "").split())
+        return json.dumps([method, normalised, params, *extra], sort_keys=True, default=str)
+
+    @staticmethod
+    def tables_in_sql(sql: str) -> Tuple[str, ...]:
+        """Best-effort list of the tables a raw SQL string references."""
+        return tuple(sorted({name.lower() for name in _TABLE_REF.findall(sql or "")}))
+
+    # ── Lookup / store ────────────────────────────────────────────────────
+
+    def generation(self, tables: Iterable[str]) -> tuple:
+        """Snapshot to pass to put() for a query that is about to run."""
+        with self._lock:
+            return tuple(self._generations[t] for t in tables)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: str, value: Any, tables: Tuple[str, ...], generation: tuple):
+        with self._lock:
+            if tuple(self._generations[t] for t in tables) != generation:
+                return  # A write landed while the query ran
+            self._entries[key] = (time.monotonic() + self.ttl_sec, tables, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables: Iterable[str]):
+        """Drop every entry that read any of `tables`."""
+        tables = {t.lower() for t in tables}
+        if not tables:
+            return
+        with self._lock:
+            for t in tables:
+                self._generations[t] += 1
+            stale = [key for key, (_, deps, _) in self._entries.items() if tables.intersection(deps)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop everything, e.g. after a write whose tables cannot be determined."""
+        with self._lock:
+            for t in list(self._generations):
+                self._generations[t] += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,111 @@
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DbRpcBusyError(Exception):
+    """Raised when the DB RPC already has MAX_PENDING requests queued."""
+
+
+class DbRpcPool:
+    """
+    Isolated execution pool for `reactor/db/request` queries.
+
+    Reads run on a small dedicated thread pool, each worker holding one pooled
+    read-only connection (`mode=ro` URI + `PRAGMA query_only`).  Writes run on
+    a single-thread executor with its own connection, so they are serialised.
+    Nothing here touches asyncio's default executor, which the control loop
+    uses for ADC reads and pump doses, so a burst of dashboard queries queues
+    behind MAX_READERS workers instead of starving sensor reads.
+    """
+
+    MAX_READERS = 2      # Concurrent read queries
+    MAX_PENDING = 32     # Requests admitted (running + queued) before rejecting
+    BUSY_TIMEOUT_MS = 5000
+
+    def __init__(self, db_path: str, max_readers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.db_path = db_path
+        self.max_pending = max_pending or self.MAX_PENDING
+
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=max_readers or self.MAX_READERS, thread_name_prefix="db-rpc-read"
+        )
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-rpc-write")
+
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        # Admission counter; only touched from the event loop thread
+        self._pending = 0
+
+    # ── Connections (one per worker thread) ───────────────────────────────
+
+    def _track(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True,
+                timeout=self.BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+            )
+            conn.execute('PRAGMA query_only=1;')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = self._track(conn)
+        return conn
+
+    def _writer(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS};')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = self._track(conn)
+        return conn
+
+    # ── Execution ─────────────────────────────────────────────────────────
+
+    async def _submit(self, name: str, executor: ThreadPoolExecutor, get_conn, fn: Callable[[sqlite3.Connection], T]) -> T:
+        if self._pending >= self.max_pending:
+            raise DbRpcBusyError(f"DB RPC busy: {self._pending} requests pending")
+        self._pending += 1
+        try:
+            return await metrics.run_in_executor(name, executor, lambda: fn(get_conn()))
+        finally:
+            self._pending -= 1
+
+    async def read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run fn(conn) on a pooled read-only connection."""
+        return await self._submit("db_rpc.read", self._read_executor, self._reader, fn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run fn(conn) on the serialised writer connection."""
+        return await self._submit("db_rpc.write", self._write_executor, self._writer, fn)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def close(self):
+        """Stop accepting work, wait for in-flight queries and close every connection."""
+        self._read_executor.shutdown(wait=True, cancel_futures=True)
+        self._write_executor.shutdown(wait=True, cancel_futures=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Error closing DB RPC connection: {e}")
+            self._connections.clear()
@@ -1,20 +1,144 @@
 import sqlite3
+import json
 import logging
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import uuid
 
+from .telemetry_rollups import TelemetryRollups
+from .query_catalogue import check_query_plans
+
 logger = logging.getLogger(__name__)
 
 class SQLiteClient:
+    """
+    Owns the reactor's long-lived SQLite connections.
+
+    A single writer connection is shared by every thread and serialised behind
+    a lock; reads go through one connection per thread (created lazily, so each
+    asyncio.to_thread worker keeps its own).  Pragmas are applied once when a
+    connection is opened instead of on every query, and close() releases the
+    whole pool on shutdown.
+    """
+
+    # How long a connection waits on a locked database before raising
+    BUSY_TIMEOUT_MS = 5000
+
+    # Raw samples are inserted with executemany in slices of this many rows
+    RAW_INSERT_CHUNK = 1000
+
     def __init__(self, db_path=None):
         self.db_path = db_path or os.getenv("SQLITE_DB_PATH", "reactor.db")
+
+        # Dedicated writer, serialised across threads
+        self._writer = None
+        self._write_lock = threading.RLock()
+
+        # Thread-local readers; the list lets close() reach every thread's connection
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+        # Active experiment cache: valid while the generation it was read at is current
+        self._active_experiment = None
+        self._active_experiment_gen = 0
+        self._cached_experiment_gen = -1
+        self._data_version = None
+        # Connection that only reads PRAGMA data_version, so the check never waits on the writer
+        self._version_conn = None
+        self._version_lock = threading.Lock()
+
+        # experiment_id → raw_sample_series.id
+        self._raw_series_ids = {}
+
         self._init_db()
 
+    # ── Connection pool ───────────────────────────────────────────────────
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection and apply the per-connection pragmas once."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,  # Readers are closed from the shutdown thread
+        )
+        conn.execute('PRAGMA journal_mode=WAL;')
+        # WAL + NORMAL never corrupts the DB; it only defers the fsync to checkpoints
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS};')
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        """Return the shared writer connection. Caller must hold _write_lock."""
+        if self._writer is None:
+            self._writer = self._open_connection()
+        return self._writer
+
+    @contextmanager
+    def _write_conn(self):
+        """Yield the shared writer connection; commit on success, roll back on error."""
+        with self._write_lock:
+            self._get_writer()
+            with self._version_lock:
+                caught_up = self._read_data_version() == self._data_version
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+            if caught_up:
+                # Our own commit is not news to the active experiment cache
+                with self._version_lock:
+                    self._data_version = self._read_data_version()
+
+    def _read_conn(self) -> sqlite3.Connection:
+        """Return this thread's reader connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self):
+        """Close the writer and every thread-local reader connection."""
+        with self._write_lock:
+            if self._writer is not None:
+                try:
+                    self._writer.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Error closing SQLite writer connection: {e}")
+                self._writer = None
+
+        with self._version_lock:
+            if self._version_conn is not None:
+                try:
+                    self._version_conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Error closing SQLite data_version connection: {e}")
+                self._version_conn = None
+
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Error closing SQLite reader connection: {e}")
+            self._readers.clear()
+        # Threads that still hold a stale reference will reopen on next use
+        self._local = threading.local()
+        logger.info("SQLite connection pool closed.")
+
+    # ── Schema ────────────────────────────────────────────────────────────
+
     def _init_db(self):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
+            with self._write_conn() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS projects (
@@ -39,6 +163,7 @@ class SQLiteClient:
                         max_pump_time_sec INTEGER NOT NULL,
                         mixing_cooldown_sec INTEGER NOT NULL,
                         ph_moving_avg_window INTEGER DEFAULT 10,
+                        filter_config TEXT,
                         status TEXT DEFAULT 'active',
                         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY (project_id) REFERENCES projects(id)
@@ -81,6 +206,87 @@ class SQLiteClient:
                     )
                 ''')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_telemetry_experiment_time ON telemetry(experiment_id, timestamp);')
+                # Supporting indexes for the named DB RPC queries (see query_catalogue.py)
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_experiment_time ON experiment_logs(experiment_id, timestamp);')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_experiments_project_created ON experiments(project_id, created_at);')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_experiments_status ON experiments(status);')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at);')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_calibrations_compartment_time ON calibrations(compartment, calibrated_at);')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_calibrations_time ON calibrations(calibrated_at);')
+
+                # Raw 1 Hz sample store.  Rows are keyed by a small integer series id
+                # instead of the experiment UUID, timestamps are integer epoch-ms and
+                # pH is stored in hundredths, which keeps a row around 20 bytes.
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS raw_sample_series (
+                        id INTEGER PRIMARY KEY,
+                        experiment_id TEXT NOT NULL UNIQUE,
+                        FOREIGN KEY (experiment_id) REFERENCES experiments(id)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS raw_samples (
+                        series_id INTEGER NOT NULL,
+                        ts_ms INTEGER NOT NULL,
+                        compartment INTEGER NOT NULL,
+                        raw INTEGER NOT NULL,
+                        ph_centi INTEGER,
+                        stable INTEGER NOT NULL,
+                        PRIMARY KEY (series_id, ts_ms, compartment)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_experiments_delete_raw_samples
+                    AFTER DELETE ON experiments
+                    BEGIN
+                        DELETE FROM raw_samples WHERE series_id IN
+                            (SELECT id FROM raw_sample_series WHERE experiment_id = old.id);
+                        DELETE FROM raw_sample_series WHERE experiment_id = old.id;
+                    END
+                ''')
+
+                # Multi-resolution chart rollups of the telemetry table
+                TelemetryRollups.create_schema(cursor)
+
+                # Telemetry recomputed from raw_samples with a corrected calibration
+                # (database/reprocessor.py).  The original telemetry rows are never
+                # touched; each reprocessing run writes a new revision.
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS telemetry_revisions (
+                        id INTEGER PRIMARY KEY,
+                        experiment_id TEXT NOT NULL,
+                        calibration_ids TEXT,
+                        status TEXT NOT NULL DEFAULT 'running',
+                        sample_count INTEGER NOT NULL DEFAULT 0,
+                        row_count INTEGER NOT NULL DEFAULT 0,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        finished_at DATETIME,
+                        FOREIGN KEY (experiment_id) REFERENCES experiments(id)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS telemetry_revision_rows (
+                        revision_id INTEGER NOT NULL,
+                        timestamp DATETIME NOT NULL,
+                        compartment_1_ph REAL,
+                        compartment_2_ph REAL,
+                        compartment_3_ph REAL,
+                        PRIMARY KEY (revision_id, timestamp),
+                        FOREIGN KEY (revision_id) REFERENCES telemetry_revisions(id)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_telemetry_revisions_experiment ON telemetry_revisions(experiment_id, created_at);')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS trg_experiments_delete_revisions
+                    AFTER DELETE ON experiments
+                    BEGIN
+                        DELETE FROM telemetry_revision_rows WHERE revision_id IN
+                            (SELECT id FROM telemetry_revisions WHERE experiment_id = old.id);
+                        DELETE FROM telemetry_revisions WHERE experiment_id = old.id;
+                    END
+                ''')
+                # A run cut short by a restart can never finish
+                cursor.execute("UPDATE telemetry_revisions SET status = 'failed' WHERE status = 'running'")
 
                 # ── Schema migrations (safe: no-op if column already exists) ──
                 migration_cols = [
@@ -92,14 +298,18 @@ class SQLiteClient:
                     'ALTER TABLE calibrations ADD COLUMN point3_ph REAL',
                     'ALTER TABLE calibrations ADD COLUMN point3_raw INTEGER',
                     'ALTER TABLE experiments ADD COLUMN ph_moving_avg_window INTEGER DEFAULT 10',
+                    'ALTER TABLE experiments ADD COLUMN manual_dose_steps INTEGER DEFAULT 0',
+                    'ALTER TABLE experiments ADD COLUMN filter_config TEXT',
                 ]
                 for stmt in migration_cols:
                     try:
                         cursor.execute(stmt)
                     except sqlite3.OperationalError:
                         pass  # Column already exists — skip
-                    
-                conn.commit()
+
+                TelemetryRollups.backfill(conn)
+                check_query_plans(conn)
+
                 logger.info("SQLite Database initialized with WAL and telemetry tracking.")
         except Exception as e:
             logger.error(f"Error initializing SQLite DB: {e}")
@@ -118,64 +328,106 @@ class SQLiteClient:
         Only compartments with a complete calibration record are included.
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            conn = self._read_conn()
+            cursor = conn.cursor()
 
-                calibrations = {}
-                for comp in [1, 2, 3]:
-                    cursor.execute('''
-                        SELECT point1_ph, point1_raw, point2_ph, point2_raw, point3_ph, point3_raw
-                        FROM calibrations
-                        WHERE compartment = ?
-                          AND point1_ph IS NOT NULL
-                          AND point1_raw IS NOT NULL
-                          AND point2_ph IS NOT NULL
-                          AND point2_raw IS NOT NULL
-                        ORDER BY calibrated_at DESC
-                        LIMIT 1
-                    ''', (comp,))
-                    row = cursor.fetchone()
-                    if row:
-                        calibrations[comp] = dict(row)
-                return calibrations
+            calibrations = {}
+            for comp in [1, 2, 3]:
+                cursor.execute('''
+                    SELECT point1_ph, point1_raw, point2_ph, point2_raw, point3_ph, point3_raw
+                    FROM calibrations
+                    WHERE compartment = ?
+                      AND point1_ph IS NOT NULL
+                      AND point1_raw IS NOT NULL
+                      AND point2_ph IS NOT NULL
+                      AND point2_raw IS NOT NULL
+                    ORDER BY calibrated_at DESC
+                    LIMIT 1
+                ''', (comp,))
+                row = cursor.fetchone()
+                if row:
+                    calibrations[comp] = dict(row)
+            return calibrations
         except Exception as e:
             logger.error(f"Error getting latest calibrations: {e}")
             return {}
 
+    # ── Active experiment cache ───────────────────────────────────────────
+
+    def invalidate_active_experiment(self):
+        """Force the next get_active_experiment() call to re-query the DB."""
+        self._active_experiment_gen += 1
+
+    def _read_data_version(self) -> int:
+        """PRAGMA data_version on the dedicated version connection. Caller must hold _version_lock."""
+        if self._version_conn is None:
+            self._version_conn = self._open_connection()
+        return self._version_conn.execute('PRAGMA data_version;').fetchone()[0]
+
+    def _data_version_changed(self) -> bool:
+        """
+        True when another connection committed since the previous check.
+
+        PRAGMA data_version is read on a connection of its own rather than
+        the writer, so the control loop never blocks behind a write-behind
+        flush.  That connection sees our writer's commits too, so
+        _write_conn() records the version right after each of them when
+        nothing else was pending; only writes from the DB RPC, the frontend
+        or external tools count as changes.  An outside commit racing one
+        of ours can be absorbed, but experiment changes made through the
+        frontend also invalidate the cache over MQTT.
+        """
+        with self._version_lock:
+            version = self._read_data_version()
+            changed = version != self._data_version
+            self._data_version = version
+        return changed
+
     def get_active_experiment(self):
+        """
+        Return the active experiment row, served from memory until invalidated.
+
+        The cached row is dropped by invalidate_active_experiment() or when
+        PRAGMA data_version reports an out-of-band commit, so the control loop
+        can call this every tick without issuing a SELECT.
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
-                conn.row_factory = sqlite3.Row
+            if self._data_version_changed():
+                self.invalidate_active_experiment()
+
+            gen = self._active_experiment_gen
+            if self._cached_experiment_gen != gen:
+                conn = self._read_conn()
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM experiments WHERE status = 'active' ORDER BY id DESC LIMIT 1
                 ''')
                 row = cursor.fetchone()
-                return dict(row) if row else None
+                self._active_experiment = dict(row) if row else None
+                # Tag with the pre-SELECT generation so a racing invalidation still forces a refresh
+                self._cached_experiment_gen = gen
+            return self._active_experiment
         except Exception as e:
             logger.error(f"Error getting active experiment: {e}")
             return None
 
     def create_project(self, name: str, researcher_name: str = None):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
+            with self._write_conn() as conn:
                 cursor = conn.cursor()
                 project_id = str(uuid.uuid4())
                 cursor.execute('INSERT INTO projects (id, name, researcher_name) VALUES (?, ?, ?)', (project_id, name, researcher_name))
-                conn.commit()
                 return project_id
         except Exception as e:
             logger.error(f"Error creating project: {e}")
             return None
 
     def create_experiment(self, project_id: str, name: str, config: dict):
+        filter_config = config.get('filter_config')
+        if isinstance(filter_config, dict):
+            filter_config = json.dumps(filter_config)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
+            with self._write_conn() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE experiments SET status = 'completed' WHERE status = 'active'
@@ -185,47 +437,225 @@ class SQLiteClient:
                     INSERT INTO experiments (
                         id, project_id, name, measurement_interval_mins, c1_min_ph, c1_max_ph, 
                         c2_min_ph, c2_max_ph, c3_min_ph, c3_max_ph, max_pump_time_sec, 
-                        mixing_cooldown_sec, ph_moving_avg_window, manual_dose_steps, status
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')
+                        mixing_cooldown_sec, ph_moving_avg_window, filter_config, manual_dose_steps, status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')
                 ''', (
                     experiment_id, project_id, name, config.get('measurement_interval_mins', 1),
                     config.get('c1_min_ph'), config.get('c1_max_ph'),
                     config.get('c2_min_ph'), config.get('c2_max_ph'),
                     config.get('c3_min_ph'), config.get('c3_max_ph'),
                     config.get('max_pump_time_sec'), config.get('mixing_cooldown_sec'), 
-                    config.get('ph_moving_avg_window', 10), 0  # manual_dose_steps deprecated, sentinel 0
+                    config.get('ph_moving_avg_window', 10), filter_config,
+                    0  # manual_dose_steps deprecated, sentinel 0
                 ))
-                conn.commit()
-                return experiment_id
+            # Our own writer commits are invisible to data_version
+            self.invalidate_active_experiment()
+            return experiment_id
         except Exception as e:
             logger.error(f"Error creating experiment: {e}")
             return None
 
     def log_telemetry(self, experiment_id: str, ph_data: dict):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
+            with self._write_conn() as conn:
                 cursor = conn.cursor()
                 log_id = str(uuid.uuid4())
                 cursor.execute('''
                     INSERT INTO telemetry (id, experiment_id, compartment_1_ph, compartment_2_ph, compartment_3_ph)
                     VALUES (?, ?, ?, ?, ?)
                 ''', (log_id, experiment_id, ph_data.get(1), ph_data.get(2), ph_data.get(3)))
-                conn.commit()
+                timestamp = cursor.execute('SELECT timestamp FROM telemetry WHERE id = ?', (log_id,)).fetchone()[0]
+                TelemetryRollups.apply(conn, [(experiment_id, timestamp, ph_data.get(1), ph_data.get(2), ph_data.get(3))])
         except Exception as e:
             logger.error(f"Error logging telemetry: {e}")
 
     def log_event(self, experiment_id: str, level: str, message: str, compartment: int = None):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('PRAGMA journal_mode=WAL;')
+            with self._write_conn() as conn:
                 cursor = conn.cursor()
                 log_id = str(uuid.uuid4())
                 cursor.execute('''
                     INSERT INTO experiment_logs (id, experiment_id, level, message, compartment)
                     VALUES (?, ?, ?, ?, ?)
                 ''', (log_id, experiment_id, level, message, compartment))
-                conn.commit()
         except Exception as e:
             logger.error(f"Error logging event: {e}")
 
+
+    # ── Chart queries ─────────────────────────────────────────────────────
+
+    def get_telemetry_series(self, experiment_id: str, start: str = None, end: str = None,
+                             max_points: int = TelemetryRollups.DEFAULT_MAX_POINTS):
+        """Telemetry for [start, end] at the finest resolution that fits max_points (see TelemetryRollups.query)."""
+        try:
+            return TelemetryRollups.query(self._read_conn(), experiment_id, start, end, max_points)
+        except Exception as e:
+            logger.error(f"Error querying telemetry series: {e}")
+            return {"resolution_sec": 0, "points": []}
+
+    # ── Raw sample store ──────────────────────────────────────────────────
+
+    def _raw_series_id(self, conn: sqlite3.Connection, experiment_id: str) -> int:
+        """Map an experiment UUID to its raw_samples series id, creating it on first use."""
+        series_id = self._raw_series_ids.get(experiment_id)
+        if series_id is None:
+            conn.execute('INSERT OR IGNORE INTO raw_sample_series (experiment_id) VALUES (?)', (experiment_id,))
+            series_id = conn.execute(
+                'SELECT id FROM raw_sample_series WHERE experiment_id = ?', (experiment_id,)
+            ).fetchone()[0]
+            self._raw_series_ids[experiment_id] = series_id
+        return series_id
+
+    def _insert_raw_samples(self, conn: sqlite3.Connection, raw_rows: list):
+        rows = [
+            (
+                self._raw_series_id(conn, experiment_id), ts_ms, compartment, raw,
+                None if inst_ph is None else int(round(inst_ph * 100)), int(bool(stable)),
+            )
+            for experiment_id, ts_ms, compartment, raw, inst_ph, stable in raw_rows
+        ]
+        for start in range(0, len(rows), self.RAW_INSERT_CHUNK):
+            conn.executemany('''
+                INSERT OR REPLACE INTO raw_samples (series_id, ts_ms, compartment, raw, ph_centi, stable)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows[start:start + self.RAW_INSERT_CHUNK])
+
+    def iter_raw_samples(self, experiment_id: str, chunk_size: int = 5000):
+        """
+        Stream an experiment's raw samples in timestamp order.
+
+        Yields lists of (ts_ms, compartment, raw, inst_ph, stable) tuples of at
+        most chunk_size rows, so callers never hold the whole series in memory.
+        Uses a dedicated connection so a long scan does not pin a shared reader.
+        """
+        conn = self._open_connection()
+        try:
+            row = conn.execute(
+                'SELECT id FROM raw_sample_series WHERE experiment_id = ?', (experiment_id,)
+            ).fetchone()
+            if row is None:
+                return
+            cursor = conn.execute('''
+                SELECT ts_ms, compartment, raw, ph_centi, stable
+                FROM raw_samples WHERE series_id = ?
+                ORDER BY ts_ms, compartment
+            ''', (row[0],))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [
+                    (ts_ms, comp, raw, None if ph_centi is None else ph_centi / 100, bool(stable))
+                    for ts_ms, comp, raw, ph_centi, stable in rows
+                ]
+        finally:
+            conn.close()
+
+    def count_raw_samples(self, experiment_id: str) -> int:
+        try:
+            row = self._read_conn().execute('''
+                SELECT COUNT(*) FROM raw_samples
+                WHERE series_id = (SELECT id FROM raw_sample_series WHERE experiment_id = ?)
+            ''', (experiment_id,)).fetchone()
+            return row[0]
+        except Exception as e:
+            logger.error(f"Error counting raw samples: {e}")
+            return 0
+
+    # ── Telemetry revisions ───────────────────────────────────────────────
+
+    def get_experiment(self, experiment_id: str):
+        try:
+            row = self._read_conn().execute('SELECT * FROM experiments WHERE id = ?', (experiment_id,)).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error getting experiment {experiment_id}: {e}")
+            return None
+
+    def get_calibration(self, calibration_id: int):
+        """Return one calibrations row by id, or None."""
+        try:
+            row = self._read_conn().execute('SELECT * FROM calibrations WHERE id = ?', (calibration_id,)).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error getting calibration {calibration_id}: {e}")
+            return None
+
+    def create_telemetry_revision(self, experiment_id: str, calibration_ids: str):
+        """Open a 'running' telemetry revision and return its id (None on failure)."""
+        try:
+            with self._write_conn() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO telemetry_revisions (experiment_id, calibration_ids) VALUES (?, ?)',
+                    (experiment_id, calibration_ids),
+                )
+                return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"Error creating telemetry revision: {e}")
+            return None
+
+    def write_telemetry_revision_rows(self, revision_id: int, rows: list) -> bool:
+        """
+        Insert recomputed rows into a revision in one short transaction.
+
+        rows: [(timestamp, c1_ph, c2_ph, c3_ph), ...]
+        """
+        try:
+            with self._write_conn() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO telemetry_revision_rows
+                        (revision_id, timestamp, compartment_1_ph, compartment_2_ph, compartment_3_ph)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(revision_id, *row) for row in rows])
+            return True
+        except Exception as e:
+            logger.error(f"Error writing telemetry revision {revision_id}: {e}")
+            return False
+
+    def finish_telemetry_revision(self, revision_id: int, status: str, sample_count: int, row_count: int):
+        try:
+            with self._write_conn() as conn:
+                conn.execute('''
+                    UPDATE telemetry_revisions
+                    SET status = ?, sample_count = ?, row_count = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (status, sample_count, row_count, revision_id))
+        except Exception as e:
+            logger.error(f"Error finishing telemetry revision {revision_id}: {e}")
+
+    # ── Batched writes ────────────────────────────────────────────────────
+
+    def write_batch(self, telemetry_rows: list, event_rows: list, raw_rows: list = ()) -> bool:
+        """
+        Insert pre-timestamped telemetry, event and raw sample rows in one transaction.
+
+        telemetry_rows: [(experiment_id, timestamp, c1_ph, c2_ph, c3_ph), ...]
+        event_rows:     [(experiment_id, timestamp, level, message, compartment), ...]
+        raw_rows:       [(experiment_id, ts_ms, compartment, raw, inst_ph, stable), ...]
+
+        Returns True on commit, False if the batch was rolled back.
+        """
+        try:
+            with self._write_conn() as conn:
+                if telemetry_rows:
+                    conn.executemany('''
+                        INSERT INTO telemetry (id, experiment_id, timestamp, compartment_1_ph, compartment_2_ph, compartment_3_ph)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', [(str(uuid.uuid4()), *row) for row in telemetry_rows])
+                    TelemetryRollups.apply(conn, telemetry_rows)
+                if event_rows:
+                    conn.executemany('''
+                        INSERT INTO experiment_logs (id, experiment_id, timestamp, level, message, compartment)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', [(str(uuid.uuid4()), *row) for row in event_rows])
+                if raw_rows:
+                    self._insert_raw_samples(conn, raw_rows)
+            return True
+        except Exception as e:
+            # A rolled-back series insert must not leave a stale id behind
+            self._raw_series_ids.clear()
+            logger.error(
+                f"Error writing batch ({len(telemetry_rows)} telemetry, {len(event_rows)} events, "
+                f"{len(raw_rows)} raw samples): {e}"
+            )
+            return False
@@ -0,0 +1,200 @@
+import calendar
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryRollups:
+    """
+    Incrementally maintained min / max / mean / count rollups of the telemetry
+    table at several fixed resolutions, so long experiments can be charted
+    from a few hundred rows instead of every logged measurement.
+
+    All methods take the sqlite3 connection to run on, so the same code serves
+    SQLiteClient's writer (updates) and the DB RPC's connections (queries).
+    """
+
+    # Bucket widths in seconds, finest first
+    RESOLUTIONS = (60, 600, 3600)
+
+    # Default point budget for a chart request
+    DEFAULT_MAX_POINTS = 500
+
+    COMPARTMENTS = (1, 2, 3)
+
+    # ── Schema ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def create_schema(cursor: sqlite3.Cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS telemetry_rollups (
+                experiment_id TEXT NOT NULL,
+                resolution_sec INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                compartment INTEGER NOT NULL,
+                ph_min REAL NOT NULL,
+                ph_max REAL NOT NULL,
+                ph_sum REAL NOT NULL,
+                sample_count INTEGER NOT NULL,
+                PRIMARY KEY (experiment_id, resolution_sec, bucket_start, compartment)
+            ) WITHOUT ROWID
+        ''')
+        # Telemetry is deleted by the frontend; drop the rollups with the experiment
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_experiments_delete_rollups
+            AFTER DELETE ON experiments
+            BEGIN
+                DELETE FROM telemetry_rollups WHERE experiment_id = old.id;
+            END
+        ''')
+
+    # ── Incremental updates ───────────────────────────────────────────────
+
+    @staticmethod
+    def _to_epoch(timestamp: str) -> int:
+        """Parse a CURRENT_TIMESTAMP-style UTC string into epoch seconds."""
+        return calendar.timegm(time.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))
+
+    @staticmethod
+    def _to_timestamp(epoch: int) -> str:
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+    @classmethod
+    def apply(cls, conn: sqlite3.Connection, telemetry_rows: list):
+        """
+        Fold newly inserted telemetry rows into every rollup resolution.
+
+        telemetry_rows: [(experiment_id, timestamp, c1_ph, c2_ph, c3_ph), ...]
+        Must run inside the transaction that inserts the rows.
+        """
+        updates = []
+        for experiment_id, timestamp, *phs in telemetry_rows:
+            epoch = cls._to_epoch(timestamp)
+            for compartment, ph in zip(cls.COMPARTMENTS, phs):
+                if ph is None:
+                    continue
+                for res in cls.RESOLUTIONS:
+                    updates.append((experiment_id, res, epoch - epoch % res, compartment, ph, ph, ph))
+        if not updates:
+            return
+
+        conn.executemany('''
+            INSERT INTO telemetry_rollups
+                (experiment_id, resolution_sec, bucket_start, compartment, ph_min, ph_max, ph_sum, sample_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT (experiment_id, resolution_sec, bucket_start, compartment) DO UPDATE SET
+                ph_min = MIN(ph_min, excluded.ph_min),
+                ph_max = MAX(ph_max, excluded.ph_max),
+                ph_sum = ph_sum + excluded.ph_sum,
+                sample_count = sample_count + 1
+        ''', updates)
+
+    @classmethod
+    def backfill(cls, conn: sqlite3.Connection):
+        """Build rollups for experiments whose telemetry predates the rollup tables."""
+        missing = conn.execute('''
+            SELECT DISTINCT experiment_id FROM telemetry
+            WHERE experiment_id IS NOT NULL
+              AND experiment_id NOT IN (SELECT DISTINCT experiment_id FROM telemetry_rollups)
+        ''').fetchall()
+        for (experiment_id,) in missing:
+            cls.rebuild(conn, experiment_id)
+        if missing:
+            logger.info(f"Backfilled telemetry rollups for {len(missing)} experiment(s).")
+
+    @classmethod
+    def rebuild(cls, conn: sqlite3.Connection, experiment_id: str):
+        """Recompute an experiment's rollups from scratch (e.g. telemetry logged before rollups existed)."""
+        conn.execute('DELETE FROM telemetry_rollups WHERE experiment_id = ?', (experiment_id,))
+        for res in cls.RESOLUTIONS:
+            for c in cls.COMPARTMENTS:
+                col = f"compartment_{c}_ph"
+                conn.execute(f'''
+                    INSERT INTO telemetry_rollups
+                        (experiment_id, resolution_sec, bucket_start, compartment, ph_min, ph_max, ph_sum, sample_count)
+                    SELECT experiment_id, ?, (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ?, ?,
+                           MIN({col}), MAX({col}), SUM({col}), COUNT({col})
+                    FROM telemetry
+                    WHERE experiment_id = ? AND {col} IS NOT NULL
+                    GROUP BY 3
+                ''', (res, res, res, c, experiment_id))
+
+    # ── Queries ───────────────────────────────────────────────────────────
+
+    @classmethod
+    def pick_resolution(cls, lo: int, hi: int, max_points: int) -> int:
+        """
+        Bucket width for charting epoch seconds [lo, hi] in at most max_points
+        buckets: the finest rollup resolution that fits, or else the smallest
+        multiple of the coarsest one that does (query() merges its buckets,
+        counted from the one holding lo, to that width).
+        """
+        max_points = max(1, int(max_points))
+        for res in cls.RESOLUTIONS:
+            if hi // res - lo // res + 1 <= max_points:
+                return res
+        coarsest = cls.RESOLUTIONS[-1]
+        return coarsest * ((hi - (lo - lo % coarsest)) // (max_points * coarsest) + 1)
+
+    @classmethod
+    def query(
+        cls,
+        conn: sqlite3.Connection,
+        experiment_id: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+    ) -> dict:
+        """
+        Return chart-ready telemetry for [start, end] within a point budget.
+
+        When the raw telemetry rows already fit in max_points they are returned
+        as-is (resolution_sec = 0); otherwise the finest rollup that fits is
+        used, with hourly buckets merged further when even those exceed the
+        budget, so a point count never grows past max_points.  Each point carries the Telemetry-shaped `compartment_N_ph` mean
+        plus `_min`, `_max` and `_count` companions.
+
+        Returns: {"resolution_sec": int, "points": [ {...}, ... ]}
+        """
+        start = start or '0000-01-01 00:00:00'
+        end = end or '9999-12-31 23:59:59'
+
+        count, first_ts, last_ts = conn.execute('''
+            SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM telemetry
+            WHERE experiment_id = ? AND timestamp BETWEEN ? AND ?
+        ''', (experiment_id, start, end)).fetchone()
+
+        if count <= max_points:
+            cursor = conn.execute('''
+                SELECT timestamp, compartment_1_ph, compartment_2_ph, compartment_3_ph FROM telemetry
+                WHERE experiment_id = ? AND timestamp BETWEEN ? AND ?
+                ORDER BY timestamp ASC
+            ''', (experiment_id, start, end))
+            columns = [d[0] for d in cursor.description]
+            return {"resolution_sec": 0, "points": [dict(zip(columns, row)) for row in cursor]}
+
+        lo, hi = cls._to_epoch(first_ts), cls._to_epoch(last_ts)
+        width = cls.pick_resolution(lo, hi, max_points)
+        # Widths past the coarsest level are built by merging its buckets
+        res = width if width in cls.RESOLUTIONS else cls.RESOLUTIONS[-1]
+        origin = lo - lo % res
+        params = (origin, origin, width, width, experiment_id, res, origin, hi)
+
+        points = {}
+        for bucket_start, compartment, ph_min, ph_max, ph_sum, n in conn.execute('''
+            SELECT ? + (bucket_start - ?) / ? * ?, compartment, MIN(ph_min), MAX(ph_max), SUM(ph_sum), SUM(sample_count)
+            FROM telemetry_rollups
+            WHERE experiment_id = ? AND resolution_sec = ? AND bucket_start BETWEEN ? AND ?
+            GROUP BY 1, 2
+            ORDER BY 1 ASC
+        ''', params):
+            point = points.setdefault(bucket_start, {"timestamp": cls._to_timestamp(bucket_start)})
+            key = f"compartment_{compartment}_ph"
+            point[key] = round(ph_sum / n, 2)
+            point[f"{key}_min"] = ph_min
+            point[f"{key}_max"] = ph_max
+            point[f"{key}_count"] = n
+        return {"resolution_sec": width, "points": list(points.values())}
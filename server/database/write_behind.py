@@ -0,0 +1,182 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_timestamp() -> str:
+    """UTC timestamp in the same format SQLite's CURRENT_TIMESTAMP produces."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+class WriteBehindQueue:
+    """
+    Buffers telemetry, event and raw sample rows in memory and commits them from a single
+    background task, one transaction per flush window (group commit).
+
+    Rows are timestamped when they are enqueued, so batching does not shift
+    the stored times.  Each queue is bounded: once MAX_PENDING_ROWS rows of a
+    kind are waiting, the oldest row of that kind is dropped and counted in
+    `dropped` rather than letting memory grow during a long DB stall.
+    """
+
+    FLUSH_INTERVAL_SEC = 2.0      # Maximum time a row waits before being committed
+    MAX_PENDING_ROWS = 5000       # Per-kind bound on buffered telemetry/event rows
+    MAX_PENDING_RAW_ROWS = 20000  # Raw samples arrive 3 per second, so they get more headroom
+    FLUSH_THRESHOLD_ROWS = 500    # Flush early once this many rows are waiting
+
+    # Tables written by each kind of row, reported to on_flushed
+    TELEMETRY_TABLES = ("telemetry", "telemetry_rollups")
+    EVENT_TABLES = ("experiment_logs",)
+    RAW_TABLES = ("raw_samples", "raw_sample_series")
+
+    def __init__(self, sqlite, flush_interval_sec: Optional[float] = None, max_pending_rows: Optional[int] = None):
+        self.sqlite = sqlite
+        # Called with the tables a successful flush wrote to (e.g. to invalidate cached reads)
+        self.on_flushed: Optional[Callable[[Iterable[str]], None]] = None
+        self.flush_interval_sec = flush_interval_sec or self.FLUSH_INTERVAL_SEC
+        self.max_pending_rows = max_pending_rows or self.MAX_PENDING_ROWS
+
+        self._telemetry = collections.deque(maxlen=self.max_pending_rows)
+        self._events = collections.deque(maxlen=self.max_pending_rows)
+        self._raw = collections.deque(maxlen=self.MAX_PENDING_RAW_ROWS)
+        self._lock = threading.Lock()
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Backpressure accounting
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.high_water = 0
+        self._dropped_reported = 0
+
+    # ── Producers (control loop) ──────────────────────────────────────────
+
+    def enqueue_telemetry(self, experiment_id: str, ph_data: dict):
+        """Queue one averaged telemetry row for the next flush."""
+        self._append(self._telemetry, (
+            experiment_id, _utc_timestamp(), ph_data.get(1), ph_data.get(2), ph_data.get(3)
+        ))
+
+    def enqueue_event(self, experiment_id: str, level: str, message: str, compartment: int = None):
+        """Queue one experiment log row for the next flush."""
+        self._append(self._events, (experiment_id, _utc_timestamp(), level, message, compartment))
+
+    def enqueue_raw_sample(self, experiment_id: str, ts_ms: int, compartment: int, raw: int, inst_ph: float, stable: bool):
+        """Queue one unaveraged sensor sample for the raw sample store."""
+        self._append(self._raw, (experiment_id, ts_ms, compartment, raw, inst_ph, stable))
+
+    def _append(self, queue: collections.deque, row: tuple):
+        with self._lock:
+            if len(queue) == queue.maxlen:
+                self.dropped += 1  # deque evicts the oldest row on append
+            queue.append(row)
+            self.enqueued += 1
+            pending = len(self._telemetry) + len(self._events) + len(self._raw)
+            self.high_water = max(self.high_water, pending)
+
+        if pending >= self.FLUSH_THRESHOLD_ROWS and self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._telemetry) + len(self._events) + len(self._raw)
+
+    def stats(self) -> dict:
+        """Snapshot of the queue's throughput and backpressure counters."""
+        return {
+            "pending": self.pending,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "high_water": self.high_water,
+        }
+
+    # ── Consumer (background task) ────────────────────────────────────────
+
+    def start(self):
+        """Start the background flush task on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _drain(self):
+        with self._lock:
+            batch = (list(self._telemetry), list(self._events), list(self._raw))
+            self._telemetry.clear()
+            self._events.clear()
+            self._raw.clear()
+        return batch
+
+    def _requeue(self, telemetry: list, events: list, raw: list):
+        """Put rows from a failed flush back at the front, as far as capacity allows."""
+        with self._lock:
+            for queue, rows in ((self._telemetry, telemetry), (self._events, events), (self._raw, raw)):
+                room = queue.maxlen - len(queue)
+                keep = rows[-room:] if room > 0 else []
+                self.dropped += len(rows) - len(keep)
+                queue.extendleft(reversed(keep))
+
+    def _record_flush(self, ok: bool, telemetry: list, events: list, raw: list):
+        if ok:
+            self.flushes += 1
+            self.written += len(telemetry) + len(events) + len(raw)
+            if self.on_flushed:
+                self.on_flushed(
+                    (self.TELEMETRY_TABLES if telemetry else ())
+                    + (self.EVENT_TABLES if events else ())
+                    + (self.RAW_TABLES if raw else ())
+                )
+        else:
+            self.failed_flushes += 1
+            self._requeue(telemetry, events, raw)
+
+        if self.dropped != self._dropped_reported:
+            logger.warning(
+                f"Write-behind queue dropped {self.dropped - self._dropped_reported} rows "
+                f"(pending={self.pending}, high_water={self.high_water})."
+            )
+            self._dropped_reported = self.dropped
+
+    async def flush(self):
+        """Commit everything currently buffered in a single transaction."""
+        batch = self._drain()
+        if not any(batch):
+            return
+        ok = await metrics.to_thread("sqlite.write_batch", self.sqlite.write_batch, *batch)
+        self._record_flush(ok, *batch)
+
+    def close(self):
+        """
+        Stop the background task and synchronously write whatever is still
+        buffered.  Safe to call after the event loop has shut down.
+        """
+        if self._task and not self._task.done():
+            self._task.cancel()
+        batch = self._drain()
+        if any(batch):
+            ok = self.sqlite.write_batch(*batch)
+            self._record_flush(ok, *batch)
+        logger.info(f"Write-behind queue closed: {self.stats()}")
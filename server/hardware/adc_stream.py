@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+try:
+    from adafruit_bus_device.i2c_device import I2CDevice
+except ImportError:
+    I2CDevice = None
+
+
+class ConversionStream(ABC):
+    """
+    Background thread that cycles an ADC's input MUX over the compartments
+    while the converter runs in continuous mode, buffering every sample.
+
+    After each MUX change the first conversion may still belong to the
+    previous input, so DISCARD_AFTER_MUX results are dropped before one is
+    kept: per-channel throughput is data_rate / (1 + DISCARD_AFTER_MUX) /
+    len(channels).  drain() hands the buffered samples to the acquisition
+    task, which no longer has to poll the ADC itself.
+
+    Subclasses provide the converter: _select(), _wait_ready() and
+    _read_conversion().
+    """
+
+    DISCARD_AFTER_MUX = 1
+
+    # Samples kept per channel if nobody drains the stream
+    MAX_BUFFERED = 4096
+
+    # Consecutive failed conversions before a channel reports an error
+    MAX_FAILURES = 4
+    RETRY_DELAY_SEC = 0.05
+
+    def __init__(self, channels: Dict[int, int], data_rate: int):
+        """
+        Args:
+            channels:  {compartment_id: MUX input (0-3)}
+            data_rate: converter samples per second
+        """
+        self.channels = dict(channels)
+        self.data_rate = data_rate
+        self.period_sec = 1.0 / data_rate
+
+        self._lock = threading.Lock()
+        self._samples: Dict[int, List[int]] = {c: [] for c in self.channels}
+        self._errors: Dict[int, Optional[str]] = {c: None for c in self.channels}
+        self._latest: Dict[int, Optional[int]] = {c: None for c in self.channels}
+        self._failures: Dict[int, int] = {c: 0 for c in self.channels}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ConversionStream":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="adc-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._close()
+
+    def drain(self) -> Dict[int, Tuple[List[int], Optional[str]]]:
+        """Samples converted since the last call: {compartment_id: ([raw, ...], error or None)}"""
+        with self._lock:
+            out = {c: (self._samples[c], self._errors[c]) for c in self.channels}
+            self._samples = {c: [] for c in self.channels}
+        return out
+
+    def latest(self, compartment_id: int) -> Optional[int]:
+        return self._latest.get(compartment_id)
+
+    @property
+    def offline(self) -> bool:
+        """True once every channel has failed MAX_FAILURES conversions in a row."""
+        return all(n >= self.MAX_FAILURES for n in self._failures.values())
+
+    def _run(self):
+        failures = self._failures
+        while not self._stop.is_set():
+            for compartment_id, mux in self.channels.items():
+                if self._stop.is_set():
+                    return
+                try:
+                    self._select(mux)
+                    for _ in range(self.DISCARD_AFTER_MUX + 1):
+                        self._wait_ready()
+                    raw = self._read_conversion()
+                except Exception as e:
+                    metrics.inc("adc_read_errors_total", compartment=compartment_id)
+                    failures[compartment_id] += 1
+                    if failures[compartment_id] >= self.MAX_FAILURES:
+                        with self._lock:
+                            self._errors[compartment_id] = str(e)
+                        self._latest[compartment_id] = None
+                    time.sleep(self.RETRY_DELAY_SEC)
+                    continue
+                failures[compartment_id] = 0
+                self._latest[compartment_id] = raw
+                with self._lock:
+                    self._errors[compartment_id] = None
+                    samples = self._samples[compartment_id]
+                    samples.append(raw)
+                    if len(samples) > self.MAX_BUFFERED:
+                        del samples[0]
+
+    # ── Converter hooks ───────────────────────────────────────────────────
+
+    @abstractmethod
+    def _select(self, mux: int):
+        """Point the converter's input MUX at `mux` (continuous mode stays on)."""
+
+    @abstractmethod
+    def _wait_ready(self):
+        """Block until the next conversion is ready; raise if it never arrives."""
+
+    @abstractmethod
+    def _read_conversion(self) -> int:
+        """Signed raw value of the latest conversion."""
+
+    def _close(self):
+        pass
+
+
+class ADS1115Stream(ConversionStream):
+    """
+    ADS1115 in continuous-conversion mode, programmed at register level.
+
+    Gain and data rate are written explicitly.  When rdy_gpio is given, the
+    comparator is set up as a conversion-ready signal (Hi_thresh MSB = 1,
+    Lo_thresh MSB = 0, queue after one conversion) and the ALERT/RDY pin's
+    falling edge is delivered by an lgpio alert callback, so the thread
+    sleeps until data is ready.  Without it, each wait sleeps one nominal
+    conversion period plus the datasheet's 10 % oscillator tolerance.
+    """
+
+    _REG_CONVERSION = 0x00
+    _REG_CONFIG = 0x01
+    _REG_LO_THRESH = 0x02
+    _REG_HI_THRESH = 0x03
+
+    GAINS = {2 / 3: 0, 1: 1, 2: 2, 4: 3, 8: 4, 16: 5}
+    DATA_RATES = {8: 0, 16: 1, 32: 2, 64: 3, 128: 4, 250: 5, 475: 6, 860: 7}
+
+    # Timed waits add the internal oscillator's worst-case drift
+    OSCILLATOR_MARGIN = 1.1
+
+    def __init__(self, i2c, channels: Dict[int, int], gain: float = 1, data_rate: int = 860,
+                 address: int = 0x48, rdy_gpio: Optional[int] = None, gpio_handle: Optional[int] = None):
+        if gain not in self.GAINS:
+            raise ValueError(f"Unsupported ADS1115 gain: {gain}")
+        if data_rate not in self.DATA_RATES:
+            raise ValueError(f"Unsupported ADS1115 data rate: {data_rate}")
+        if I2CDevice is None:
+            raise RuntimeError("adafruit_bus_device is not installed")
+        super().__init__(channels, data_rate)
+
+        self._device = I2CDevice(i2c, address)
+        self._buf = bytearray(3)
+        self._ready = threading.Event()
+        self._rdy_gpio = rdy_gpio if lgpio is not None else None
+        self._gpio_handle = gpio_handle
+        self._callback = None
+
+        # MODE = 0 (continuous); comparator queue disabled (0b11) unless RDY is used
+        self._config = (self.GAINS[gain] << 9) | (self.DATA_RATES[data_rate] << 5)
+        if self._rdy_gpio is not None:
+            self._write_register(self._REG_HI_THRESH, 0x8000)
+            self._write_register(self._REG_LO_THRESH, 0x0000)
+            lgpio.gpio_claim_alert(gpio_handle, rdy_gpio, lgpio.FALLING_EDGE, lgpio.SET_PULL_UP)
+            self._callback = lgpio.callback(gpio_handle, rdy_gpio, lgpio.FALLING_EDGE, self._on_ready)
+            logger.info(f"ADS1115 streaming at {data_rate} SPS, conversion-ready on GPIO {rdy_gpio}.")
+        else:
+            self._config |= 0b11
+            logger.info(f"ADS1115 streaming at {data_rate} SPS (timed waits, no RDY pin).")
+
+    def _on_ready(self, chip, gpio, level, tick):
+        self._ready.set()
+
+    def _write_register(self, reg: int, value: int):
+        self._buf[0] = reg
+        self._buf[1] = (value >> 8) & 0xFF
+        self._buf[2] = value & 0xFF
+        with self._device as i2c:
+            i2c.write(self._buf)
+
+    def _select(self, mux: int):
+        # Single-ended AINx vs GND is MUX 0b100 + x.  An edge from the conversion
+        # still in flight may land after the clear; DISCARD_AFTER_MUX absorbs it.
+        self._ready.clear()
+        self._write_register(self._REG_CONFIG, self._config | ((0b100 | mux) << 12))
+
+    def _wait_ready(self):
+        if self._callback is None:
+            time.sleep(self.period_sec * self.OSCILLATOR_MARGIN)
+            return
+        if not self._ready.wait(timeout=4 * self.period_sec):
+            raise TimeoutError("ADS1115 ALERT/RDY did not signal a conversion")
+        self._ready.clear()
+
+    def _read_conversion(self) -> int:
+        with self._device as i2c:
+            i2c.write_then_readinto(bytes([self._REG_CONVERSION]), self._buf, in_end=2)
+        value = self._buf[0] << 8 | self._buf[1]
+        return value - 0x10000 if value & 0x8000 else value
+
+    def _close(self):
+        if self._callback is not None:
+            try:
+                self._callback.cancel()
+                lgpio.gpio_free(self._gpio_handle, self._rdy_gpio)
+            except Exception as e:
+                logger.warning(f"Failed to release ADS1115 RDY GPIO {self._rdy_gpio}: {e}")
+            self._callback = None
@@ -1,6 +1,8 @@
 import os
 import logging
 from config.pump_helpers import PumpConfigManager
+from .pump_scheduler import PumpScheduler
+from .step_profile import StepProfile
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +12,30 @@ class HardwareAbstractions:
         self.pumps = pumps
         self.PeristalticPump = PeristalticPump
         self.GPIO_AVAILABLE = GPIO_AVAILABLE
+        # Shared pulse program for concurrent doses across pumps
+        self.scheduler = PumpScheduler(pumps)
+
+def _adc_config() -> dict:
+    """ADS1115 acquisition settings from the environment (ADC_MODE, ADC_GAIN, ADC_DATA_RATE, ADC_RDY_GPIO)."""
+    data_rate = os.getenv("ADC_DATA_RATE")
+    rdy_gpio = os.getenv("ADC_RDY_GPIO")
+    gain = os.getenv("ADC_GAIN", "1")
+    return {
+        "mode": os.getenv("ADC_MODE", "single").lower(),
+        "gain": 2 / 3 if gain in ("2/3", "0.667") else float(gain),
+        "data_rate": int(data_rate) if data_rate else None,
+        "rdy_gpio": int(rdy_gpio) if rdy_gpio else None,
+    }
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
 
 def get_hardware() -> HardwareAbstractions:
-    """Factory to get the correct hardware implementation based on OS."""
+    """
+    Factory to get the correct hardware implementation: mock hardware on
+    Windows, or on any OS when MOCK_HARDWARE or SIMULATOR is set; otherwise
+    the real ADC and pumps via lgpio/I2C.
+    """
     
     # Load configuration
     config_mgr = PumpConfigManager()
@@ -20,27 +43,35 @@ def get_hardware() -> HardwareAbstractions:
     p2 = config_mgr.get_pump_config("location_2")
     p3 = config_mgr.get_pump_config("location_3")
     
-    if os.name == 'nt':
-        logger.info("Windows detected. Loading mock hardware.")
-        from .mock_hardware import MockADC, PeristalticPump as MockPump
-        adc = MockADC()
+    use_mock = os.name == 'nt' or _env_flag("MOCK_HARDWARE") or _env_flag("SIMULATOR")
+    if use_mock:
+        logger.info("Windows detected or mock hardware requested. Loading mock hardware.")
+        from .mock_hardware import MockADC, MockPulseEngine, PeristalticPump as MockPump
+        from .simulator import ReactorSimulator
+        # Optional closed-loop pH simulation (SIMULATOR=true, SIM_CONFIG=<json>)
+        simulator = ReactorSimulator.from_env()
+        adc = MockADC(**_adc_config(), simulator=simulator)
+        engine = MockPulseEngine(on_steps=simulator.on_steps if simulator else None)
         # High-level pump interface for both dosing and calibration
         pumps = {
-            1: MockPump(dir_pin=p1["dir_pin"], step_pin=p1["step_pin"], en_pin=p1["en_pin"], steps_per_ml=p1.get("steps_per_ml", 1000.0)),
-            2: MockPump(dir_pin=p2["dir_pin"], step_pin=p2["step_pin"], en_pin=p2["en_pin"], steps_per_ml=p2.get("steps_per_ml", 1000.0)),
-            3: MockPump(dir_pin=p3["dir_pin"], step_pin=p3["step_pin"], en_pin=p3["en_pin"], steps_per_ml=p3.get("steps_per_ml", 1000.0))
+            1: MockPump(dir_pin=p1["dir_pin"], step_pin=p1["step_pin"], en_pin=p1["en_pin"], steps_per_ml=p1.get("steps_per_ml", 1000.0), engine=engine, profile=StepProfile.from_config(p1)),
+            2: MockPump(dir_pin=p2["dir_pin"], step_pin=p2["step_pin"], en_pin=p2["en_pin"], steps_per_ml=p2.get("steps_per_ml", 1000.0), engine=engine, profile=StepProfile.from_config(p2)),
+            3: MockPump(dir_pin=p3["dir_pin"], step_pin=p3["step_pin"], en_pin=p3["en_pin"], steps_per_ml=p3.get("steps_per_ml", 1000.0), engine=engine, profile=StepProfile.from_config(p3))
         }
+        if simulator:
+            for compartment_id, pump in pumps.items():
+                simulator.attach_pump(compartment_id, pump)
         PeristalticPump = MockPump
         GPIO_AVAILABLE = False
     else:
         logger.info("POSIX detected. Loading real hardware via lgpio/I2C.")
         from .real_hardware import RealADC, RealPeristalticPump
-        adc = RealADC()
+        adc = RealADC(**_adc_config())
         # Use RealPeristalticPump for all pump operations (Dosing + Calibration)
         pumps = {
-            1: RealPeristalticPump(dir_pin=p1["dir_pin"], step_pin=p1["step_pin"], en_pin=p1["en_pin"], steps_per_ml=p1.get("steps_per_ml", 1000.0)),
-            2: RealPeristalticPump(dir_pin=p2["dir_pin"], step_pin=p2["step_pin"], en_pin=p2["en_pin"], steps_per_ml=p2.get("steps_per_ml", 1000.0)),
-            3: RealPeristalticPump(dir_pin=p3["dir_pin"], step_pin=p3["step_pin"], en_pin=p3["en_pin"], steps_per_ml=p3.get("steps_per_ml", 1000.0))
+            1: RealPeristalticPump(dir_pin=p1["dir_pin"], step_pin=p1["step_pin"], en_pin=p1["en_pin"], steps_per_ml=p1.get("steps_per_ml", 1000.0), profile=StepProfile.from_config(p1)),
+            2: RealPeristalticPump(dir_pin=p2["dir_pin"], step_pin=p2["step_pin"], en_pin=p2["en_pin"], steps_per_ml=p2.get("steps_per_ml", 1000.0), profile=StepProfile.from_config(p2)),
+            3: RealPeristalticPump(dir_pin=p3["dir_pin"], step_pin=p3["step_pin"], en_pin=p3["en_pin"], steps_per_ml=p3.get("steps_per_ml", 1000.0), profile=StepProfile.from_config(p3))
         }
         PeristalticPump = RealPeristalticPump
         GPIO_AVAILABLE = True
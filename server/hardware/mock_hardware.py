@@ -3,6 +3,10 @@ import math
 import logging
 import threading
 
+from .adc_stream import ConversionStream
+from .pulse_engine import STEP_PERIOD_SEC, PulseEngine
+from .step_profile import StepProfile
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +28,13 @@ class MockADC:
 
     A small sine-wave noise (±30 raw steps) is added to simulate electrode drift.
     Tests may call set_target_ph() to simulate any desired pH environment.
+
+    mode="continuous" mirrors RealADC's ADS1115 streaming mode with a
+    MockADCStream, so the drain()-based acquisition path can run off-Pi.
+
+    With a ReactorSimulator (hardware/simulator.py) the pH comes from its
+    compartment models instead, including noise and outliers, and responds
+    to the mock pumps' doses.
     """
 
     # Reference anchor: pH 7 → raw 15 000
@@ -36,11 +47,29 @@ class MockADC:
     # Peak-to-peak noise amplitude in raw ADC steps (simulates I2C / BNC noise)
     _NOISE_AMPLITUDE: int = 30
 
-    def __init__(self):
+    def __init__(self, mode: str = "single", gain: float = 1, data_rate: int = None, rdy_gpio: int = None,
+                 simulator=None):
         self._start_time = time.time()
+        self.simulator = simulator
         # Configurable target pH per compartment, used to back-calculate a raw int
         self._target_ph = {1: 7.0, 2: 7.0, 3: 7.0}
-        logger.debug("Initialized MockADC")
+        self.stream = None
+        if mode == "continuous":
+            self.stream = MockADCStream(self, data_rate or 860).start()
+        logger.debug(f"Initialized MockADC ({mode})")
+
+    @property
+    def streaming(self) -> bool:
+        return self.stream is not None
+
+    def drain(self) -> dict:
+        if self.stream is None:
+            return {c: ([], None) for c in self._target_ph}
+        return self.stream.drain()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
 
     def set_target_ph(self, compartment_id: int, ph: float):
         """
@@ -51,6 +80,8 @@ class MockADC:
         needing physical hardware.
         """
         self._target_ph[compartment_id] = ph
+        if self.simulator is not None:
+            self.simulator.set_ph(compartment_id, ph)
         logger.debug(f"MockADC: Compartment {compartment_id} target pH set to {ph}")
 
     def read_raw_value(self, compartment_id: int) -> int:
@@ -64,6 +95,10 @@ class MockADC:
         real-world electrical drift and I2C noise, so the readings never appear
         perfectly flat (which would make stability detection trivially true).
         """
+        if self.simulator is not None:
+            ph = self.simulator.measure_ph(compartment_id)
+            return int(round(self._ANCHOR_RAW + self._SLOPE_RAW_PER_PH * (ph - self._ANCHOR_PH)))
+
         target_ph = self._target_ph.get(compartment_id, 7.0)
 
         # Map pH → base raw integer
@@ -75,71 +110,164 @@ class MockADC:
 
         return int(round(base_raw + noise))
 
+    def read_all_raw(self) -> dict:
+        """Scan every compartment at once; same {compartment_id: (raw, error)} shape as RealADC."""
+        return {c: (self.read_raw_value(c), None) for c in self._target_ph}
+
+
+class MockADCStream(ConversionStream):
+    """Simulated ADS1115 continuous conversion: each conversion takes one data-rate period."""
+
+    def __init__(self, adc: MockADC, data_rate: int):
+        super().__init__({c: c - 1 for c in adc._target_ph}, data_rate)
+        self.adc = adc
+        self._mux = 0
+
+    def _select(self, mux: int):
+        self._mux = mux
+
+    def _wait_ready(self):
+        time.sleep(self.period_sec)
+
+    def _read_conversion(self) -> int:
+        return self.adc.read_raw_value(self._mux + 1)
+
+
+class MockPulseEngine(PulseEngine):
+    """
+    Mock counterpart of the pulse engines in pulse_engine.py.
+
+    No pins are toggled: a train of N steps simply takes N * period_sec
+    (scaled by TIME_SCALE so mock doses finish quickly), can be interrupted
+    by its stop event, and reports exactly how many steps it emitted.
+    Emitted steps are accumulated per pin in `steps_emitted`, and reported
+    to on_steps(pin, steps) (e.g. ReactorSimulator.on_steps) as each train
+    or continuous run ends.
+    """
+
+    # Fraction of real time a mock train actually waits
+    TIME_SCALE: float = 0.1
+    POLL_SEC: float = 0.005
+
+    def __init__(self, time_scale: float = None, on_steps=None):
+        self.time_scale = self.TIME_SCALE if time_scale is None else time_scale
+        self.on_steps = on_steps
+        self.steps_emitted = {}
+        self._continuous = {}
+
+    def _record(self, pin: int, steps: int):
+        self.steps_emitted[pin] = self.steps_emitted.get(pin, 0) + steps
+        if self.on_steps is not None:
+            self.on_steps(pin, steps)
+
+    def _finish(self, train, emitted: int):
+        train.finish(emitted)
+        self._record(train.pin, train.emitted)
+
+    def run_program(self, program):
+        active = []
+        while True:
+            new = program.take_new(bool(active))
+            if new is None:
+                return
+            for train in new:
+                train.begin(time.perf_counter())
+                active.append(train)
+            if active:
+                time.sleep(self.POLL_SEC)
+
+            now = time.perf_counter()
+            for train in list(active):
+                # Simulated time elapsed on this train's timeline (none while it settles)
+                elapsed = max(0.0, now - train.started_at) / self.time_scale
+                if elapsed >= train.duration:
+                    active.remove(train)
+                    self._finish(train, train.steps)
+                elif train.stop_event.is_set() or (train.timeout_sec and elapsed >= train.timeout_sec):
+                    active.remove(train)
+                    self._finish(train, train.steps_after(elapsed))
+
+    def start(self, pin: int, period_sec: float = STEP_PERIOD_SEC, ramp=()):
+        self._continuous.setdefault(pin, (time.perf_counter(), period_sec))
+
+    def stop(self, pin: int):
+        started = self._continuous.pop(pin, None)
+        if started:
+            self._record(pin, int((time.perf_counter() - started[0]) / started[1]))
+
 
 class PeristalticPump:
     """Mock implementation of the high-level PeristalticPump class for non-Pi systems."""
-    def __init__(self, dir_pin: int, step_pin: int, en_pin: int, steps_per_ml: float = 1000.0):
+    SETTLE_SEC = 0.0
+
+    def __init__(self, dir_pin: int, step_pin: int, en_pin: int, steps_per_ml: float = 1000.0,
+                 engine=None, profile: StepProfile = None):
         self.dir_pin = dir_pin
         self.step_pin = step_pin
         self.en_pin = en_pin
         self.steps_per_ml = steps_per_ml
+        self.profile = profile or StepProfile()
+        self.engine = engine or MockPulseEngine()
         logger.info(f"[MOCK PUMP] Initialized with pins DIR:{dir_pin}, STEP:{step_pin}, EN:{en_pin}")
 
-        self._prime_thread = None
-        self._stop_prime_event = threading.Event()
+        self._priming = False
         self._stop_dose_event = threading.Event()
+        # Where the pumped liquid goes, for the simulator: "forward" into the reactor
+        self.flow_direction = None
 
     def set_enable(self, state: bool):
         logger.info(f"[MOCK PUMP] enable set to {state}")
 
-    def run_calibration(self, total_steps: int = 10000, safe_delay: float = 0.002):
+    def run_calibration(self, total_steps: int = 10000, safe_delay: float = None):
+        """Mock calibration run, shaped by the pump's StepProfile like RealPeristalticPump's."""
         logger.info(f"[MOCK PUMP] Running calibration for {total_steps} steps...")
-        time.sleep(total_steps * safe_delay * 0.1)  # Accelerated sleep for mock
+        self.flow_direction = None  # Into a measuring cylinder, not the reactor
+        if safe_delay is None:
+            self.engine.emit(self.step_pin, total_steps, segments=self.profile.segments(total_steps))
+        else:
+            self.engine.emit(self.step_pin, total_steps, 2 * safe_delay)
         logger.info("[MOCK PUMP] Calibration run complete.")
 
     def stop_dose(self):
         """Signals an ongoing mock dose operation to stop early."""
         self._stop_dose_event.set()
 
+    def arm(self, direction: str) -> threading.Event:
+        """Mock driver enable ahead of a step train. Returns the dose stop event."""
+        self._stop_dose_event.clear()
+        self.flow_direction = direction
+        return self._stop_dose_event
+
+    def disarm(self):
+        pass
+
     def dose(self, direction: str, steps: int, max_time_sec: int = 30):
-        expected_time = steps * 0.002
+        expected_time = self.profile.duration(steps)
         if expected_time > max_time_sec:
             raise TimeoutError(f"Mock Pump cutoff: dose ({expected_time:.2f}s) > max ({max_time_sec}s).")
 
         logger.info(f"[MOCK PUMP] Dosing {steps} steps {direction}")
-        self._stop_dose_event.clear()
+        stop_event = self.arm(direction)
 
-        # Cap total mock sleep but chunk it so it can be interrupted
-        total_sleep = min(expected_time, 0.5)
-        chunk_size = 0.05
-        elapsed = 0.0
-        while elapsed < total_sleep:
-            if self._stop_dose_event.is_set():
-                logger.info("[MOCK PUMP] Dose stopped early.")
-                break
-            time.sleep(chunk_size)
-            elapsed += chunk_size
+        emitted = self.engine.emit(
+            self.step_pin, steps, stop_event=stop_event, timeout_sec=max_time_sec,
+            segments=self.profile.segments(steps),
+        )
+        if emitted < steps:
+            logger.info(f"[MOCK PUMP] Dose stopped early after {emitted} of {steps} steps.")
 
     def start_prime(self, direction: str = "forward"):
-        """Starts a continuous background loop of step pulses."""
-        if self._prime_thread and self._prime_thread.is_alive():
+        """Starts a continuous step train until stop_prime() is called."""
+        if self._priming:
             return  # Already running
-
-        self._stop_prime_event.clear()
-        self._prime_thread = threading.Thread(target=self._prime_loop, args=(direction,), daemon=True)
-        self._prime_thread.start()
+        logger.info(f"[MOCK PUMP] Starting continuous prime: {direction}")
+        self.flow_direction = direction
+        self.engine.start(self.step_pin, self.profile.cruise_period_sec, self.profile.ramp)
+        self._priming = True
 
     def stop_prime(self):
-        """Signals the background loop to stop and disable the motor."""
-        self._stop_prime_event.set()
-        if self._prime_thread:
-            self._prime_thread.join(timeout=1.0)
-
-    def _prime_loop(self, direction: str):
-        """Mock background loop logic."""
-        logger.info(f"[MOCK PUMP] Starting continuous prime: {direction}")
-        try:
-            while not self._stop_prime_event.is_set():
-                time.sleep(0.1)  # Prevent CPU pegging
-        finally:
+        """Stops the continuous step train."""
+        if self._priming:
+            self.engine.stop(self.step_pin)
+            self._priming = False
             logger.info(f"[MOCK PUMP] Stopped continuous prime.")
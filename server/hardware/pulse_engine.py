@@ -0,0 +1,314 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+# Default STEP timing: 1 ms high + 1 ms low.  PhController.SEC_PER_STEP is
+# derived from this, so dose durations and step budgets always agree.
+STEP_HALF_PERIOD_SEC = 0.001
+STEP_PERIOD_SEC = 2 * STEP_HALF_PERIOD_SEC
+
+
+class PulseTrain:
+    """
+    One pin's share of a pulse program: `steps` pulses of `period_sec`, or a
+    sequence of constant-rate (period_sec, count) segments for ramped trains
+    (see step_profile.StepProfile.segments()).
+
+    not_before is a perf_counter() time before which the engine must not
+    emit the first edge, e.g. the driver's settle time after EN; a train
+    joining a program that is already running waits for it on its own.
+    """
+
+    def __init__(self, pin: int, steps: int, period_sec: float = STEP_PERIOD_SEC,
+                 stop_event: Optional[threading.Event] = None, timeout_sec: Optional[float] = None,
+                 on_done: Optional[Callable[["PulseTrain"], None]] = None,
+                 segments: Optional[Sequence[Tuple[float, int]]] = None,
+                 not_before: Optional[float] = None):
+        self.pin = pin
+        self.segments = [(p, int(c)) for p, c in (segments or [(period_sec, steps)]) if c > 0]
+        self.steps = sum(c for _, c in self.segments)
+        self._bounds = list(itertools.accumulate(c for _, c in self.segments))
+        self.stop_event = stop_event or threading.Event()
+        self.timeout_sec = timeout_sec
+        self.on_done = on_done
+        self.not_before = not_before
+
+        self.emitted = 0
+        self.started_at: Optional[float] = None
+        self.done = False
+
+    @property
+    def duration(self) -> float:
+        return sum(p * c for p, c in self.segments)
+
+    def begin(self, now: float) -> float:
+        """Set and return the time the train starts: now, or later if not_before says so."""
+        self.started_at = max(now, self.not_before or now)
+        return self.started_at
+
+    def period_for(self, step: int) -> float:
+        """Period of the step with zero-based index `step`."""
+        i = min(bisect.bisect_right(self._bounds, step), len(self.segments) - 1)
+        return self.segments[i][0]
+
+    def steps_after(self, elapsed_sec: float) -> int:
+        """Steps emitted `elapsed_sec` after the train started (for engines without a progress counter)."""
+        emitted = 0
+        for period, count in self.segments:
+            if elapsed_sec < period * count:
+                return emitted + int(elapsed_sec / period)
+            elapsed_sec -= period * count
+            emitted += count
+        return emitted
+
+    def should_stop(self, now: float) -> bool:
+        """True once the train was asked to stop or ran past its timeout."""
+        if self.stop_event.is_set():
+            return True
+        return bool(self.timeout_sec) and now - self.started_at >= self.timeout_sec
+
+    def finish(self, emitted: int):
+        self.emitted = min(self.steps, emitted)
+        self.done = True
+        if self.on_done:
+            self.on_done(self)
+
+
+class PulseProgram:
+    """
+    A set of pulse trains sharing one timeline and one worker thread.
+
+    Trains may be added while the program runs; the engine picks them up on
+    its next pass.  Once the engine has found the program empty it closes it,
+    and add() returns False so the caller knows to start a new program.
+    """
+
+    def __init__(self, trains: List[PulseTrain] = ()):
+        self._lock = threading.Lock()
+        self._incoming = list(trains)
+        self._closed = False
+        self.trains = list(trains)  # Every train ever added
+
+    def add(self, train: PulseTrain) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._incoming.append(train)
+            self.trains.append(train)
+            return True
+
+    def take_new(self, still_active: bool) -> Optional[List[PulseTrain]]:
+        """Trains added since the last call; None (and closed) when nothing is left to run."""
+        with self._lock:
+            new, self._incoming = self._incoming, []
+            if not new and not still_active:
+                self._closed = True
+                return None
+            return new
+
+
+class PulseEngine(ABC):
+    """
+    Emits STEP pulse trains.  Subclasses implement run_program(), which runs
+    every train of a PulseProgram on the calling thread until all are done,
+    plus start()/stop() for continuous trains (priming).
+    """
+
+    def emit(self, pin: int, steps: int, period_sec: float = STEP_PERIOD_SEC,
+             stop_event: Optional[threading.Event] = None, timeout_sec: Optional[float] = None,
+             segments: Optional[Sequence[Tuple[float, int]]] = None) -> int:
+        """Emit one train and block until it ends.  Returns the steps actually emitted."""
+        train = PulseTrain(pin, steps, period_sec, stop_event, timeout_sec, segments=segments)
+        self.run_program(PulseProgram([train]))
+        return train.emitted
+
+    @abstractmethod
+    def run_program(self, program: PulseProgram):
+        """Run every train of `program`, including ones added meanwhile, until all are done."""
+
+    @abstractmethod
+    def start(self, pin: int, period_sec: float = STEP_PERIOD_SEC, ramp: Sequence[Tuple[float, int]] = ()):
+        """Run `ramp` segments, then pulse at period_sec until stop(pin)."""
+
+    @abstractmethod
+    def stop(self, pin: int):
+        """End a continuous train started by start()."""
+
+
+class SoftwarePulseEngine(PulseEngine):
+    """
+    Toggles STEP pins from the calling thread.
+
+    Fallback for when lgpio's hardware-timed TX queue is unavailable.  Edges
+    are scheduled against absolute perf_counter deadlines, so sleep overshoot
+    does not accumulate into a slower step rate, and edges of several trains
+    that fall due together are written in the same pass.
+    """
+
+    # Edges closer than this to the next deadline are written in the same pass
+    EDGE_SLACK_SEC = 0.00005
+
+    def __init__(self, write: Callable[[int, int], None]):
+        self._write = write
+        self._continuous: Dict[int, threading.Event] = {}
+
+    def run_program(self, program: PulseProgram):
+        # train -> [next edge deadline, current level, current half period]
+        active: Dict[PulseTrain, list] = {}
+        while True:
+            new = program.take_new(bool(active))
+            if new is None:
+                return
+            now = time.perf_counter()
+            for train in new:
+                if train.steps:
+                    active[train] = [train.begin(now), 0, 0.0]
+                else:
+                    train.begin(now)
+                    train.finish(0)
+
+            if not active:
+                continue
+            due = min(state[0] for state in active.values())
+            remaining = due - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+
+            now = time.perf_counter()
+            for train, state in list(active.items()):
+                edge, level = state[0], state[1]
+                if edge > now + self.EDGE_SLACK_SEC:
+                    continue
+                if level == 0:
+                    # Only stop between pulses, never mid-pulse
+                    if train.emitted >= train.steps or train.should_stop(now):
+                        del active[train]
+                        train.finish(train.emitted)
+                        continue
+                    self._write(train.pin, 1)
+                    state[1] = 1
+                    state[2] = train.period_for(train.emitted) / 2
+                else:
+                    self._write(train.pin, 0)
+                    state[1] = 0
+                    train.emitted += 1
+                state[0] = edge + state[2]
+
+    def start(self, pin: int, period_sec: float = STEP_PERIOD_SEC, ramp: Sequence[Tuple[float, int]] = ()):
+        if pin in self._continuous:
+            return
+        stop_event = threading.Event()
+        self._continuous[pin] = stop_event
+
+        def run():
+            if ramp:
+                self.emit(pin, 0, stop_event=stop_event, segments=ramp)
+            while not stop_event.is_set():
+                self.emit(pin, 1000, period_sec, stop_event)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self, pin: int):
+        stop_event = self._continuous.pop(pin, None)
+        if stop_event:
+            stop_event.set()
+
+
+class LgpioPulseEngine(PulseEngine):
+    """
+    Hardware-timed STEP pulse trains via lgpio.tx_pulse().
+
+    Each train is queued whole (on/off times in microseconds and a cycle
+    count); lgpio's own timing thread toggles the pins, so the worker only
+    wakes every POLL_SEC to check completions and stop requests.  Several
+    pumps running at once cost one idle poll loop instead of busy loops.
+    """
+
+    POLL_SEC = 0.02
+
+    def __init__(self, handle: int):
+        self.handle = handle
+
+    def _half_us(self, period_sec: float) -> int:
+        return max(1, int(round(period_sec * 1e6 / 2)))
+
+    def _cancel(self, pin: int):
+        try:
+            lgpio.tx_pulse(self.handle, pin, 0, 0)
+            lgpio.gpio_write(self.handle, pin, 0)
+        except Exception as e:
+            logger.error(f"Failed to cancel pulse train on GPIO {pin}: {e}")
+
+    def _queue(self, train: PulseTrain):
+        train.started_at = time.perf_counter()
+        # Segments queue back to back on the pin's TX queue
+        for period, count in train.segments:
+            half_us = self._half_us(period)
+            lgpio.tx_pulse(self.handle, train.pin, half_us, half_us, 0, count)
+
+    def run_program(self, program: PulseProgram):
+        active: List[PulseTrain] = []
+        waiting: List[PulseTrain] = []  # Trains whose not_before has not come yet
+        while True:
+            new = program.take_new(bool(active or waiting))
+            if new is None:
+                return
+            now = time.perf_counter()
+            for train in new:
+                train.begin(now)
+                if not train.steps:
+                    train.finish(0)
+                    continue
+                waiting.append(train)
+
+            for train in list(waiting):
+                if train.stop_event.is_set():
+                    waiting.remove(train)
+                    train.finish(0)
+                elif train.started_at <= now:
+                    waiting.remove(train)
+                    self._queue(train)
+                    active.append(train)
+
+            if active or waiting:
+                time.sleep(min([self.POLL_SEC] + [max(0.0, t.started_at - now) for t in waiting]))
+
+            now = time.perf_counter()
+            for train in list(active):
+                if not lgpio.tx_busy(self.handle, train.pin, lgpio.TX_PWM):
+                    active.remove(train)
+                    train.finish(train.steps)
+                elif train.should_stop(now):
+                    self._cancel(train.pin)
+                    active.remove(train)
+                    # tx_pulse has no progress counter; infer it from elapsed time and the segments
+                    train.finish(train.steps_after(time.perf_counter() - train.started_at))
+
+    def start(self, pin: int, period_sec: float = STEP_PERIOD_SEC, ramp: Sequence[Tuple[float, int]] = ()):
+        for ramp_period, count in ramp:
+            half_us = self._half_us(ramp_period)
+            lgpio.tx_pulse(self.handle, pin, half_us, half_us, 0, count)
+        half_us = self._half_us(period_sec)
+        lgpio.tx_pulse(self.handle, pin, half_us, half_us, 0, 0)  # 0 cycles = run until cancelled
+
+    def stop(self, pin: int):
+        self._cancel(pin)
+
+
+def create_pulse_engine(handle: int) -> PulseEngine:
+    """Hardware-timed engine when this lgpio build supports TX pulses, else the software fallback."""
+    if lgpio is not None and hasattr(lgpio, "tx_pulse") and hasattr(lgpio, "tx_busy"):
+        return LgpioPulseEngine(handle)
+    logger.warning("lgpio TX pulses unavailable. Falling back to software-timed STEP pulses.")
+    return SoftwarePulseEngine(lambda pin, level: lgpio.gpio_write(handle, pin, level))
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional
+
+from core.metrics import metrics
+
+from .pulse_engine import PulseProgram, PulseTrain
+
+logger = logging.getLogger(__name__)
+
+
+class DoseResult(NamedTuple):
+    pump_id: int
+    requested: int
+    emitted: int
+    duration_sec: float
+
+    @property
+    def completed(self) -> bool:
+        return self.emitted >= self.requested
+
+
+class PumpScheduler:
+    """
+    Runs every pump dose on one shared pulse program and one worker thread.
+
+    Dose requests that arrive within MERGE_WINDOW_SEC of each other (e.g. all
+    three compartments dropping below their minimum in the same tick) start
+    together on one timeline; a request that arrives while a program is
+    already running joins it instead of waiting or spawning another thread.
+    Each pump keeps its own step count and stop event, and dose() resolves
+    with that pump's DoseResult when its train ends.
+    """
+
+    MERGE_WINDOW_SEC = 0.02
+
+    def __init__(self, pumps: Dict[int, object]):
+        self.pumps = pumps
+        self.engine = next((p.engine for p in pumps.values() if getattr(p, "engine", None)), None)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pump-wave")
+
+        self._program: Optional[PulseProgram] = None
+        self._batch = []               # Trains waiting for the merge window to close
+        self._batch_task: Optional[asyncio.Task] = None
+        self._program_task: Optional[asyncio.Task] = None
+        self._active: Dict[int, PulseTrain] = {}
+
+    def is_dosing(self, pump_id: int) -> bool:
+        return pump_id in self._active
+
+    async def dose(self, pump_id: int, direction: str, steps: int, max_time_sec: Optional[float] = None) -> DoseResult:
+        """Queue a dose on the shared program and wait for this pump's train to finish."""
+        pump = self.pumps.get(pump_id)
+        if pump is None:
+            raise KeyError(f"No pump for id {pump_id}")
+        if self.engine is None:
+            raise RuntimeError("Pump scheduler has no pulse engine (GPIO unavailable).")
+        if pump_id in self._active:
+            raise RuntimeError(f"Pump {pump_id} is already dosing.")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_done(train: PulseTrain):
+            # Called on the worker thread
+            pump.disarm()
+            loop.call_soon_threadsafe(self._complete, pump_id, train, future)
+
+        stop_event = pump.arm(direction)
+        # The driver needs a moment after EN before this pump's first STEP edge
+        train = PulseTrain(
+            pump.step_pin, steps, stop_event=stop_event, timeout_sec=max_time_sec,
+            on_done=on_done, segments=pump.profile.segments(steps),
+            not_before=time.perf_counter() + getattr(pump, "SETTLE_SEC", 0.0),
+        )
+        self._active[pump_id] = train
+        self._batch.append(train)
+        if self._batch_task is None:
+            self._batch_task = asyncio.create_task(self._dispatch())
+        return await future
+
+    def stop(self, pump_id: int):
+        """Stop one pump's train at the next pulse boundary."""
+        train = self._active.get(pump_id)
+        if train:
+            train.stop_event.set()
+
+    def _complete(self, pump_id: int, train: PulseTrain, future: asyncio.Future):
+        self._active.pop(pump_id, None)
+        metrics.inc("doses_total", pump=pump_id)
+        metrics.inc("dose_steps_total", train.emitted, pump=pump_id)
+        if train.emitted < train.steps:
+            metrics.inc("doses_incomplete_total", pump=pump_id)
+        if not future.done():
+            future.set_result(DoseResult(
+                pump_id, train.steps, train.emitted, time.perf_counter() - train.started_at
+            ))
+
+    async def _dispatch(self):
+        await asyncio.sleep(self.MERGE_WINDOW_SEC)
+        batch, self._batch, self._batch_task = self._batch, [], None
+
+        # Join the running program if there is one; otherwise start a new one
+        if self._program is not None and all(self._program.add(t) for t in batch):
+            return
+        self._program = PulseProgram(batch)
+        # Not awaited: doses resolve through their trains' on_done callbacks
+        self._program_task = asyncio.create_task(
+            metrics.run_in_executor("pump.program", self._executor, self._run, self._program)
+        )
+
+    def _run(self, program: PulseProgram):
+        try:
+            self.engine.run_program(program)
+        except Exception as e:
+            logger.error(f"Pump pulse program failed: {e}")
+            program.take_new(False)  # Close it so new doses start a fresh program
+            for train in program.trains:
+                if not train.done:
+                    train.finish(train.emitted)
+
+    def close(self):
+        for train in list(self._active.values()):
+            train.stop_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -2,6 +2,12 @@ import logging
 import time
 import threading
 
+from core.metrics import metrics
+
+from .adc_stream import ADS1115Stream
+from .pulse_engine import create_pulse_engine
+from .step_profile import StepProfile
+
 logger = logging.getLogger(__name__)
 
 # To prevent import errors on Windows, we catch ImportErrors when these files are parsed.
@@ -35,19 +41,66 @@ def get_gpio_chip():
 
 
 class RealADC:
-    def __init__(self):
+    """
+    ADS1115 pH front end.
+
+    mode="single" (default) reads through Adafruit AnalogIn: every read
+    starts a conversion and polls for it.  mode="continuous" hands the chip
+    to an ADS1115Stream thread that cycles the MUX in continuous-conversion
+    mode (optionally woken by the ALERT/RDY pin on rdy_gpio); the
+    acquisition task then drain()s its samples instead of scanning.
+    Gain and data rate are set explicitly in both modes.
+    """
+
+    # Pause between retry passes of a scan (one pause per pass, not per channel)
+    RETRY_DELAY_SEC = 0.05
+
+    # compartment_id → ADS1115 input
+    CHANNEL_INPUTS = {1: 0, 2: 1, 3: 2}
+
+    def __init__(self, mode: str = "single", gain: float = 1, data_rate: int = None, rdy_gpio: int = None):
+        # Configuration errors must stop startup, not be mistaken for a missing ADC
+        if mode not in ("single", "continuous"):
+            raise ValueError(f"Unknown ADC mode: {mode!r}")
+        if gain not in ADS1115Stream.GAINS:
+            raise ValueError(f"Unsupported ADC_GAIN {gain}: expected one of 2/3, 1, 2, 4, 8, 16")
+        if data_rate is not None and data_rate not in ADS1115Stream.DATA_RATES:
+            raise ValueError(
+                f"Unsupported ADC_DATA_RATE {data_rate}: expected one of {', '.join(map(str, ADS1115Stream.DATA_RATES))}"
+            )
+        self.mode = mode
+        self.gain = gain
+        self.data_rate = data_rate
+        self.rdy_gpio = rdy_gpio
         self.adc_connected = False
         self.ads = None
         self.channels = {}
         self.i2c = None
+        self.stream = None
         self._init_hardware()
 
+    @property
+    def streaming(self) -> bool:
+        # An offline stream hands back to read_all_raw(), which re-initialises it
+        return self.stream is not None and self.adc_connected
+
     def _init_hardware(self):
         """Dedicated initialization method for self-healing/re-scan logic."""
+        if self.stream is not None:
+            # Release the old stream's thread and RDY GPIO before starting a new one
+            self.stream.stop()
+            self.stream = None
         try:
             # Re-initialize I2C bus and ADS1115
             self.i2c = busio.I2C(board.SCL, board.SDA)
-            self.ads = ADS.ADS1115(self.i2c)
+            if self.mode == "continuous":
+                self.stream = ADS1115Stream(
+                    self.i2c, self.CHANNEL_INPUTS, gain=self.gain, data_rate=self.data_rate or 860,
+                    rdy_gpio=self.rdy_gpio, gpio_handle=get_gpio_chip() if self.rdy_gpio is not None else None,
+                ).start()
+                self.adc_connected = True
+                return
+            self.ads = ADS.ADS1115(self.i2c, gain=self.gain, data_rate=self.data_rate)
             from adafruit_ads1x15.ads1x15 import Pin
 
             # Re-map channels
@@ -62,6 +115,7 @@ class RealADC:
             self.adc_connected = False
             self.ads = None
             self.channels = {}
+            self.stream = None
             logger.warning(f"Failed to initialize RealADC: {e}. System running in degraded mode.")
 
     def read_raw_value(self, compartment_id: int, max_retries: int = 4) -> int | None:
@@ -79,38 +133,137 @@ class RealADC:
             if not self.adc_connected:
                 return None  # Still offline
 
+        if self.stream is not None:
+            if self._stream_offline():
+                return None
+            return self.stream.latest(compartment_id)
+
         chan = self.channels.get(compartment_id)
         if not chan:
             return None
 
         last_err = None
         for attempt in range(max_retries):
+            if attempt:
+                metrics.inc("adc_read_retries_total", compartment=compartment_id)
             try:
                 return chan.value  # Raw 16-bit integer from the ADC
             except Exception as e:
                 last_err = e
+                metrics.inc("adc_read_errors_total", compartment=compartment_id)
                 # Runtime disconnection or I2C noise — brief pause before retry
                 time.sleep(0.05)
 
         # If all retries fail, it's likely a hardware disconnection
         logger.error(f"Hardware error reading raw ADC value: {last_err}. Setting ADC to offline.")
+        metrics.inc("adc_offline_total")
         self.adc_connected = False
         return None
 
+    def read_all_raw(self, max_retries: int = 4) -> dict:
+        """
+        Read every configured channel in one call (one worker-thread hop per scan).
+
+        Returns {compartment_id: (raw, error)}: raw is the 16-bit integer or
+        None, error a message for a channel that kept failing, else None.
+
+        The retry policy covers the whole scan: channels that fail are retried
+        together after a single RETRY_DELAY_SEC pause, up to max_retries
+        passes.  If every channel fails the ADC is treated as disconnected,
+        exactly like read_raw_value(): it goes offline, the channels read as
+        None and the next scan tries to re-initialise it.
+        """
+        if not self.adc_connected:
+            self._init_hardware()
+            if not self.adc_connected:
+                return {c: (None, None) for c in self.CHANNEL_INPUTS}
+
+        if self.stream is not None:
+            if self._stream_offline():
+                return {c: (None, None) for c in self.CHANNEL_INPUTS}
+            return {c: (self.stream.latest(c), None) for c in self.CHANNEL_INPUTS}
+
+        results = {}
+        errors = {}
+        pending = list(self.channels)
+        for attempt in range(max_retries):
+            if attempt:
+                time.sleep(self.RETRY_DELAY_SEC)
+            failed = []
+            for compartment_id in pending:
+                if attempt:
+                    metrics.inc("adc_read_retries_total", compartment=compartment_id)
+                try:
+                    results[compartment_id] = (self.channels[compartment_id].value, None)
+                except Exception as e:
+                    metrics.inc("adc_read_errors_total", compartment=compartment_id)
+                    errors[compartment_id] = e
+                    failed.append(compartment_id)
+            pending = failed
+            if not pending:
+                return results
+
+        if len(pending) == len(self.channels):
+            logger.error(f"Hardware error scanning ADC: {errors[pending[0]]}. Setting ADC to offline.")
+            metrics.inc("adc_offline_total")
+            self.adc_connected = False
+            return {c: (None, None) for c in self.channels}
+
+        for compartment_id in pending:
+            results[compartment_id] = (None, str(errors[compartment_id]))
+        return results
+
+    def drain(self) -> dict:
+        """Continuous mode: samples since the last call, {compartment_id: ([raw, ...], error)}."""
+        if self.stream is None:
+            return {c: ([], None) for c in self.CHANNEL_INPUTS}
+        samples = self.stream.drain()
+        self._stream_offline()
+        return samples
+
+    def _stream_offline(self) -> bool:
+        """
+        Continuous mode counterpart of read_all_raw()'s disconnect handling:
+        once every channel of the stream keeps failing, the ADC goes offline
+        and the next scan tries to re-initialise it.
+        """
+        if not self.stream.offline:
+            return False
+        if self.adc_connected:
+            logger.error("ADS1115 stream failing on every channel. Setting ADC to offline.")
+            metrics.inc("adc_offline_total")
+            self.adc_connected = False
+        return True
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+
 
 class RealPeristalticPump:
-    """High-level pump controller for calibration and precise dosing using lgpio."""
-    def __init__(self, dir_pin: int, step_pin: int, en_pin: int, steps_per_ml: float = 1000.0):
+    """
+    High-level pump controller for calibration and precise dosing using lgpio.
+
+    STEP pulses come from a pulse engine (hardware-timed lgpio TX pulses, or
+    the software fallback), so a dose is a single call that emits an exact
+    step train shaped by the pump's StepProfile instead of a Python toggle loop.
+    """
+
+    # Driver wake-up time between enabling EN and the first STEP pulse
+    SETTLE_SEC = 0.05
+
+    def __init__(self, dir_pin: int, step_pin: int, en_pin: int, steps_per_ml: float = 1000.0,
+                 engine=None, profile: StepProfile = None):
         self.dir_pin = dir_pin
         self.step_pin = step_pin
         self.en_pin = en_pin
         self.steps_per_ml = steps_per_ml
+        self.profile = profile or StepProfile()
         self.h_gpio = None
+        self.engine = engine
 
-        # Threading support for continuous priming
-        self._prime_thread = None
-        self._stop_prime_event = threading.Event()
         self._stop_dose_event = threading.Event()
+        self._priming = False
 
         try:
             self.h_gpio = get_gpio_chip()
@@ -119,6 +272,7 @@ class RealPeristalticPump:
             lgpio.gpio_claim_output(self.h_gpio, self.en_pin)
             # Disable motor by default (EN = HIGH for TMC2209)
             lgpio.gpio_write(self.h_gpio, self.en_pin, 1)
+            self.engine = self.engine or create_pulse_engine(self.h_gpio)
             logger.info(f"RealPeristalticPump initialized (DIR:{dir_pin}, STEP:{step_pin}, EN:{en_pin}).")
         except Exception as e:
             logger.error(f"Failed to initialize RealPeristalticPump pins: {e}")
@@ -128,17 +282,22 @@ class RealPeristalticPump:
         val = 0 if state else 1  # Low = Enabled
         lgpio.gpio_write(self.h_gpio, self.en_pin, val)
 
-    def run_calibration(self, total_steps: int = 10000, safe_delay: float = 0.002):
+    def run_calibration(self, total_steps: int = 10000, safe_delay: float = None):
+        """
+        Pump total_steps for a volume calibration.  The train is shaped by the
+        pump's StepProfile exactly like dose(), so steps_per_ml is measured at
+        the speed the pump doses at.  safe_delay (half-period, seconds) forces
+        a flat train instead, for bench tests.
+        """
         logger.info(f"Running real calibration for {total_steps} steps...")
         if self.h_gpio is None: return
         try:
             lgpio.gpio_write(self.h_gpio, self.en_pin, 0)  # Enable
             time.sleep(0.1)
-            for _ in range(total_steps):
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 1)
-                time.sleep(safe_delay)
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 0)
-                time.sleep(safe_delay)
+            if safe_delay is None:
+                self.engine.emit(self.step_pin, total_steps, segments=self.profile.segments(total_steps))
+            else:
+                self.engine.emit(self.step_pin, total_steps, 2 * safe_delay)
         finally:
             lgpio.gpio_write(self.h_gpio, self.en_pin, 1)  # Disable
 
@@ -146,61 +305,56 @@ class RealPeristalticPump:
         """Signals an ongoing dose operation to stop early."""
         self._stop_dose_event.set()
 
-    def dose(self, direction: str, steps: int, max_time_sec: int = 30):
-        if self.h_gpio is None: return
+    def arm(self, direction: str) -> threading.Event:
+        """Set DIR and enable the driver ahead of a step train. Returns the dose stop event."""
         self._stop_dose_event.clear()
-        # Simple dose implementation for high-level handlers
-        try:
+        if self.h_gpio is not None:
             dir_val = 1 if direction in (1, "forward") else 0
             lgpio.gpio_write(self.h_gpio, self.dir_pin, dir_val)
             lgpio.gpio_write(self.h_gpio, self.en_pin, 0)
-            time.sleep(0.05)
-
-            delay = 0.001
-            for _ in range(steps):
-                if self._stop_dose_event.is_set():
-                    logger.info(f"Dose stopped early after {_} steps.")
-                    break
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 1)
-                time.sleep(delay)
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 0)
-                time.sleep(delay)
-        finally:
-            lgpio.gpio_write(self.h_gpio, self.en_pin, 1)
+        return self._stop_dose_event
 
-    def start_prime(self, direction: str = "forward"):
-        """Starts a continuous background loop of step pulses."""
-        if self._prime_thread and self._prime_thread.is_alive():
-            return  # Already running
+    def disarm(self):
+        """Disable the driver after a step train."""
+        if self.h_gpio is not None:
+            lgpio.gpio_write(self.h_gpio, self.en_pin, 1)
 
-        self._stop_prime_event.clear()
-        # Daemon thread ensures it dies if the main program crashes
-        self._prime_thread = threading.Thread(target=self._prime_loop, args=(direction,), daemon=True)
-        self._prime_thread.start()
+    def dose(self, direction: str, steps: int, max_time_sec: int = 30):
+        if self.h_gpio is None: return
+        stop_event = self.arm(direction)
+        try:
+            time.sleep(self.SETTLE_SEC)
 
-    def stop_prime(self):
-        """Signals the background loop to stop and disable the motor."""
-        self._stop_prime_event.set()
-        if self._prime_thread:
-            self._prime_thread.join(timeout=1.0)
+            # max_time_sec is a hard safety cutoff on the train, not just a pre-check
+            emitted = self.engine.emit(
+                self.step_pin, steps, stop_event=stop_event, timeout_sec=max_time_sec,
+                segments=self.profile.segments(steps),
+            )
+            if emitted < steps:
+                logger.info(f"Dose stopped early after {emitted} of {steps} steps.")
+        finally:
+            self.disarm()
 
-    def _prime_loop(self, direction: str):
-        """The actual continuous pulsing logic (runs in the background)."""
-        if self.h_gpio is None: return
+    def start_prime(self, direction: str = "forward"):
+        """Starts a continuous step train until stop_prime() is called."""
+        if self.h_gpio is None or self._priming:
+            return  # Already running
 
         dir_val = 1 if direction in (1, "forward") else 0
         lgpio.gpio_write(self.h_gpio, self.dir_pin, dir_val)
         lgpio.gpio_write(self.h_gpio, self.en_pin, 0)  # Enable driver (Active LOW)
+        self.engine.start(self.step_pin, self.profile.cruise_period_sec, self.profile.ramp)
+        self._priming = True
 
-        delay = 0.001  # 1ms delay for safe speed
+    def stop_prime(self):
+        """Stops the continuous step train and disables the motor."""
+        if self.h_gpio is None:
+            return
         try:
-            while not self._stop_prime_event.is_set():
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 1)
-                time.sleep(delay)
-                lgpio.gpio_write(self.h_gpio, self.step_pin, 0)
-                time.sleep(delay)
+            self.engine.stop(self.step_pin)
         finally:
+            self._priming = False
             # Guarantee the motor goes back to sleep when stopped
             try:
                 lgpio.gpio_write(self.h_gpio, self.en_pin, 1)
-            except: pass
+            except Exception: pass
@@ -0,0 +1,187 @@
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CompartmentModel:
+    """
+    Linearised acid/base balance of one well-mixed compartment.
+
+    The culture produces acid at acid_rate (mmol H+ per litre per hour),
+    which the buffer absorbs at buffer_capacity (mmol per litre per pH
+    unit), so with no dosing the pH drifts down at acid_rate /
+    buffer_capacity pH units per hour.
+
+    A base injection of v mL at base_molarity adds v × base_molarity mmol,
+    i.e. a total pH rise of that / (volume × buffer_capacity).  It reaches
+    the probe only after dead_time_sec (tubing and transport), then mixes in
+    first-order with time constant mixing_tau_sec + mixing_sec_per_ml × v,
+    so bigger doses take longer to show fully.
+    """
+
+    def __init__(self, ph: float = 7.0, volume_ml: float = 1000.0, buffer_capacity: float = 10.0,
+                 acid_rate: float = 2.0, base_molarity: float = 0.5, dead_time_sec: float = 3.0,
+                 mixing_tau_sec: float = 20.0, mixing_sec_per_ml: float = 10.0):
+        if volume_ml <= 0 or buffer_capacity <= 0:
+            raise ValueError("volume_ml and buffer_capacity must be positive")
+        self.ph = ph
+        self.volume_ml = volume_ml
+        self.buffer_capacity = buffer_capacity
+        self.acid_rate = acid_rate
+        self.base_molarity = base_molarity
+        self.dead_time_sec = dead_time_sec
+        self.mixing_tau_sec = mixing_tau_sec
+        self.mixing_sec_per_ml = mixing_sec_per_ml
+        # Injections still mixing: [total pH rise, mixing start, tau, fraction applied]
+        self._mixing: List[list] = []
+        self._t = 0.0
+
+    @property
+    def drift_ph_per_sec(self) -> float:
+        return -self.acid_rate / self.buffer_capacity / 3600
+
+    def inject(self, volume_ml: float, t: float):
+        """Add volume_ml of base at simulation time t."""
+        self.advance(t)
+        mmol = volume_ml * self.base_molarity
+        rise = mmol / (self.volume_ml / 1000 * self.buffer_capacity)
+        tau = self.mixing_tau_sec + self.mixing_sec_per_ml * volume_ml
+        self._mixing.append([rise, t + self.dead_time_sec, tau, 0.0])
+
+    def advance(self, t: float) -> float:
+        """Integrate up to simulation time t and return the bulk pH."""
+        if t > self._t:
+            self.ph += self.drift_ph_per_sec * (t - self._t)
+            self._t = t
+        for injection in list(self._mixing):
+            rise, start, tau, applied = injection
+            if t <= start:
+                continue
+            mixed = 1 - math.exp(-(t - start) / tau)
+            if mixed > 0.999:
+                mixed = 1.0
+                self._mixing.remove(injection)
+            self.ph += rise * (mixed - applied)
+            injection[3] = mixed
+        self.ph = min(14.0, max(0.0, self.ph))
+        return self.ph
+
+
+class ReactorSimulator:
+    """
+    Closed-loop stand-in for the reactor behind MockADC and the mock pumps.
+
+    MockADC reads measure_ph() instead of a fixed target, and the mock pulse
+    engine reports every finished train through on_steps(): forward steps on
+    a pump's STEP pin become base injections of steps / steps_per_ml mL into
+    that pump's compartment.  Measurements carry Gaussian noise (noise_ph)
+    and, with probability outlier_prob, a spike of up to ±outlier_ph, so
+    the filter chain and dosing logic can be exercised off-Pi.
+
+    time_scale > 1 runs the chemistry faster than the wall clock, e.g. 60
+    to see an hour of acid drift per minute.
+    """
+
+    NOISE_PH = 0.01
+    OUTLIER_PROB = 0.002
+    OUTLIER_PH = 1.0
+
+    def __init__(self, compartments: Dict[int, CompartmentModel], noise_ph: float = NOISE_PH,
+                 outlier_prob: float = OUTLIER_PROB, outlier_ph: float = OUTLIER_PH,
+                 time_scale: float = 1.0, seed: Optional[int] = None):
+        self.compartments = compartments
+        self.noise_ph = noise_ph
+        self.outlier_prob = outlier_prob
+        self.outlier_ph = outlier_ph
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._pumps: Dict[int, tuple] = {}   # STEP pin → (compartment_id, pump)
+        self.injected_ml: Dict[int, float] = {c: 0.0 for c in compartments}
+
+    @classmethod
+    def from_config(cls, config: dict, compartment_ids=(1, 2, 3)) -> "ReactorSimulator":
+        """
+        {"compartments": {"1": {"ph": 6.9, "acid_rate": 3.0}, ...},   # CompartmentModel kwargs
+         "defaults": {...}, "noise_ph": 0.01, "outlier_prob": 0.002,
+         "outlier_ph": 1.0, "time_scale": 1.0, "seed": 42}
+        """
+        defaults = config.get("defaults", {})
+        overrides = {int(c): params for c, params in config.get("compartments", {}).items()}
+        compartments = {c: CompartmentModel(**{**defaults, **overrides.get(c, {})}) for c in compartment_ids}
+        return cls(
+            compartments,
+            noise_ph=float(config.get("noise_ph", cls.NOISE_PH)),
+            outlier_prob=float(config.get("outlier_prob", cls.OUTLIER_PROB)),
+            outlier_ph=float(config.get("outlier_ph", cls.OUTLIER_PH)),
+            time_scale=float(config.get("time_scale", 1.0)),
+            seed=config.get("seed"),
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["ReactorSimulator"]:
+        """Simulator enabled by SIMULATOR=true, parameters from the SIM_CONFIG JSON file if set."""
+        if os.getenv("SIMULATOR", "false").lower() not in ("1", "true", "yes"):
+            return None
+        config = {}
+        path = os.getenv("SIM_CONFIG")
+        if path:
+            try:
+                with open(path) as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load simulator config {path}: {e}. Using defaults.")
+        simulator = cls.from_config(config)
+        logger.info(f"Reactor simulator enabled ({simulator.time_scale:g}x real time).")
+        return simulator
+
+    def now(self) -> float:
+        """Simulation time in seconds."""
+        return (time.monotonic() - self._t0) * self.time_scale
+
+    # ── Sensors ───────────────────────────────────────────────────────────
+
+    def true_ph(self, compartment_id: int) -> float:
+        with self._lock:
+            return self.compartments[compartment_id].advance(self.now())
+
+    def measure_ph(self, compartment_id: int) -> float:
+        """Probe reading: true pH plus noise and the occasional outlier."""
+        ph = self.true_ph(compartment_id) + self._rng.gauss(0.0, self.noise_ph)
+        if self._rng.random() < self.outlier_prob:
+            ph += self._rng.uniform(-self.outlier_ph, self.outlier_ph)
+        return ph
+
+    def set_ph(self, compartment_id: int, ph: float):
+        with self._lock:
+            model = self.compartments[compartment_id]
+            model.advance(self.now())
+            model.ph = ph
+
+    # ── Actuators ─────────────────────────────────────────────────────────
+
+    def attach_pump(self, compartment_id: int, pump):
+        """Route the pump's STEP pin output into compartment_id."""
+        self._pumps[pump.step_pin] = (compartment_id, pump)
+
+    def on_steps(self, pin: int, steps: int):
+        """Pulse engine callback (any thread): a train on `pin` delivered `steps` steps."""
+        entry = self._pumps.get(pin)
+        if entry is None or steps <= 0:
+            return
+        compartment_id, pump = entry
+        if getattr(pump, "flow_direction", None) != "forward":
+            return  # Reverse flow and calibration runs do not reach the reactor
+        volume_ml = steps / (pump.steps_per_ml or 1000.0)
+        with self._lock:
+            self.compartments[compartment_id].inject(volume_ml, self.now())
+            self.injected_ml[compartment_id] += volume_ml
+        logger.debug(f"Simulator: {volume_ml:.3f} mL base into compartment {compartment_id}.")
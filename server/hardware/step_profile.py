@@ -0,0 +1,145 @@
+import logging
+import math
+from typing import List, Optional, Tuple
+
+from .pulse_engine import STEP_PERIOD_SEC
+
+logger = logging.getLogger(__name__)
+
+# (period_sec, step_count) runs that make up one step train
+Segments = List[Tuple[float, int]]
+
+
+class StepProfile:
+    """
+    Step-rate profile for one pump, read from the pump's `profile` entry in
+    pp_config.json:
+
+        "profile": {"type": "trapezoid", "start_hz": 500, "cruise_hz": 2000, "accel_hz_per_sec": 4000}
+
+    type:
+        constant  — every step at cruise_hz (the historical fixed 2 ms step)
+        trapezoid — linear rate ramp from start_hz to cruise_hz and back down
+        scurve    — raised-cosine ramp (jerk-limited); accel_hz_per_sec is its peak
+
+    A train is returned as a short list of constant-rate segments (the ramps
+    are quantised into RAMP_SEGMENTS levels), which maps directly onto
+    queued lgpio tx_pulse() calls.  duration() and max_steps() use the same
+    segments, so dose planning agrees with what the pulse engine emits.
+
+    Ramps are opt-in: the shipped pp_config.json has no `profile` entries,
+    so every pump keeps the constant 2 ms step its steps_per_ml was
+    calibrated at.  A faster cruise_hz changes the delivered volume per
+    step, so add a profile to one pump at a time and re-run its volume
+    calibration before dosing with it: run_calibration() emits the same
+    profiled train as a dose, so the new steps_per_ml matches.
+    """
+
+    KINDS = ("constant", "trapezoid", "scurve")
+    RAMP_SEGMENTS = 16
+    DEFAULT_HZ = 1.0 / STEP_PERIOD_SEC
+
+    def __init__(self, kind: str = "constant", cruise_hz: float = DEFAULT_HZ,
+                 start_hz: Optional[float] = None, accel_hz_per_sec: Optional[float] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown step profile type: {kind!r}")
+        if cruise_hz <= 0:
+            raise ValueError("cruise_hz must be positive")
+        self.kind = kind
+        self.cruise_hz = float(cruise_hz)
+        self.start_hz = min(float(start_hz or cruise_hz), self.cruise_hz)
+        self.accel_hz_per_sec = float(accel_hz_per_sec or 0)
+        if kind != "constant" and self.accel_hz_per_sec <= 0 and self.start_hz < self.cruise_hz:
+            raise ValueError(f"{kind} profile needs a positive accel_hz_per_sec")
+        self._ramp = self._build_ramp()
+        self._ramp_steps = sum(count for _, count in self._ramp)
+
+    @classmethod
+    def from_config(cls, pump_config: dict) -> "StepProfile":
+        """Profile from a pp_config.json pump entry; falls back to constant rate if absent or invalid."""
+        cfg = pump_config.get("profile")
+        if not cfg:
+            return cls()
+        try:
+            return cls(
+                kind=cfg.get("type", "constant"),
+                cruise_hz=float(cfg.get("cruise_hz", cls.DEFAULT_HZ)),
+                start_hz=cfg.get("start_hz"),
+                accel_hz_per_sec=cfg.get("accel_hz_per_sec"),
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Invalid step profile for {pump_config.get('name', 'pump')}: {e}. Using constant rate.")
+            return cls()
+
+    # ── Ramp construction ─────────────────────────────────────────────────
+
+    def _rate_at(self, fraction: float) -> float:
+        """Step rate at `fraction` (0..1) of the way through the acceleration ramp."""
+        if self.kind == "scurve":
+            fraction = (1 - math.cos(math.pi * fraction)) / 2
+        return self.start_hz + (self.cruise_hz - self.start_hz) * fraction
+
+    def _build_ramp(self) -> Segments:
+        """Acceleration segments from start_hz up to (not including) cruise_hz."""
+        if self.kind == "constant" or self.start_hz >= self.cruise_hz:
+            return []
+        delta = self.cruise_hz - self.start_hz
+        # Trapezoid: constant accel.  S-curve: accel peaks at pi/2 times the mean.
+        ramp_sec = delta / self.accel_hz_per_sec * (math.pi / 2 if self.kind == "scurve" else 1)
+        slice_sec = ramp_sec / self.RAMP_SEGMENTS
+
+        ramp, carry = [], 0.0
+        for i in range(self.RAMP_SEGMENTS):
+            rate = self._rate_at((i + 0.5) / self.RAMP_SEGMENTS)
+            exact = rate * slice_sec + carry
+            count = int(exact)
+            carry = exact - count
+            if count:
+                ramp.append((1.0 / rate, count))
+        return ramp
+
+    # ── Trains ────────────────────────────────────────────────────────────
+
+    @property
+    def cruise_period_sec(self) -> float:
+        return 1.0 / self.cruise_hz
+
+    @property
+    def ramp(self) -> Segments:
+        return list(self._ramp)
+
+    def segments(self, steps: int) -> Segments:
+        """Constant-rate runs for a train of `steps` steps: ramp up, cruise, ramp down."""
+        steps = max(0, int(steps))
+        up, budget = [], steps // 2
+        for period, count in self._ramp:
+            if budget <= 0:
+                break
+            take = min(count, budget)
+            up.append((period, take))
+            budget -= take
+
+        ramp_steps = sum(count for _, count in up)
+        cruise = steps - 2 * ramp_steps
+        if ramp_steps == self._ramp_steps:
+            cruise_period = self.cruise_period_sec
+        else:
+            # A short train never reaches cruise: its middle runs at the highest rate it reached
+            cruise_period = up[-1][0] if up else 1.0 / self.start_hz
+        middle = [(cruise_period, cruise)] if cruise else []
+        return up + middle + list(reversed(up))
+
+    def duration(self, steps: int) -> float:
+        return sum(period * count for period, count in self.segments(steps))
+
+    def max_steps(self, seconds: float) -> int:
+        """Largest step count whose train fits in `seconds`."""
+        lo, hi = 0, max(1, int(seconds * self.cruise_hz) + 1)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.duration(mid) <= seconds:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import logging
 import time
@@ -5,26 +6,46 @@ import os
 from dotenv import load_dotenv
 
 from hardware import get_hardware
-from database import SQLiteClient
+from database import SQLiteClient, WriteBehindQueue, ExperimentExporter, TelemetryReprocessor
 from mqtt.client import MQTTClient
 from ph_controller import PhController
 from config.pump_helpers import PumpConfigManager
 
+from core.metrics import metrics
+from core.profiler import SamplingProfiler
+from core.prometheus import MetricFamily, PrometheusExporter
+from core.scheduler import Scheduler
 from core.state_manager import ReactorState
+from managers.acquisition_manager import AcquisitionManager
 from managers.sensor_manager import SensorManager
 from managers.dosing_manager import DosingManager
+from managers.export_manager import ExportManager
+from managers.reprocess_manager import ReprocessManager
 from managers.mqtt_handler import MQTTCommandHandler
 
 logger = logging.getLogger(__name__)
 
 class ReactorController:
     # ── Timing constants ───────────────────────────────────────────────────
-    CYCLE_INTERVAL_SEC = 1       # Main control-loop period
-    RECOVERY_SLEEP_SEC = 5       # Sleep after an unhandled loop error
+    CYCLE_INTERVAL_SEC = 1       # Main control-loop period (CONTROL_INTERVAL_SEC)
+    PUBLISH_INTERVAL_SEC = 1     # Live telemetry/status publish period (PUBLISH_INTERVAL_SEC)
+    METRICS_INTERVAL_SEC = 10    # Latency metrics publish period (METRICS_INTERVAL_SEC)
+    RECOVERY_SLEEP_SEC = 5       # Back-off after an unhandled control-cycle error
 
-    def __init__(self):
+    def __init__(self, profile: bool = False):
         # 1. State Store
         self.state = ReactorState()
+        self.cycle_interval_sec = float(os.getenv("CONTROL_INTERVAL_SEC", str(self.CYCLE_INTERVAL_SEC)))
+        self.publish_interval_sec = float(os.getenv("PUBLISH_INTERVAL_SEC", str(self.PUBLISH_INTERVAL_SEC)))
+        self.metrics_interval_sec = float(os.getenv("METRICS_INTERVAL_SEC", str(self.METRICS_INTERVAL_SEC)))
+        # Prometheus /metrics endpoint (METRICS_HTTP_PORT=0 disables it)
+        metrics_port = int(os.getenv("METRICS_HTTP_PORT", "9108") or 0)
+        self.exporter = PrometheusExporter(
+            metrics, host=os.getenv("METRICS_HTTP_HOST", "127.0.0.1"), port=metrics_port
+        ) if metrics_port else None
+        # Fixed-rate deadline scheduler for the control, publish and acquisition tasks
+        self.scheduler = Scheduler()
+        self._last_experiment_id = None
 
         # 2. Hardware Abstraction Layer
         self.hw = get_hardware()
@@ -32,6 +53,9 @@ class ReactorController:
         # 3. Database Layer
         db_path = os.getenv("SQLITE_DB_PATH", "reactor.db")
         self.sqlite = SQLiteClient(db_path=db_path)
+        self.db_writer = WriteBehindQueue(self.sqlite)
+        # Optional raw 1 Hz sample store alongside the averaged telemetry table
+        self.store_raw_samples = os.getenv("RAW_SAMPLE_STORE", "false").lower() in ("1", "true", "yes")
 
         # 4. Independent Config/Math Planners
         self.pump_config_manager = PumpConfigManager()
@@ -40,15 +64,25 @@ class ReactorController:
         # 5. Infrastructure (MQTT)
         mqtt_url = os.getenv("MQTT_BROKER_URL", "localhost")
         mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
-        self.mqtt = MQTTClient(broker_url=mqtt_url, port=mqtt_port)
+        self.mqtt = MQTTClient(broker_url=mqtt_url, port=mqtt_port, db_path=db_path)
+        # Cached DB RPC reads go stale whenever buffered rows are committed
+        self.db_writer.on_flushed = self.mqtt.result_cache.invalidate
 
         # 6. Specific Business Logic Managers
+        # ADC sampling runs at its own rate; the control loop consumes decimated values
+        self.acquisition = AcquisitionManager(
+            hw=self.hw,
+            state=self.state,
+            sample_rate_hz=float(os.getenv("ADC_SAMPLE_RATE_HZ", str(AcquisitionManager.SAMPLE_RATE_HZ)))
+        )
+
         self.sensor_manager = SensorManager(
             hw=self.hw,
             state=self.state,
             ph_ctrl=self.ph_ctrl,
             log_event_callback=self._log_event,
-            mqtt_client=self.mqtt
+            mqtt_client=self.mqtt,
+            acquisition=self.acquisition
         )
 
         self.dosing_manager = DosingManager(
@@ -60,6 +94,26 @@ class ReactorController:
             mqtt_client=self.mqtt
         )
 
+        self.export_manager = ExportManager(
+            exporter=ExperimentExporter(db_path=db_path),
+            mqtt_client=self.mqtt
+        )
+
+        self.reprocess_manager = ReprocessManager(
+            reprocessor=TelemetryReprocessor(self.sqlite),
+            mqtt_client=self.mqtt
+        )
+
+        if self.exporter:
+            self.exporter.add_collector(self._runtime_metrics)
+
+        # Sampling profiler: on from startup with --profile / PROFILE=true, or started over MQTT
+        self.profile_on_start = profile or os.getenv("PROFILE", "false").lower() in ("1", "true", "yes")
+        self.profiler = SamplingProfiler(
+            output_dir=os.getenv("PROFILE_DIR", "profiles"),
+            interval_sec=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+        )
+
         # 7. Hook up network boundary handlers
         self.mqtt_handler = MQTTCommandHandler(self)
         self.mqtt_handler.register_callbacks(self.mqtt)
@@ -71,8 +125,7 @@ class ReactorController:
         """Broadcast an event via MQTT and persist it to the DB if an experiment is active."""
         self.mqtt.publish_event(level, message, compartment)
         if self.state.active_experiment:
-            await asyncio.to_thread(
-                self.sqlite.log_event,
+            self.db_writer.enqueue_event(
                 self.state.active_experiment["id"], level, message, compartment
             )
 
@@ -81,6 +134,7 @@ class ReactorController:
         self.ph_ctrl.reload(self.sqlite.get_latest_calibrations())
 
     def reload_active_experiment(self):
+        self.sqlite.invalidate_active_experiment()
         self.state.active_experiment = self.sqlite.get_active_experiment()
 
     def send_initial_state_to_frontend(self):
@@ -118,24 +172,107 @@ class ReactorController:
                 else:
                     ph_averages[c] = None
 
-            await asyncio.to_thread(
-                self.sqlite.log_telemetry,
-                self.state.active_experiment["id"],
-                ph_averages
-            )
+            self.db_writer.enqueue_telemetry(self.state.active_experiment["id"], ph_averages)
             self.mqtt.publish_logged_telemetry(ph_averages)
             self.state.last_measurement_time = time.time()
 
+    def _log_raw_samples(self, sensor_data: dict):
+        """Queue every valid 1 Hz reading for the raw sample store."""
+        if not (self.store_raw_samples and self.state.active_experiment):
+            return
+
+        exp_id = self.state.active_experiment["id"]
+        ts_ms = int(time.time() * 1000)
+        for c, reading in sensor_data.items():
+            if reading.get("raw") is not None:
+                self.db_writer.enqueue_raw_sample(
+                    exp_id, ts_ms, c, reading["raw"], reading.get("inst_ph"), reading.get("stable", False)
+                )
+
     def _publish(self, sensor_data: dict):
         """Publish real-time telemetry and system validation signals via MQTT."""
-        self.mqtt.publish_telemetry(sensor_data)
+        if sensor_data:
+            self.mqtt.publish_telemetry(sensor_data)
         self.mqtt.publish_status({
             "health": "ok",
             "active_experiment": self.state.active_experiment["id"] if self.state.active_experiment else None,
             "db_connected": True,
+            "db_cache": self.mqtt.result_cache.stats(),
+            "scheduler": self.scheduler.stats(),
         })
 
 
+    async def publish_cycle(self):
+        """Publish the latest control-cycle snapshot (every publish_interval_sec)."""
+        with metrics.timed("stage.publish"):
+            self._publish(self.state.latest_sensor_data)
+
+    async def metrics_cycle(self):
+        """Publish per-stage latency histograms and scheduler jitter (every metrics_interval_sec)."""
+        self.mqtt.publish_metrics({
+            "timestamp": time.time(),
+            "latency": metrics.snapshot(),
+            "scheduler": self.scheduler.stats(),
+        })
+
+    async def control_cycle(self):
+        """One control cycle: sync the experiment, read sensors, dose and log (every cycle_interval_sec)."""
+        # Active configuration syncing (served from the SQLiteClient cache)
+        current_exp = self.sqlite.get_active_experiment()
+        self.state.active_experiment = current_exp
+        current_exp_id = current_exp["id"] if current_exp else None
+
+        if current_exp_id:
+            if self._last_experiment_id != current_exp_id:
+                logger.info("New experiment started. Resetting telemetry clock.")
+                self.state.last_measurement_time = 0.0
+        elif self._last_experiment_id is not None:
+            logger.info("Experiment stopped. Halting all actively running doses and primes.")
+            for c in self.state.COMPARTMENTS:
+                self.dosing_manager.stop_manual_dose(c)
+
+            for p in self.hw.pumps.values():
+                if hasattr(p, "stop_dose"): p.stop_dose()
+                if hasattr(p, "stop_prime"): p.stop_prime()
+
+        self._last_experiment_id = current_exp_id
+
+        # Component Pipeline Orchestration (each stage feeds a latency histogram)
+        with metrics.timed("stage.read_and_process"):
+            sensor_data = await self.sensor_manager.read_and_process()
+        with metrics.timed("stage.evaluate_and_dose"):
+            await self.dosing_manager.evaluate_and_dose(sensor_data)
+
+        with metrics.timed("stage.log_telemetry"):
+            await self._log_telemetry(sensor_data)
+            self._log_raw_samples(sensor_data)
+        self.state.latest_sensor_data = sensor_data
+
+    def _runtime_metrics(self):
+        """Scrape-time counters and gauges for the Prometheus exporter."""
+        tasks = self.scheduler.tasks.items()
+        yield MetricFamily("loop_cycles_total", "counter", "Scheduled task cycles run.",
+                           [({"task": n}, t.cycles) for n, t in tasks])
+        yield MetricFamily("loop_overruns_total", "counter", "Cycles that finished after their next deadline.",
+                           [({"task": n}, t.overruns) for n, t in tasks])
+        yield MetricFamily("loop_skipped_total", "counter", "Ticks dropped to resynchronise after an overrun.",
+                           [({"task": n}, t.skipped) for n, t in tasks])
+        yield MetricFamily("loop_errors_total", "counter", "Scheduled task cycles that raised.",
+                           [({"task": n}, t.errors) for n, t in tasks])
+        yield MetricFamily("adc_scans_total", "counter", "ADC acquisition ticks.", [({}, self.acquisition.scans)])
+
+        queue = self.db_writer.stats()
+        yield MetricFamily("db_queue_depth", "gauge", "Rows buffered in the write-behind queue.", [({}, queue["pending"])])
+        yield MetricFamily("db_queue_high_water", "gauge", "Most rows ever buffered at once.", [({}, queue["high_water"])])
+        for key in ("enqueued", "written", "dropped", "flushes", "failed_flushes"):
+            yield MetricFamily(f"db_queue_{key}_total", "counter", f"Write-behind queue {key.replace('_', ' ')}.",
+                               [({}, queue[key])])
+
+        cache = self.mqtt.result_cache.stats()
+        yield MetricFamily("db_cache_entries", "gauge", "Cached DB RPC results.", [({}, cache["entries"])])
+        for key in ("hits", "misses", "invalidations", "evictions"):
+            yield MetricFamily(f"db_cache_{key}_total", "counter", f"DB RPC result cache {key}.", [({}, cache[key])])
+
     # ── Entry Point Main Orchestrator Loop ──────────────────────────────────
 
     async def run_loop(self):
@@ -143,64 +280,57 @@ class ReactorController:
         self.mqtt.connect()
         await asyncio.sleep(1) # Paho TCP handshake latency
         self.mqtt.publish_server_online()
+        self.db_writer.start()
+        if self.profile_on_start:
+            self.profiler.start(asyncio.get_running_loop())
+        if self.exporter:
+            await self.exporter.start()
+
+        # Each task runs on its own fixed-rate deadline grid: acquisition and
+        # publishing are not delayed by (and do not delay) the control cycle
+        self.scheduler.register("acquisition", self.acquisition.tick, 1.0 / self.acquisition.sample_rate_hz)
+        self.scheduler.register("control", self.control_cycle, self.cycle_interval_sec,
+                                error_backoff_sec=self.RECOVERY_SLEEP_SEC)
+        self.scheduler.register("publish", self.publish_cycle, self.publish_interval_sec)
+        self.scheduler.register("metrics", self.metrics_cycle, self.metrics_interval_sec)
         logger.info("Starting orchestrated Reactor control loop...")
 
-        loop_last_experiment_id = None
-
-        while self.state.running:
-            try:
-                # Active configuration syncing
-                current_exp = self.sqlite.get_active_experiment()
-                self.state.active_experiment = current_exp
-                current_exp_id = current_exp["id"] if current_exp else None
-
-                if current_exp_id:
-                    if loop_last_experiment_id != current_exp_id:
-                        logger.info("New experiment started. Resetting telemetry clock.")
-                        self.state.last_measurement_time = 0.0
-                elif loop_last_experiment_id is not None:
-                    logger.info("Experiment stopped. Halting all actively running doses and primes.")
-                    for c in self.state.COMPARTMENTS:
-                        self.dosing_manager.stop_manual_dose(c)
-
-                    for p in self.hw.pumps.values():
-                        if hasattr(p, "stop_dose"): p.stop_dose()
-                        if hasattr(p, "stop_prime"): p.stop_prime()
-
-                loop_last_experiment_id = current_exp_id
-
-                # Component Pipeline Orchestration
-                sensor_data = await self.sensor_manager.read_and_process()
-                await self.dosing_manager.evaluate_and_dose(sensor_data)
-                
-                await self._log_telemetry(sensor_data)
-                self._publish(sensor_data)
-
-                await asyncio.sleep(self.CYCLE_INTERVAL_SEC)
-            except Exception as exc:
-                logger.error(f"Unhandled error in main loop: {exc}")
-                await asyncio.sleep(self.RECOVERY_SLEEP_SEC)
+        await self.scheduler.run(lambda: self.state.running)
 
     def stop(self):
         self.state.running = False
         logger.info("Shutting down. Halting all pumps...")
+        if self.profiler.running:
+            self.profiler.stop()
+            self.profiler.dump("shutdown")
         for p in self.hw.pumps.values():
             if hasattr(p, "stop_dose"): p.stop_dose()
             if hasattr(p, "stop_prime"): p.stop_prime()
+        self.hw.scheduler.close()
         self.mqtt.publish_server_offline()
         self.mqtt.disconnect()
+        self.acquisition.close()
+        if self.exporter: self.exporter.close()
+        if hasattr(self.hw.adc, "close"): self.hw.adc.close()
+        self.export_manager.close()
+        self.reprocess_manager.close()
+        self.db_writer.close()  # Flush buffered rows before the pool goes away
+        self.sqlite.close()
         logger.info("Reactor controller stopped.")
 
 
 def main_sync():
     # Helper scope to protect asyncio context
     load_dotenv()
+    parser = argparse.ArgumentParser(description="COLOSH reactor pH controller")
+    parser.add_argument("--profile", action="store_true", help="run the sampling profiler from startup (same as PROFILE=true)")
+    args = parser.parse_args()
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
 
-    controller = ReactorController()
+    controller = ReactorController(profile=args.profile)
     try:
         asyncio.run(controller.run_loop())
     except KeyboardInterrupt:
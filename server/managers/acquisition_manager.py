@@ -0,0 +1,118 @@
+import collections
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionManager:
+    """
+    Samples every compartment's ADC channel at its own rate, independent of
+    the control loop: tick() is registered with the core.scheduler at
+    sample_rate_hz, which also tracks its overruns and jitter.
+
+    Readings land in per-compartment ring buffers of (timestamp, raw) pairs.
+    The control loop calls take() once per cycle and gets every sample since
+    its previous call, which SensorManager decimates into one value — so
+    oversampling improves noise rejection without adding control, publish or
+    DB work.  ADC reads run on a dedicated single worker thread, never the
+    default executor used by doses and exports, and each scan reads every
+    channel in a single hw.adc.read_all_raw() call.
+
+    When the ADC streams on its own (hw.adc.streaming, ADS1115 continuous
+    mode) nothing is read here: each tick drain()s the samples the stream
+    converted since the last one, and sample_rate_hz is only the drain rate.
+    """
+
+    # Default samples per second per channel (ADC_SAMPLE_RATE_HZ)
+    SAMPLE_RATE_HZ = 8.0
+
+    # Ring buffers hold this many seconds of samples in case a consumer stalls
+    BUFFER_SEC = 10
+
+    # Floor on the ring size: a streaming ADC delivers far more than sample_rate_hz
+    MIN_BUFFERED_SAMPLES = 8192
+
+    # take() holds the latest reading for at most this many sample periods
+    MAX_HOLD_PERIODS = 5
+
+    def __init__(self, hw: Any, state: Any, sample_rate_hz: Optional[float] = None):
+        self.hw = hw
+        self.state = state
+        self.sample_rate_hz = sample_rate_hz or self.SAMPLE_RATE_HZ
+        maxlen = max(self.MIN_BUFFERED_SAMPLES, int(self.sample_rate_hz * self.BUFFER_SEC))
+
+        self._buffers: Dict[int, collections.deque] = {
+            c: collections.deque(maxlen=maxlen) for c in self.state.COMPARTMENTS
+        }
+        # Last read error per compartment (None once a read succeeds again)
+        self._errors: Dict[int, Optional[str]] = {c: None for c in self.state.COMPARTMENTS}
+        # Latest reading per compartment (None while the sensor is offline)
+        self._last_raw: Dict[int, Optional[int]] = {c: None for c in self.state.COMPARTMENTS}
+        self._last_at: Dict[int, float] = {c: 0.0 for c in self.state.COMPARTMENTS}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adc")
+
+        self.scans = 0
+
+    def take(self, compartment_id: int) -> Tuple[List[int], Optional[str]]:
+        """
+        Drain the samples acquired since the last call.
+
+        Returns (raws, error): raws oldest first (empty if the sensor is
+        offline), error the last read failure if the channel is failing.
+        If no new scan finished since the last call (control loop faster than
+        the sample rate) the latest reading is held and returned again, but
+        only for MAX_HOLD_PERIODS sample periods: after that the acquisition
+        worker is stalled, and a frozen value would look perfectly stable, so
+        no raws and a staleness error are returned instead.
+        """
+        buf = self._buffers[compartment_id]
+        raws = [raw for _, raw in buf]
+        buf.clear()
+        if raws or self._last_raw[compartment_id] is None:
+            return raws, self._errors[compartment_id]
+        age = time.time() - self._last_at[compartment_id]
+        if age > self.MAX_HOLD_PERIODS / self.sample_rate_hz:
+            metrics.inc("adc_stale_reads_total", compartment=compartment_id)
+            return [], f"No ADC reading for {age:.1f} s"
+        return [self._last_raw[compartment_id]], self._errors[compartment_id]
+
+    async def _scan(self):
+        try:
+            results = await metrics.run_in_executor("adc.read_all_raw", self._executor, self.hw.adc.read_all_raw)
+        except Exception as exc:
+            logger.error(f"ADC scan failed: {exc}")
+            results = {c: (None, str(exc)) for c in self.state.COMPARTMENTS}
+        now = time.time()
+        for c, (raw, error) in results.items():
+            self._errors[c] = error
+            self._last_raw[c] = raw
+            if raw is not None:
+                self._last_at[c] = now
+                self._buffers[c].append((now, raw))
+
+    def _collect_stream(self):
+        now = time.time()
+        for c, (raws, error) in self.hw.adc.drain().items():
+            self._errors[c] = error
+            if raws:
+                self._last_raw[c] = raws[-1]
+                self._last_at[c] = now
+                self._buffers[c].extend((now, raw) for raw in raws)
+            elif error:
+                self._last_raw[c] = None
+
+    async def tick(self):
+        """One acquisition step, run by the scheduler every 1 / sample_rate_hz seconds."""
+        if getattr(self.hw.adc, "streaming", False):
+            self._collect_stream()
+        else:
+            await self._scan()
+        self.scans += 1
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -3,12 +3,19 @@ import logging
 import time
 from typing import Dict, Any, Callable, Awaitable
 
+from core.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 class DosingManager:
     """
     Handles proportional pH threshold dosing and manual pump overrides
     with background task management.
+
+    With a filter chain configured, a compartment is only auto-dosed when
+    the filtered pH is below target by more than dose_sigmas times its
+    uncertainty, its uncertainty is within max_uncertainty, and the latest
+    sample was not rejected as an outlier, so noise alone never doses.
     """
     DEFAULT_DOSE_STEPS = 500
     DEFAULT_MAX_PUMP_SEC = 2
@@ -35,9 +42,24 @@ class DosingManager:
         for compartment_id, reading in sensor_data.items():
             ph_val = reading.get("ph")
             if ph_val is not None:
-                await self._dose_if_needed(compartment_id, ph_val)
-
-    async def _dose_if_needed(self, compartment_id: int, current_ph: float):
+                await self._dose_if_needed(
+                    compartment_id, ph_val, reading.get("uncertainty", 0.0), reading.get("outlier", False)
+                )
+
+    def _confident_below(self, compartment_id: int, current_ph: float, target_min: float,
+                         uncertainty: float, outlier: bool) -> bool:
+        """Whether the filtered reading is below target beyond its noise."""
+        chain = self.state.filter_chains.get(compartment_id)
+        if chain is None:
+            return current_ph < target_min
+        if outlier:
+            return False
+        if chain.max_uncertainty is not None and uncertainty > chain.max_uncertainty:
+            return False
+        return current_ph + chain.dose_sigmas * uncertainty < target_min
+
+    async def _dose_if_needed(self, compartment_id: int, current_ph: float,
+                              uncertainty: float = 0.0, outlier: bool = False):
         if not self.state.active_experiment:
             return
 
@@ -52,20 +74,21 @@ class DosingManager:
         if self.state.manual_override[compartment_id]:
             return  # Manual dose in progress — skip auto-dose
 
-        if current_ph >= target_min:
-            return  # pH is within range — no dose required
+        if not self._confident_below(compartment_id, current_ph, target_min, uncertainty, outlier):
+            return  # pH is within range (or not distinguishable from noise) — no dose required
 
         pump_id = compartment_id  # 1:1 mapping: compartment ↔ pump
         if pump_id not in self.hw.pumps:
             logger.warning(f"Auto dosing: no pump found for compartment {compartment_id}")
             return
 
-        pump = self.hw.pumps[pump_id]
         max_time = self.state.active_experiment.get("max_pump_time_sec", self.DEFAULT_MAX_PUMP_SEC)
 
-        # Proportional dosing: steps scale with the magnitude of the pH error.
+        # Proportional dosing: steps scale with the magnitude of the pH error,
+        # capped by what the pump's step profile can deliver within max_time.
         ph_error = target_min - current_ph
-        steps = self.ph_ctrl.calculate_steps(ph_error, max_time)
+        profile = getattr(self.hw.pumps[pump_id], "profile", None)
+        steps = self.ph_ctrl.calculate_steps(ph_error, max_time, profile)
 
         # Load the dynamic calibration config for true volume calculation
         try:
@@ -91,10 +114,10 @@ class DosingManager:
         
         # Dispatch the blocking dose to a background task
         self.state.active_dosing_tasks[compartment_id] = asyncio.create_task(
-            self._execute_dose(pump, compartment_id, "forward", steps, max_time, current_ph, target_min, ph_error, volume_ml)
+            self._execute_dose(compartment_id, "forward", steps, max_time, current_ph, target_min, ph_error, volume_ml)
         )
 
-    async def _execute_dose(self, pump, compartment_id, direction, steps, max_time, current_ph, target_min, ph_error, volume_ml):
+    async def _execute_dose(self, compartment_id, direction, steps, max_time, current_ph, target_min, ph_error, volume_ml):
         if self.log_event:
             await self.log_event(
                 "INFO",
@@ -103,7 +126,9 @@ class DosingManager:
                 compartment_id
             )
         try:
-            await asyncio.to_thread(pump.dose, direction, steps, max_time)
+            result = await self.hw.scheduler.dose(compartment_id, direction, steps, max_time)
+            if not result.completed:
+                logger.warning(f"Auto dose on compartment {compartment_id} stopped after {result.emitted}/{steps} steps.")
             # Record dose time only after a confirmed successful dose
             self.state.last_dose_time[compartment_id] = time.time()
         except Exception as exc:
@@ -117,12 +142,11 @@ class DosingManager:
             logger.warning(f"Manual control: pump_id {pump_id!r} not found in hardware — ignoring.")
             return
 
-        pump = self.hw.pumps[pump_id]
         logger.info(f"Manual override: dosing pump {pump_id} — {steps} steps {direction}")
         if self.log_event:
             await self.log_event("INFO", f"Manual override: pump {pump_id} activated for {steps} steps ({direction})", pump_id)
         try:
-            await asyncio.to_thread(pump.dose, direction, steps, max_time)
+            await self.hw.scheduler.dose(pump_id, direction, steps, max_time)
         except Exception as exc:
             logger.error(f"Manual dose failed: {exc}")
             if self.log_event:
@@ -163,7 +187,7 @@ class DosingManager:
 
         try:
             # Start the hardware pulse loop in a thread (starts the motor)
-            await asyncio.to_thread(pump.start_prime)
+            await metrics.to_thread("pump.start_prime", pump.start_prime)
             # Non-blocking wait while sensor reads continue
             await asyncio.sleep(duration)
         except asyncio.CancelledError:
@@ -172,7 +196,7 @@ class DosingManager:
             logger.error(f"Manual dose loop error for compartment {compartment_id}: {e}")
         finally:
             # STOP the loop (guaranteed shutoff even on cancellation)
-            await asyncio.to_thread(pump.stop_prime)
+            await metrics.to_thread("pump.stop_prime", pump.stop_prime)
             self.state.manual_override[compartment_id] = False
             self.mqtt.publish_pump_active_status(location, False)
             self.state.active_manual_dose_tasks[compartment_id] = None
@@ -184,9 +208,10 @@ class DosingManager:
         try:
             config = self.pump_config_manager.get_pump_config(f"location_{compartment_id}")
             spm = float(config.get("steps_per_ml", 1000.0))
-            # Pulse frequency is 1 step per 2ms = 500 steps/sec
             steps = volume_ml * spm
-            return steps * self.ph_ctrl.SEC_PER_STEP
+            # Timing follows the pump's ramp profile (constant 2 ms/step without one)
+            pump = self.hw.pumps.get(compartment_id)
+            return self.ph_ctrl.dose_duration(steps, getattr(pump, "profile", None))
         except Exception as e:
             logger.error(f"Failed to calculate duration from volume: {e}")
             return 0.0
@@ -0,0 +1,80 @@
+import base64
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ExportManager:
+    """
+    Serves `reactor/export/request` messages: builds the export file on a
+    dedicated worker thread with ExperimentExporter, then streams it back over
+    MQTT in fixed-size chunks on `reactor/export/response/{id}`.
+
+    Chunk messages:
+        {"success": true, "seq": n, "data": <base64>, "done": bool,
+         "filename": str, "content_type": str, "size": int}
+    A failure at any point is reported as {"success": false, "error": str}.
+    """
+
+    CHUNK_BYTES = 192 * 1024  # Raw bytes per message (base64 adds ~33%)
+
+    def __init__(self, exporter: Any, mqtt_client: Any):
+        self.exporter = exporter
+        self.mqtt = mqtt_client
+        # One export at a time, off asyncio's default executor (used by ADC reads and doses)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+
+    async def handle_export_request(self, payload: dict):
+        req_id = payload.get("id")
+        if not req_id:
+            return
+
+        experiment_id = payload.get("experiment_id")
+        fmt = payload.get("format", "xlsx")
+        logger.info(f"Export requested for experiment {experiment_id} ({fmt}).")
+
+        await metrics.run_in_executor(
+            "export", self._executor, self._run_export, req_id, experiment_id, fmt
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_export(self, req_id: str, experiment_id: str, fmt: str):
+        # Runs on the export thread, so the acknowledged error publish cannot block the loop
+        try:
+            self._export_and_stream(req_id, experiment_id, fmt)
+        except Exception as e:
+            logger.error(f"Export of experiment {experiment_id} failed: {e}")
+            self.mqtt.publish_export_chunk(req_id, {"success": False, "error": str(e)})
+
+    def _export_and_stream(self, req_id: str, experiment_id: str, fmt: str):
+        path, filename, content_type = self.exporter.export(experiment_id, fmt)
+        try:
+            size = os.path.getsize(path)
+            with open(path, "rb") as fh:
+                seq = 0
+                while True:
+                    chunk = fh.read(self.CHUNK_BYTES)
+                    done = fh.tell() >= size
+                    delivered = self.mqtt.publish_export_chunk(req_id, {
+                        "success": True,
+                        "seq": seq,
+                        "data": base64.b64encode(chunk).decode("ascii"),
+                        "done": done,
+                        "filename": filename,
+                        "content_type": content_type,
+                        "size": size,
+                    })
+                    if not delivered:
+                        raise RuntimeError(f"Export stream stalled at chunk {seq}")
+                    if done:
+                        break
+                    seq += 1
+        finally:
+            os.remove(path)
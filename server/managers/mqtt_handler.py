@@ -1,6 +1,8 @@
 import logging
 import asyncio
 
+from core.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 class MQTTCommandHandler:
@@ -21,12 +23,46 @@ class MQTTCommandHandler:
         mqtt_client.on_pump_save_calibration = self.handle_pump_save_calibration
         mqtt_client.on_pump_cmd = self.handle_pump_cmd
         mqtt_client.on_status_request = self.handle_status_request
+        mqtt_client.on_db_write = self.handle_db_write
+        mqtt_client.on_export_request = self.handle_export_request
+        mqtt_client.on_reprocess_request = self.handle_reprocess_request
+        mqtt_client.on_profile_request = self.handle_profile_request
 
     async def handle_status_request(self, payload: dict):
         """Respond to frontend synchronization ping."""
         logger.info("Received colosh/request_status ping inside handler.")
         self.ctx.send_initial_state_to_frontend()
 
+    async def handle_db_write(self, payload: dict):
+        """A DB RPC write may have started, stopped or edited an experiment."""
+        self.ctx.sqlite.invalidate_active_experiment()
+
+    async def handle_export_request(self, payload: dict):
+        """Build and stream an experiment export (runs off the event loop)."""
+        await self.ctx.export_manager.handle_export_request(payload)
+
+    async def handle_reprocess_request(self, payload: dict):
+        """Recompute an experiment's telemetry with corrected calibrations (runs off the event loop)."""
+        await self.ctx.reprocess_manager.handle_reprocess_request(payload)
+
+    async def handle_profile_request(self, payload: dict):
+        """Start, stop or dump the sampling profiler: {"action": "start" | "stop" | "dump"}."""
+        action = payload.get("action", "dump")
+        profiler = self.ctx.profiler
+        result = {"id": payload.get("id"), "action": action}
+        if action == "start":
+            profiler.start(asyncio.get_running_loop())
+        elif action == "stop":
+            profiler.stop()
+        elif action == "dump":
+            # File writes stay off the event loop
+            result["summary"] = await metrics.to_thread("profiler.dump", profiler.dump, "mqtt request")
+        else:
+            logger.warning(f"Unknown profile action: {action!r}")
+            result["error"] = f"Unknown action: {action}"
+        result["running"] = profiler.running
+        self.ctx.mqtt.publish_profile_result(result)
+
     async def handle_calibration_control(self, payload: dict):
         """Toggle sensor calibration stream mode."""
         action = payload.get("action")
@@ -46,6 +82,7 @@ class MQTTCommandHandler:
     async def handle_experiment_config(self, payload: dict):
         """Dynamically apply incoming limit/threshold changes."""
         logger.info("Experiment config update received via MQTT.")
+        self.ctx.sqlite.invalidate_active_experiment()
         if self.ctx.state.active_experiment and self.ctx.state.active_experiment["id"] == payload.get("experiment_id"):
             self.ctx.reload_active_experiment()
 
@@ -143,7 +180,7 @@ class MQTTCommandHandler:
 
         self.ctx.mqtt.publish_pump_active_status(location, True)
         try:
-            await asyncio.to_thread(pump.run_calibration, steps)
+            await metrics.to_thread("pump.run_calibration", pump.run_calibration, steps)
         except Exception as e:
             logger.error(f"Pump Calibrate Run Failed: {e}")
         finally:
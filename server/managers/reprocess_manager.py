@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ReprocessManager:
+    """
+    Serves `reactor/reprocess/request` messages: recomputes an experiment's
+    telemetry with corrected calibrations (TelemetryReprocessor) on a
+    dedicated worker thread and reports progress on
+    `reactor/reprocess/progress/{id}`.
+
+    Request:
+        {"id": str, "experiment_id": str, "calibration_ids": [int, ...]}
+        {"id": str, "action": "cancel"}
+
+    Progress messages:
+        {"success": true, "revision_id": int, "processed": n, "total": n, "percent": float, "done": false}
+    followed by one final
+        {"success": true, "revision_id": int, "samples": n, "rows": n, "elapsed_sec": float, "done": true}
+    A failure is reported as {"success": false, "error": str, "done": true}.
+    """
+
+    # Minimum spacing between progress messages
+    PROGRESS_INTERVAL_SEC = 0.5
+
+    REVISION_TABLES = ("telemetry_revisions", "telemetry_revision_rows")
+
+    def __init__(self, reprocessor: Any, mqtt_client: Any):
+        self.reprocessor = reprocessor
+        self.mqtt = mqtt_client
+        # One job at a time, off asyncio's default executor (used by ADC reads and doses)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reprocess")
+        self._cancel_events = {}
+
+    async def handle_reprocess_request(self, payload: dict):
+        req_id = payload.get("id")
+        if not req_id:
+            return
+
+        if payload.get("action") == "cancel":
+            cancel_event = self._cancel_events.get(req_id)
+            if cancel_event:
+                cancel_event.set()
+            return
+
+        experiment_id = payload.get("experiment_id")
+        calibration_ids = payload.get("calibration_ids") or []
+        logger.info(f"Reprocessing requested for experiment {experiment_id} with calibrations {calibration_ids}.")
+
+        cancel_event = self._cancel_events[req_id] = threading.Event()
+        try:
+            await metrics.run_in_executor(
+                "reprocess", self._executor, self._run, req_id, experiment_id, calibration_ids, cancel_event
+            )
+        finally:
+            self._cancel_events.pop(req_id, None)
+
+    def close(self):
+        for cancel_event in self._cancel_events.values():
+            cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, req_id: str, experiment_id: str, calibration_ids: list, cancel_event: threading.Event):
+        last_sent = 0.0
+
+        def on_progress(revision_id: int, processed: int, total: int):
+            nonlocal last_sent
+            now = time.monotonic()
+            if now - last_sent < self.PROGRESS_INTERVAL_SEC and processed < total:
+                return
+            last_sent = now
+            self.mqtt.publish_reprocess_progress(req_id, {
+                "success": True,
+                "revision_id": revision_id,
+                "processed": processed,
+                "total": total,
+                "percent": round(100.0 * processed / total, 1) if total else 100.0,
+                "done": False,
+            })
+
+        try:
+            result = self.reprocessor.run(
+                experiment_id, [int(c) for c in calibration_ids], on_progress, cancel_event
+            )
+            self.mqtt.publish_reprocess_progress(req_id, {"success": True, **result, "done": True})
+        except Exception as e:
+            logger.error(f"Reprocessing of experiment {experiment_id} failed: {e}")
+            self.mqtt.publish_reprocess_progress(req_id, {"success": False, "error": str(e), "done": True})
+        finally:
+            self.mqtt.result_cache.invalidate(self.REVISION_TABLES)
@@ -1,14 +1,25 @@
-import asyncio
 import logging
-import collections
+import math
 from typing import Dict, Any, Callable, Awaitable
 
+from core.filters import FilterChain, parse_filter_config
+
 logger = logging.getLogger(__name__)
 
 class SensorManager:
     """
     Handles hardware ADC interfacing, signal filtering (sliding windows), 
     and pH computation.
+
+    Raw samples come from the AcquisitionManager, which oversamples each
+    channel independently of the control loop; every cycle the samples
+    gathered since the previous cycle are decimated (averaged) into the one
+    raw value the windows and calibration see.
+
+    The pH is then smoothed either by the experiment's filter chain
+    (experiments.filter_config, see core.filters) or, without one, by the
+    ph_moving_avg_window moving average.  Both report a one-sigma
+    uncertainty alongside the value.
     """
 
     # A reading is considered stable when the spread of the window
@@ -21,58 +32,86 @@ class SensorManager:
         state: Any, 
         ph_ctrl: Any,
         log_event_callback: Callable[[str, str, int], Awaitable[None]],
-        mqtt_client: Any
+        mqtt_client: Any,
+        acquisition: Any
     ):
         self.hw = hw
         self.state = state
         self.ph_ctrl = ph_ctrl
         self.log_event = log_event_callback
         self.mqtt = mqtt_client
+        self.acquisition = acquisition
+
+    def _sync_filter_chains(self):
+        """(Re)build the per-compartment filter chains when the experiment's filter_config changes."""
+        active_exp = self.state.active_experiment
+        key = active_exp.get("filter_config") if active_exp else None
+        if key == self.state.filter_config_key:
+            return
+        self.state.filter_config_key = key
+        config = parse_filter_config(key)
+        for c in self.state.COMPARTMENTS:
+            self.state.filter_chains[c] = FilterChain.from_config(config) if config else None
+            self.state.filtered_ph[c] = None
+        if config:
+            logger.info(f"pH filter chain: {[stage['type'] for stage in config['stages']]}")
 
     async def read_and_process(self) -> Dict[int, Dict[str, Any]]:
         """
-        Read raw ADC values from all compartments, apply stability windowing,
-        convert to pH, and return a composite telemetry dict.
+        Decimate the raw ADC samples acquired since the last cycle for all
+        compartments, apply stability windowing, convert to pH, and return a
+        composite telemetry dict.
         """
         sensor_data = {}
-        
+        self._sync_filter_chains()
+
         for compartment_id in self.state.COMPARTMENTS:
             try:
-                raw = await asyncio.to_thread(self.hw.adc.read_raw_value, compartment_id)
+                raws, error = self.acquisition.take(compartment_id)
+                if error and not raws:
+                    raise RuntimeError(error)
+                # Boxcar decimation: mean of the oversampled block
+                raw = int(round(sum(raws) / len(raws))) if raws else None
 
                 if raw is not None:
                     # 1. Hardware Stability: spread of raw ADC integers
                     raw_window = self.state.raw_windows[compartment_id]
                     raw_window.append(raw)
-                    is_stable = (
-                        len(raw_window) >= 2
-                        and (max(raw_window) - min(raw_window)) < self.STABILITY_THRESHOLD
-                    )
+                    is_stable = len(raw_window) >= 2 and raw_window.spread < self.STABILITY_THRESHOLD
 
                     # 2. Convert raw to instantaneous pH
                     inst_ph = self.ph_ctrl.raw_to_ph(compartment_id, raw)
 
-                    # 3. Process Stability: Moving Average pH
-                    active_exp = self.state.active_experiment
-                    if active_exp:
-                        new_window_size = active_exp.get("ph_moving_avg_window", self.state.PH_MOVING_AVG_WINDOW)
+                    # 3. Process Stability: filter chain, or moving average pH
+                    chain = self.state.filter_chains[compartment_id]
+                    if chain is not None:
+                        out = chain.update(inst_ph)
+                        ph = round(out.value, 2)
+                        uncertainty, outlier = out.uncertainty, out.rejected
+                        self.state.filtered_ph[compartment_id] = ph
                     else:
-                        new_window_size = self.state.PH_MOVING_AVG_WINDOW
+                        active_exp = self.state.active_experiment
+                        if active_exp:
+                            new_window_size = active_exp.get("ph_moving_avg_window", self.state.PH_MOVING_AVG_WINDOW)
+                        else:
+                            new_window_size = self.state.PH_MOVING_AVG_WINDOW
 
-                    ph_avg_window = self.state.ph_avg_windows[compartment_id]
-                    if ph_avg_window.maxlen != new_window_size:
-                        self.state.ph_avg_windows[compartment_id] = collections.deque(ph_avg_window, maxlen=new_window_size)
                         ph_avg_window = self.state.ph_avg_windows[compartment_id]
-
-                    ph_avg_window.append(inst_ph)
-                    ma_ph = round(sum(ph_avg_window) / len(ph_avg_window), 2)
+                        ph_avg_window.resize(new_window_size)  # No-op unless the experiment changed it
+                        ph_avg_window.append(inst_ph)
+                        ph = round(ph_avg_window.mean, 2)
+                        uncertainty = ph_avg_window.stdev / math.sqrt(len(ph_avg_window))
+                        outlier = False
 
                     # 4. DAQ Bucketing: accumulate for logging
                     self.state.telemetry_buckets[compartment_id].append(inst_ph)
 
                     sensor_data[compartment_id] = {
-                        "ph": ma_ph,       # Dashboard display & dosing use MA
+                        "ph": ph,          # Dashboard display & dosing use the filtered value
+                        "uncertainty": round(uncertainty, 4),  # One-sigma, pH
+                        "outlier": outlier,  # This cycle's sample was rejected by the chain
                         "raw": raw,        # Raw used for calibration UI
+                        "inst_ph": inst_ph,  # Unfiltered pH for the raw sample store
                         "stable": is_stable,
                     }
                 else:
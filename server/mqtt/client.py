@@ -2,18 +2,41 @@ import json
 import logging
 import asyncio
 import os
+import re
+from typing import Optional, Sequence, Tuple
+
 import paho.mqtt.client as mqtt
 
+from core.metrics import metrics
+from database.query_catalogue import get_named_query
+from database.result_cache import ResultCache
+from database.rpc_pool import DbRpcPool
+from database.telemetry_rollups import TelemetryRollups
+
 logger = logging.getLogger(__name__)
 
 class MQTTClient:
     SERVER_STATUS_TOPIC = "reactor/server/status"
 
-    def __init__(self, broker_url=None, port=None, client_id="reactor_core"):
+    def __init__(self, broker_url=None, port=None, client_id="reactor_core", db_path=None):
         self.broker_url = broker_url or os.getenv("MQTT_BROKER_URL", "localhost")
         self.port = port or int(os.getenv("MQTT_PORT", "1883"))
         self.client_id = client_id
 
+        # reactor/db/request runs on its own bounded pool, never the default executor
+        self.db_pool = DbRpcPool(
+            db_path or os.getenv("SQLITE_DB_PATH", "reactor.db"),
+            max_readers=int(os.getenv("DB_RPC_MAX_READERS", str(DbRpcPool.MAX_READERS))),
+        )
+        # Shared read results for identical polls; invalidated by table on every write
+        self.result_cache = ResultCache(
+            max_entries=int(os.getenv("DB_CACHE_MAX_ENTRIES", str(ResultCache.MAX_ENTRIES))),
+            ttl_sec=float(os.getenv("DB_CACHE_TTL_SEC", str(ResultCache.TTL_SEC))),
+        )
+        # Read here, not at import time, so settings from .env are seen
+        self.allow_raw_sql = os.getenv("DB_RPC_ALLOW_RAW_SQL", "false").lower() in ("1", "true", "yes")
+        self.max_payload_bytes = int(os.getenv("DB_RPC_MAX_PAYLOAD_BYTES", str(self.DB_RPC_MAX_PAYLOAD_BYTES)))
+
         # Callbacks set by main.py
         self.on_manual_control = None
         self.on_auto_update = None
@@ -24,10 +47,15 @@ class MQTTClient:
         self.on_pump_save_calibration = None
         self.on_pump_cmd = None
         self.on_status_request = None
+        self.on_db_write = None
+        self.on_export_request = None
+        self.on_reprocess_request = None
+        self.on_profile_request = None
 
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
+        self.client.on_publish = self._on_publish
 
         # Asyncio event loop reference — captured at connect() time from the main thread
         self._loop = None
@@ -58,12 +86,19 @@ class MQTTClient:
             client.subscribe("pump/control/calibrate_run")
             client.subscribe("pump/config/save_calibration")
             client.subscribe("reactor/db/request")
+            client.subscribe("reactor/export/request")
+            client.subscribe("reactor/reprocess/request")
+            client.subscribe("reactor/profile/request")
             client.subscribe("reactor/+/cmd/pump")  # reactor/{compartment_id}/cmd/pump
             client.subscribe("colosh/request_status")
         else:
             logger.error(f"Failed to connect, return code {reason_code}")
 
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        metrics.inc("mqtt_published_total")
+
     def _on_message(self, client, userdata, msg):
+        metrics.inc("mqtt_received_total")
         topic = msg.topic
         payload = msg.payload.decode("utf-8")
         logger.debug(f"Received message on {topic}: {payload}")
@@ -114,6 +149,21 @@ class MQTTClient:
                 self._handle_db_query(data),
                 self._loop
             )
+        elif topic == "reactor/export/request" and self.on_export_request:
+            asyncio.run_coroutine_threadsafe(
+                self.on_export_request(data),
+                self._loop
+            )
+        elif topic == "reactor/reprocess/request" and self.on_reprocess_request:
+            asyncio.run_coroutine_threadsafe(
+                self.on_reprocess_request(data),
+                self._loop
+            )
+        elif topic == "reactor/profile/request" and self.on_profile_request:
+            asyncio.run_coroutine_threadsafe(
+                self.on_profile_request(data),
+                self._loop
+            )
         elif topic == "colosh/request_status" and self.on_status_request:
             asyncio.run_coroutine_threadsafe(
                 self.on_status_request(data),
@@ -131,7 +181,81 @@ class MQTTClient:
             except (ValueError, IndexError):
                 logger.error(f"Malformed pump command topic: {topic}")
 
+    # ── DB RPC ────────────────────────────────────────────────────────────
+
+    # Default upper bound on one reactor/db/response message (DB_RPC_MAX_PAYLOAD_BYTES);
+    # bigger `all` results are split into chunks
+    DB_RPC_MAX_PAYLOAD_BYTES = 256 * 1024
+    # Rows pulled from the cursor per fetchmany() while streaming
+    DB_RPC_FETCH_ROWS = 500
+    # Seconds to wait for the broker to acknowledge one streamed chunk
+    CHUNK_ACK_TIMEOUT_SEC = 10
+    # Column names accepted as a raw-SQL page key
+    _PAGE_KEY_COLUMN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+    @classmethod
+    def _paginate(cls, sql: str, params, key: Sequence[str], page_size: int, after: Optional[list]):
+        """
+        Wrap a SELECT so it returns one page (plus one look-ahead row) by
+        keyset: rows whose `key` columns sort after the previous page's last
+        row, so a page costs the same however deep into the result it is.
+        """
+        if not key:
+            raise ValueError("Query has no page key and cannot be paged")
+        if not all(isinstance(column, str) and cls._PAGE_KEY_COLUMN.match(column) for column in key):
+            raise ValueError(f"Invalid page key: {key!r}")
+        if after is not None and len(after) != len(key):
+            raise ValueError("Cursor does not match the page key")
+        columns = ", ".join(key)
+        named = isinstance(params, dict)
+        where = ""
+        if after is not None:
+            marks = ", ".join(f":_after_{i}" if named else "?" for i in range(len(key)))
+            where = f" WHERE ({columns}) > ({marks})"
+        paged_sql = (
+            f"SELECT * FROM ({sql.strip().rstrip(';')}){where} "
+            f"ORDER BY {columns} LIMIT {':_page_limit' if named else '?'}"
+        )
+        if named:
+            bound = {f"_after_{i}": value for i, value in enumerate(after or ())}
+            return paged_sql, {**params, **bound, "_page_limit": page_size + 1}
+        return paged_sql, [*params, *(after or ()), page_size + 1]
+
+    def _stream_rows(self, req_id: str, cursor) -> Tuple[str, bool]:
+        """
+        Serialise an `all` result chunk by chunk, never holding more than one
+        chunk of rows.  Every full chunk is published immediately as
+        {"success", "seq", "done": false, "data"}; the final message is returned
+        for the caller to publish, with whether earlier chunks were sent.  A
+        result that fits in one message keeps the legacy {"success", "data"} shape.
+        """
+        topic = f"reactor/db/response/{req_id}"
+        envelope = 64  # Bytes reserved for the {"success", "seq", "done"} wrapper
+        seq, pending, size = 0, [], envelope
+
+        def chunk(done: bool) -> str:
+            rows = "[" + ",".join(pending) + "]"
+            if seq == 0 and done:
+                return f'{{"success": true, "data": {rows}}}'
+            return f'{{"success": true, "seq": {seq}, "done": {"true" if done else "false"}, "data": {rows}}}'
+
+        while True:
+            rows = cursor.fetchmany(self.DB_RPC_FETCH_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                encoded = json.dumps(dict(row))
+                if pending and size + len(encoded) > self.max_payload_bytes:
+                    if not self._publish_acked(topic, chunk(done=False)):
+                        raise RuntimeError(f"DB response stream stalled at chunk {seq}")
+                    seq, pending, size = seq + 1, [], envelope
+                pending.append(encoded)
+                size += len(encoded) + 1
+        return chunk(done=True), seq > 0
+
     async def _handle_db_query(self, payload: dict):
+        cache_key = tables = generation = None
+        streamed = False
         try:
             req_id = payload.get('id', 'unknown')
             method = payload.get('method')
@@ -141,38 +265,146 @@ class MQTTClient:
             if req_id == 'unknown':
                 return
 
-            import sqlite3
-            db_path = os.getenv("SQLITE_DB_PATH", "reactor.db")
-            
-            def run_query():
-                with sqlite3.connect(db_path) as conn:
-                    conn.row_factory = sqlite3.Row
+            named = None
+            mode = method
+            if method == "query":
+                # Catalogue entry: fixed SQL, validated params
+                named = get_named_query(payload.get('name'))
+                sql, params, mode = named.statements[0], named.bind(params), named.mode
+            elif method in ("all", "get", "run", "exec") and not self.allow_raw_sql:
+                raise Exception(f"Raw SQL method disabled: {method}")
+
+            def run_read(conn):
+                nonlocal streamed
+                cursor = conn.cursor()
+                if method == "series":
+                    # Chart query served from the telemetry rollups; params is an object
+                    return {"success": True, "data": TelemetryRollups.query(conn, **params)}
+
+                if mode == "all" and payload.get("page_size"):
+                    # Keyset pagination: the cursor is the last row's page key, JSON-encoded
+                    key = named.page_key if named is not None else tuple(payload.get("page_key") or ())
+                    page_size = int(payload["page_size"])
+                    after = json.loads(payload["cursor"]) if payload.get("cursor") else None
+                    cursor.execute(*self._paginate(sql, params, key, page_size, after))
+                    rows = [dict(r) for r in cursor.fetchmany(page_size + 1)]
+                    has_more = len(rows) > page_size
+                    rows = rows[:page_size]
+                    return {
+                        "success": True,
+                        "data": rows,
+                        "next_cursor": json.dumps([rows[-1][c] for c in key]) if has_more else None,
+                    }
+
+                cursor.execute(sql, params)
+                if mode == "all":
+                    message, streamed = self._stream_rows(req_id, cursor)
+                    return message
+                row = cursor.fetchone()
+                return {"success": True, "data": dict(row) if row else None}
+
+            def run_named_write(conn):
+                # Every statement of the entry commits (or rolls back) together
+                changes = 0
+                with conn:
                     cursor = conn.cursor()
-                    if method == "exec":
-                        cursor.executescript(sql)
-                        # executescript handles commit inherently
-                        return {"success": True}
-                    
+                    for statement in named.statements:
+                        cursor.execute(statement, params)
+                        changes += max(cursor.rowcount, 0)
+                return {"success": True, "data": {"lastID": cursor.lastrowid, "changes": changes}}
+
+            def run_write(conn):
+                cursor = conn.cursor()
+                if method == "exec":
+                    cursor.executescript(sql)
+                    # executescript handles commit inherently
+                    return {"success": True}
+                with conn:
                     cursor.execute(sql, params)
-                    if method == "all":
-                        return {"success": True, "data": [dict(r) for r in cursor.fetchall()]}
-                    elif method == "get":
-                        row = cursor.fetchone()
-                        return {"success": True, "data": dict(row) if row else None}
-                    elif method == "run":
-                        conn.commit()
-                        return {"success": True, "lastID": cursor.lastrowid, "changes": cursor.rowcount}
-                    raise Exception(f"Invalid method: {method}")
-
-            result = await asyncio.to_thread(run_query)
+                return {"success": True, "lastID": cursor.lastrowid, "changes": cursor.rowcount}
+
+            if mode in ("all", "get", "series"):
+                tables = self._read_tables(method, named, sql)
+                if tables:
+                    cache_key = ResultCache.make_key(
+                        method, named and payload.get('name') or sql, params,
+                        payload.get("page_size"), payload.get("cursor"), payload.get("page_key"),
+                    )
+                    cached = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        self.client.publish(f"reactor/db/response/{req_id}", cached)
+                        return
+                    generation = self.result_cache.generation(tables)
+                result = await self.db_pool.read(run_read)
+            elif named is not None:
+                result = await self.db_pool.write(run_named_write)
+            elif method in ("run", "exec"):
+                result = await self.db_pool.write(run_write)
+            else:
+                raise Exception(f"Invalid method: {method}")
         except Exception as e:
+            mode = None
             result = {"success": False, "error": str(e)}
 
+        # Drop cached reads and let the orchestrator drop caches that this write may have made stale
         try:
-            self.client.publish(f"reactor/db/response/{req_id}", json.dumps(result))
+            if mode in ("run", "exec") and result.get("success"):
+                written = named.tables if named else ResultCache.tables_in_sql(sql)
+                if written:
+                    self.result_cache.invalidate(written)
+                else:
+                    self.result_cache.clear()
+                if self.on_db_write:
+                    await self.on_db_write(payload)
+        except Exception as e:
+            logger.error(f"DB write callback failed: {e}")
+
+        try:
+            message = result if isinstance(result, str) else json.dumps(result)
+            if cache_key and mode and not streamed:
+                self.result_cache.put(cache_key, message, tables, generation)
+            self.client.publish(f"reactor/db/response/{req_id}", message)
         except Exception as e:
             logger.error(f"Failed to publish DB response: {e}")
 
+    @staticmethod
+    def _read_tables(method: str, named, sql: str) -> Tuple[str, ...]:
+        """Tables a read depends on, for result caching; empty means uncacheable."""
+        if named is not None:
+            return named.tables
+        if method == "series":
+            return ("telemetry", "telemetry_rollups")
+        return ResultCache.tables_in_sql(sql)
+
+    def _publish_acked(self, topic: str, message: str) -> bool:
+        """
+        Publish with QoS 1 and block until the broker acknowledges, so a long
+        stream never piles up in paho's outbound queue. Call from a worker
+        thread. Returns False if the message was not delivered.
+        """
+        try:
+            info = self.client.publish(topic, message, qos=1)
+            info.wait_for_publish(timeout=self.CHUNK_ACK_TIMEOUT_SEC)
+            return info.is_published()
+        except Exception as e:
+            logger.error(f"Failed to publish on {topic}: {e}")
+            return False
+
+    def publish_export_chunk(self, req_id: str, payload: dict) -> bool:
+        """Publish one export stream message; see _publish_acked()."""
+        return self._publish_acked(f"reactor/export/response/{req_id}", json.dumps(payload))
+
+    def publish_reprocess_progress(self, req_id: str, payload: dict) -> bool:
+        """Publish one reprocessing progress message; see _publish_acked()."""
+        return self._publish_acked(f"reactor/reprocess/progress/{req_id}", json.dumps(payload))
+
+    def publish_profile_result(self, payload: dict):
+        """Publish the profiler's state or dump summary in reply to reactor/profile/request."""
+        try:
+            self.client.publish("reactor/profile/result", json.dumps(payload), qos=1)
+        except Exception as e:
+            logger.error(f"Failed to publish profile result: {e}")
+
     def publish_pump_active_status(self, location: str, is_running: bool):
         """Publish pump running status for the frontend."""
         try:
@@ -204,6 +436,13 @@ class MQTTClient:
         except Exception as e:
             logger.error(f"Failed to publish status: {e}")
 
+    def publish_metrics(self, payload: dict):
+        """Publish latency histograms and scheduler stats (retained, read by `python -m core.metrics`)."""
+        try:
+            self.client.publish("reactor/metrics", json.dumps(payload), retain=True)
+        except Exception as e:
+            logger.error(f"Failed to publish metrics: {e}")
+
     def publish_raw_value(self, raw_data: dict):
         """Publish raw ADC integer for calibration (key: raw_value)."""
         try:
@@ -261,3 +500,4 @@ class MQTTClient:
     def disconnect(self):
         self.client.loop_stop()
         self.client.disconnect()
+        self.db_pool.close()
@@ -1,4 +1,8 @@
 import logging
+from typing import Dict, Iterable, List, Optional
+
+from calibration import CalibrationModel
+from hardware.pulse_engine import STEP_PERIOD_SEC
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +19,9 @@ class PhController:
 
     The two calibration points (point1_ph / point1_raw, point2_ph / point2_raw)
     are stored in the database and loaded at startup via SQLiteClient.get_latest_calibrations().
-    m and b are computed dynamically from those points — no constants are baked in.
+    m and b are derived from those points — no constants are baked in — and
+    compiled once per reload() into a CalibrationModel per compartment, so the
+    per-sample path does no validation or segment re-derivation.
 
     Also provides proportional dosing calculations: the volume (and equivalent
     stepper steps) of base to inject grows proportionally with the pH error,
@@ -38,10 +44,10 @@ class PhController:
     # overcome tubing back-pressure even for tiny pH errors.
     MIN_DOSE_STEPS: int = 10
 
-    # Step timing — must match the delay used in the pump hardware driver.
-    #   MockStepper / RealStepper both use 2 ms per step (0.002 s/step).
-    #   If you change the stepper delay in hardware/, update this constant too.
-    SEC_PER_STEP: float = 0.002  # seconds per step
+    # Step timing of a constant-rate pump — taken from the pulse engine that
+    # drives the STEP pins (hardware/pulse_engine.py).  Pumps with a ramped
+    # StepProfile pass it in, and their real profile timing is used instead.
+    SEC_PER_STEP: float = STEP_PERIOD_SEC  # seconds per step
 
     def __init__(self, calibrations: dict = None):
         """
@@ -53,20 +59,44 @@ class PhController:
                     "point3_ph": float, "point3_raw": int
                 }
             }
-            as returned by SQLiteClient.get_latest_calibrations()
+            as returned by SQLiteClient.get_latest_calibrations().  A record may
+            instead carry "points": [(raw, ph), ...] with an optional "fit"
+            ("piecewise" / "polynomial") and "degree" — see CalibrationModel.
         """
-        self._calibrations = calibrations or {}
+        self._calibrations = {}
+        self._models: Dict[int, CalibrationModel] = {}
+        self._compile(calibrations or {})
         logger.info(f"PhController initialized with calibrations for compartments: {list(self._calibrations.keys())}")
 
     def reload(self, calibrations: dict):
         """Reload calibration constants (e.g. after a new calibration is saved)."""
-        self._calibrations = calibrations
+        self._compile(calibrations)
         logger.info(f"PhController calibrations reloaded for compartments: {list(self._calibrations.keys())}")
 
+    def _compile(self, calibrations: dict):
+        """Validate each record once and build its CalibrationModel; raw_to_ph() only looks models up."""
+        models = {}
+        for compartment_id, calib in calibrations.items():
+            model = CalibrationModel.from_record(calib) if calib else None
+            if model is None:
+                logger.warning(
+                    f"Incomplete or degenerate calibration for compartment {compartment_id}. "
+                    f"Readings will use fallback pH {self.DEFAULT_FALLBACK_PH}."
+                )
+                continue
+            models[compartment_id] = model
+        # Swap whole dicts so a concurrent raw_to_ph() never sees a half-built set
+        self._calibrations = calibrations
+        self._models = models
+
+    def model_for(self, compartment_id: int) -> Optional[CalibrationModel]:
+        return self._models.get(compartment_id)
+
     def raw_to_ph(self, compartment_id: int, raw_value: int) -> float:
         """
-        Convert a raw 16-bit ADC integer reading to a pH value using either
-        a two-point linear or a three-point piecewise linear calibration.
+        Convert a raw 16-bit ADC integer reading to a pH value using the
+        compartment's compiled calibration (two-point linear, N-point
+        piecewise linear, or polynomial).
 
         Args:
             compartment_id: The reactor compartment (1, 2, or 3).
@@ -76,88 +106,45 @@ class PhController:
             Calibrated pH value rounded to 2 decimal places, or DEFAULT_FALLBACK_PH
             if no valid calibration exists for this compartment.
         """
-        calib = self._calibrations.get(compartment_id)
-
-        if not calib:
-            logger.debug(
-                f"No calibration for compartment {compartment_id}. "
-                f"Returning fallback pH {self.DEFAULT_FALLBACK_PH}."
-            )
+        model = self._models.get(compartment_id)
+        if model is None:
             return self.DEFAULT_FALLBACK_PH
+        return round(model(raw_value), 2)
 
-        p1_ph  = calib.get("point1_ph")
-        p1_raw = calib.get("point1_raw")
-        p2_ph  = calib.get("point2_ph")
-        p2_raw = calib.get("point2_raw")
-        p3_ph  = calib.get("point3_ph")
-        p3_raw = calib.get("point3_raw")
-
-        # Validate that at least the first two points are present
-        if None in (p1_ph, p1_raw, p2_ph, p2_raw):
-            logger.warning(
-                f"Incomplete calibration data for compartment {compartment_id}. "
-                f"Returning fallback pH {self.DEFAULT_FALLBACK_PH}."
-            )
-            return self.DEFAULT_FALLBACK_PH
-
-        if p2_raw == p1_raw:
-            logger.warning(
-                f"Degenerate calibration for compartment {compartment_id}: "
-                f"point1_raw == point2_raw ({p1_raw}). Returning fallback pH."
-            )
-            return self.DEFAULT_FALLBACK_PH
-
-        # Piecewise selection logic
-        use_p1p2 = True
-        
-        if p3_ph is not None and p3_raw is not None:
-            # We have a 3rd point. Check which segment to use.
-            # Assuming raw values are monotonic with pH (usually increasing or decreasing).
-            # Case A: p1 < p2 < p3 (or vice-versa)
-            midpoint = p2_raw
-            if p1_raw < p3_raw: # Increasing raw ADC
-                if raw_value > midpoint:
-                    use_p1p2 = False
-            else: # Decreasing raw ADC
-                if raw_value < midpoint:
-                    use_p1p2 = False
-
-        if use_p1p2:
-            # Segment 1: p1 to p2
-            m = (p2_ph - p1_ph) / (p2_raw - p1_raw)
-            b = p1_ph - m * p1_raw
-        else:
-            # Segment 2: p2 to p3
-            if p3_raw == p2_raw:
-                # Should not happen with valid calibration
-                m = (p2_ph - p1_ph) / (p2_raw - p1_raw)
-                b = p1_ph - m * p1_raw
-            else:
-                m = (p3_ph - p2_ph) / (p3_raw - p2_raw)
-                b = p2_ph - m * p2_raw
-
-        ph = m * raw_value + b
-        return round(ph, 2)
+    def raw_to_ph_batch(self, compartment_id: int, raws: Iterable[int]) -> List[float]:
+        """raw_to_ph() for a sequence of readings (bulk reprocessing); vectorised with numpy when installed."""
+        model = self._models.get(compartment_id)
+        if model is None:
+            return [self.DEFAULT_FALLBACK_PH for _ in raws]
+        return model.convert_batch(raws)
 
     # ── Proportional dosing ───────────────────────────────────────────────────
 
-    def calculate_steps(self, ph_error: float, max_time_sec: float) -> int:
+    def dose_duration(self, steps: float, profile=None) -> float:
+        """Seconds a dose of `steps` takes, following the pump's StepProfile when given."""
+        if profile is not None:
+            return profile.duration(int(round(steps)))
+        return steps * self.SEC_PER_STEP
+
+    def calculate_steps(self, ph_error: float, max_time_sec: float, profile=None) -> int:
         """
         Calculate the number of stepper-motor steps proportional to the pH error,
         capped so the resulting dose never exceeds max_time_sec.
 
-        max_steps is derived from the pump's own timing constant (SEC_PER_STEP)
-        so the calculated step count is always compatible with the TimeoutError
-        guard inside pump.dose().
+        max_steps is derived from the pump's own timing (its StepProfile, or
+        SEC_PER_STEP for a constant-rate pump) so the calculated step count is
+        always compatible with the time cutoff inside pump.dose().
 
         Formula:
-            max_steps = floor(max_time_sec / SEC_PER_STEP)
+            max_steps = most steps the profile fits in max_time_sec
+                        (floor(max_time_sec / SEC_PER_STEP) at constant rate)
             raw_steps = GAIN_STEPS_PER_PH_UNIT * ph_error
             steps     = clamp(raw_steps, MIN_DOSE_STEPS, max_steps)
 
         Args:
             ph_error:     target_min_ph - current_ph (positive when pH is too low)
             max_time_sec: max_pump_time_sec from the experiment config
+            profile:      the dosing pump's StepProfile, if it has one
 
         Returns:
             Integer step count, always within [MIN_DOSE_STEPS, max_steps].
@@ -165,13 +152,16 @@ class PhController:
         if ph_error <= 0:
             return 0
 
-        max_steps = int(max_time_sec / self.SEC_PER_STEP)
+        if profile is not None:
+            max_steps = profile.max_steps(max_time_sec)
+        else:
+            max_steps = int(max_time_sec / self.SEC_PER_STEP)
         raw_steps = self.GAIN_STEPS_PER_PH_UNIT * ph_error
         steps = int(round(raw_steps))
         steps = max(self.MIN_DOSE_STEPS, min(steps, max_steps))
         logger.debug(
             f"calculate_steps: error={ph_error:.3f} pH → raw={raw_steps:.1f} → "
             f"clamped={steps} (min={self.MIN_DOSE_STEPS}, max={max_steps} "
-            f"[{max_time_sec}s / {self.SEC_PER_STEP}s per step])"
+            f"in {max_time_sec}s)"
         )
         return steps